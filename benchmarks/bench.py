@@ -0,0 +1,270 @@
+"""Benchmarks for the Hashtag Generator hot paths
+
+Measures hashtag generation in both the CLI and GUI engines, history
+updates, settings/history persistence and CLI cold start. Results are
+written as JSON and can be compared against a saved baseline.
+
+Usage:
+    python benchmarks/bench.py                          # run everything
+    python benchmarks/bench.py --quick --only engine    # a fast subset
+    python benchmarks/bench.py -o baseline.json        # save results
+    python benchmarks/bench.py --compare baseline.json  # fail on regressions
+
+All state is kept in a temporary home and working directory, so running
+the benchmarks never touches your real settings or history.
+"""
+
+import os
+import sys
+import json
+import time
+import timeit
+import argparse
+import platform
+import tempfile
+import subprocess
+import importlib.util
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+CLI_DIR = ROOT / "versions" / "CLI"
+GUI_DIR = ROOT / "versions" / "GUI"
+
+# The CLI's main.py imports its sibling modules
+sys.path.insert(0, str(CLI_DIR))
+
+# Building blocks for inputs with different Unicode mixes
+CHARSETS = {
+    "ascii": "Hashtag generator app for social media posts! ",
+    "latin": "Café naïve façade über déjà vu señor ",
+    "cjk": "ハッシュタグ 生成器 해시태그 生成 ",
+    "emoji": "Summer 🌞 vibes 🎉 beach_day #1 ",
+    "indic": "हिन्दी भाषा\u00a0ਪੰਜਾਬੀ\tবাংলা ",
+}
+
+SETTINGS_COMBOS = [
+    (remove_special, capitalize)
+    for remove_special in (True, False)
+    for capitalize in (True, False)
+]
+
+
+def load_module(name, path):
+    """Import a main.py under a unique module name"""
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_text(charset, length):
+    """Repeat a charset sample up to the given length"""
+    sample = CHARSETS[charset]
+    return (sample * (length // len(sample) + 1))[:length]
+
+
+# Minimum duration of one timing run, in seconds (lowered by --quick)
+MIN_RUN_TIME = 0.2
+
+
+def measure(func, repeat=3):
+    """Return the best time per call of func, in seconds"""
+    timer = timeit.Timer(func)
+    number = 1
+    while timer.timeit(number) < MIN_RUN_TIME:
+        number *= 2
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def bench_engine(quick):
+    """Single and batch generation across lengths, charsets and settings"""
+    cli = load_module("hashtag_cli", CLI_DIR / "main.py")
+    gui = load_module("hashtag_gui", GUI_DIR / "main.py")
+    engines = {"cli": cli.HashtagGeneratorCLI(), "gui": gui.HashtagGenerator()}
+    lengths = (16, 1024) if quick else (16, 256, 4096)
+    results = {}
+
+    for engine_name, engine in engines.items():
+        for remove_special, capitalize in SETTINGS_COMBOS:
+            engine.settings["remove_special_chars"] = remove_special
+            engine.settings["capitalize_first_letter"] = capitalize
+            combo = f"{'nospecial' if remove_special else 'special'}-{'cap' if capitalize else 'nocap'}"
+
+            for charset in CHARSETS:
+                for length in lengths:
+                    text = make_text(charset, length)
+                    name = f"engine.{engine_name}.{combo}.{charset}.{length}"
+                    results[name] = measure(lambda: engine.generate_hashtag(text))
+
+                # Per-item cost of converting a batch of distinct short phrases
+                texts = [f"{make_text(charset, 24)} {i}" for i in range(1000)]
+                name = f"engine.{engine_name}.{combo}.{charset}.many"
+                results[name] = measure(lambda: engine.generate_many(texts)) / len(texts)
+
+    return results
+
+
+def bench_history(quick):
+    """History updates with new and repeated tags at various sizes"""
+    from history import HashtagHistory
+
+    sizes = (10, 1000, 100000) if quick else (10, 1000, 100000, 1000000)
+    results = {}
+
+    for size in sizes:
+        history = HashtagHistory((f"#Tag{i}" for i in range(size)), max_items=size)
+        counter = iter(range(size, sys.maxsize))
+        results[f"history.add_new.{size}"] = measure(lambda: history.add(f"#New{next(counter)}"))
+
+        tags = history.to_list()
+        cycle = iter(range(sys.maxsize))
+        results[f"history.add_existing.{size}"] = measure(
+            lambda: history.add(tags[next(cycle) % size]))
+
+    return results
+
+
+def bench_persistence(quick):
+    """save_settings / load_settings round-trip and journal appends"""
+    cli = load_module("hashtag_cli", CLI_DIR / "main.py")
+    sizes = (10, 10000) if quick else (10, 10000, 100000)
+    results = {}
+
+    for size in sizes:
+        generator = cli.HashtagGeneratorCLI()
+        generator.journal.clear()
+        generator.settings["history_max_items"] = size
+        generator.save_settings()
+        for i in range(size):
+            generator.add_to_history(f"#Tag{i}")
+        generator.journal.flush()
+
+        results[f"persist.save_settings.{size}"] = measure(generator.save_settings)
+        results[f"persist.load_settings.{size}"] = measure(
+            lambda: (generator.load_settings(), generator.history))
+
+    generator = cli.HashtagGeneratorCLI()
+    counter = iter(range(sys.maxsize))
+
+    def append_and_flush():
+        for _ in range(100):
+            generator.add_to_history(f"#Journal{next(counter)}")
+        generator.journal.flush()
+
+    results["persist.journal_flush.100"] = measure(append_and_flush)
+    generator.journal.clear()
+    return results
+
+
+def bench_startup(quick):
+    """Wall time of `main.py -t TEXT` and `main.py --settings` as new processes"""
+    sizes = (10, 100000)
+    runs = 3 if quick else 7
+    results = {}
+
+    for size in sizes:
+        # --clear-history returns before settings are applied, so the size
+        # needs its own call
+        subprocess.run([sys.executable, str(CLI_DIR / "main.py"), "--clear-history"],
+                       check=True, capture_output=True)
+        subprocess.run([sys.executable, str(CLI_DIR / "main.py"), "--history-size", str(size)],
+                       check=True, capture_output=True, stdin=subprocess.DEVNULL)
+        lines = "".join(f"startup tag {i}\n" for i in range(size))
+        subprocess.run([sys.executable, str(CLI_DIR / "main.py"), "--batch"],
+                       input=lines, text=True, check=True, capture_output=True)
+
+        for name, args in (("text", ["-t", "Hashtag Generator App"]), ("settings", ["--settings"])):
+            timings = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                subprocess.run([sys.executable, str(CLI_DIR / "main.py")] + args,
+                               check=True, capture_output=True, stdin=subprocess.DEVNULL)
+                timings.append(time.perf_counter() - start)
+            results[f"startup.{name}.{size}"] = min(timings)
+
+    return results
+
+
+BENCHMARKS = {
+    "engine": bench_engine,
+    "history": bench_history,
+    "persistence": bench_persistence,
+    "startup": bench_startup,
+}
+
+
+def compare(results, baseline, threshold):
+    """Print a comparison table and return the names that regressed"""
+    regressions = []
+    print(f"{'benchmark':<50} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, seconds in sorted(results.items()):
+        if name not in baseline:
+            continue
+        change = seconds / baseline[name] - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<50} {baseline[name] * 1e6:>10.2f}us {seconds * 1e6:>10.2f}us "
+              f"{change:>+7.1%}{flag}")
+    return regressions
+
+
+def main():
+    """Run the selected benchmarks and report or compare the results"""
+    parser = argparse.ArgumentParser(description="Hashtag Generator benchmarks")
+    parser.add_argument("--only", action="append", choices=sorted(BENCHMARKS),
+                        help="Run only this group (may be repeated)")
+    parser.add_argument("--quick", action="store_true",
+                        help="Use fewer sizes and repetitions")
+    parser.add_argument("-o", "--output", help="Write results JSON to this file")
+    parser.add_argument("--compare", metavar="BASELINE",
+                        help="Compare against a results JSON and fail on regressions")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Relative slowdown counted as a regression (default 0.10)")
+    args = parser.parse_args()
+    global MIN_RUN_TIME
+    if args.quick:
+        MIN_RUN_TIME = 0.02
+    output = os.path.abspath(args.output) if args.output else None
+    baseline_file = os.path.abspath(args.compare) if args.compare else None
+
+    # Keep all config and history files inside a throwaway directory
+    sandbox = tempfile.mkdtemp(prefix="hashtag-bench-")
+    os.environ["HOME"] = os.environ["USERPROFILE"] = sandbox
+    os.chdir(sandbox)
+
+    results = {}
+    for group in args.only or BENCHMARKS:
+        print(f"Running {group} benchmarks...", file=sys.stderr)
+        results.update(BENCHMARKS[group](args.quick))
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "quick": args.quick,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        # Seconds per operation
+        "results": results,
+    }
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if baseline_file:
+        with open(baseline_file, "r") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) regressed by more than "
+                  f"{args.threshold:.0%}", file=sys.stderr)
+            sys.exit(1)
+    elif not output:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
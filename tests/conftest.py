@@ -0,0 +1,39 @@
+"""Shared fixtures for the CLI tests"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# The CLI modules import each other by name, as when main.py is run as a script
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "versions" / "CLI"))
+
+from main import HashtagGeneratorCLI  # noqa: E402
+
+
+@pytest.fixture
+def home(tmp_path, monkeypatch):
+    """Point the config directory at a fresh temporary home"""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def make_generator(home):
+    """Return a factory for generators sharing the temporary config directory"""
+    generators = []
+
+    def make():
+        generator = HashtagGeneratorCLI()
+        generators.append(generator)
+        return generator
+
+    yield make
+    for generator in generators:
+        generator.close()
+
+
+@pytest.fixture
+def generator(make_generator):
+    """A generator with default settings and an empty history"""
+    return make_generator()
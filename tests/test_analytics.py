@@ -0,0 +1,121 @@
+"""Count-min sketch and space-saving top-K analytics"""
+
+import random
+from collections import Counter
+
+import pytest
+
+from analytics import CountMinSketch, TagAnalytics, TopK
+
+
+def zipf_stream(length, tags, seed):
+    """A skewed stream of tags, as real hashtag output tends to be"""
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(tags)]
+    return [f"#Tag{i}" for i in rng.choices(range(tags), weights, k=length)]
+
+
+def test_count_min_never_underestimates():
+    stream = zipf_stream(20000, 2000, seed=1)
+    sketch = CountMinSketch.from_error(0.001, 0.01)
+    sketch.add_counts(Counter(stream))
+    for tag in stream[:100]:
+        sketch.add(tag)
+    true_counts = Counter(stream) + Counter(stream[:100])
+
+    assert sketch.total == len(stream) + 100
+    for tag, count in true_counts.items():
+        assert count <= sketch.estimate(tag) <= count + 0.001 * sketch.total * 10
+
+
+def test_count_min_merge_equals_single_sketch():
+    stream = zipf_stream(10000, 1000, seed=2)
+    whole = CountMinSketch(200, 4)
+    whole.add_counts(Counter(stream))
+    first, second = CountMinSketch(200, 4), CountMinSketch(200, 4)
+    first.add_counts(Counter(stream[:3000]))
+    second.add_counts(Counter(stream[3000:]))
+
+    first.merge(second)
+    assert first.total == whole.total
+    assert first.rows == whole.rows
+    assert CountMinSketch.from_dict(first.to_dict()).rows == whole.rows
+
+
+def test_count_min_merge_requires_same_dimensions():
+    with pytest.raises(ValueError, match="Cannot merge"):
+        CountMinSketch(100, 4).merge(CountMinSketch(200, 4))
+
+
+def check_space_saving(top, true_counts, total):
+    """Counts bound the truth, and every frequent enough tag is present"""
+    for tag, (count, error) in top.counts.items():
+        assert count - error <= true_counts[tag] <= count
+    for tag, count in true_counts.items():
+        if count > total / top.capacity:
+            assert tag in top.counts
+
+
+def test_top_k_bounds():
+    stream = zipf_stream(20000, 5000, seed=3)
+    top = TopK(50)
+    for tag in stream:
+        top.add(tag)
+
+    true_counts = Counter(stream)
+    check_space_saving(top, true_counts, len(stream))
+    assert top.top(1)[0][0] == "#Tag0"
+    assert len(top.counts) == 50
+
+
+def test_top_k_merge_keeps_guarantees():
+    stream = zipf_stream(20000, 5000, seed=4)
+    parts = [stream[:5000], stream[5000:12000], stream[12000:]]
+    merged = TopK(50)
+    for part in parts:
+        top = TopK(50)
+        for tag, count in Counter(part).items():
+            top.add(tag, count)
+        merged.merge(top)
+
+    check_space_saving(merged, Counter(stream), len(stream))
+    assert [tag for tag, _, _ in merged.top(3)] == ["#Tag0", "#Tag1", "#Tag2"]
+    assert TopK.from_dict(merged.to_dict()).counts == merged.counts
+
+
+def test_tag_analytics_save_and_merge(tmp_path):
+    stream = zipf_stream(5000, 500, seed=5)
+    first = TagAnalytics.from_error(0.01, 0.01)
+    first.add_many(stream[:2000] + [""])
+    second = TagAnalytics.from_dimensions(first.dimensions)
+    second.add_many(stream[2000:])
+
+    first.save(tmp_path / "first.json")
+    loaded = TagAnalytics.load(tmp_path / "first.json")
+    loaded.merge(second)
+
+    assert loaded.total == len(stream)
+    tag, estimate, guaranteed = loaded.top(1)[0]
+    assert tag == "#Tag0"
+    assert guaranteed <= Counter(stream)[tag] <= estimate
+    assert loaded.estimate("#Unseen") <= 0.01 * len(stream) * 10
+
+
+def test_parallel_sketch_matches_batch(make_generator, tmp_path):
+    from exporters import open_exporter
+
+    input_file = tmp_path / "input.txt"
+    input_file.write_text("\n".join(tag[1:] for tag in zipf_stream(5000, 300, seed=6)) + "\n")
+
+    batch = make_generator()
+    batch.analytics = TagAnalytics.from_error(0.01, 0.01)
+    with open(input_file) as lines, open_exporter(str(tmp_path / "b.txt"), "text") as exporter:
+        batch.generate_batch(lines, exporter)
+
+    parallel = make_generator()
+    parallel.analytics = TagAnalytics.from_error(0.01, 0.01)
+    with open_exporter(str(tmp_path / "p.txt"), "text") as exporter:
+        parallel.generate_file_parallel(str(input_file), exporter, jobs=3)
+
+    assert parallel.analytics.sketch.rows == batch.analytics.sketch.rows
+    assert parallel.analytics.top(5)[0][0] == batch.analytics.top(5)[0][0] == "#Tag0"
@@ -0,0 +1,74 @@
+"""Result cache keyed by the settings fingerprint"""
+
+import json
+
+from transform import HashtagTransformer, ResultCache
+
+TEXTS = ["hello world", "café", "hello world", "", "snake_case", "café"]
+
+
+def test_lru_eviction():
+    cache = ResultCache(2, ("fingerprint",))
+    cache.put("a", "#A")
+    cache.put("b", "#B")
+    assert cache.get("a") == "#A"
+    cache.put("c", "#C")
+
+    # "b" was the least recently used
+    assert cache.get("b") is None
+    assert cache.get("a") == "#A"
+    assert cache.get("c") == "#C"
+    assert (cache.hits, cache.misses, len(cache)) == (3, 1, 2)
+
+
+def test_round_trip_keeps_most_recent_entries():
+    cache = ResultCache(3, (False, True, True, ""))
+    for text in "abcd":
+        cache.put(text, "#" + text.upper())
+
+    restored = ResultCache.from_dict(json.loads(json.dumps(cache.to_dict())), 2)
+
+    assert restored.fingerprint == cache.fingerprint
+    assert len(restored) == 2
+    assert restored.get("d") == "#D"
+    assert restored.get("b") is None
+
+
+def test_cached_results_match_uncached():
+    plain = HashtagTransformer(True, True)
+    cached = HashtagTransformer(True, True, ResultCache(100, ()))
+
+    assert cached.transform_many(TEXTS) == plain.transform_many(TEXTS)
+    # Second pass is served from the cache
+    assert cached.transform_many(TEXTS) == plain.transform_many(TEXTS)
+    assert [cached.transform(text) for text in TEXTS] == plain.transform_many(TEXTS)
+    assert cached.cache.misses == len(set(TEXTS))
+
+
+def test_settings_change_replaces_cache(generator):
+    generator.settings["cache_size"] = 10
+    assert generator.format_hashtag("hello world") == "#HelloWorld"
+    first = generator.cache
+
+    generator.settings["capitalize_first_letter"] = False
+    assert generator.format_hashtag("hello world") == "#helloworld"
+    assert generator.cache is not first
+    assert generator.cache.fingerprint == generator._settings_fingerprint()
+
+
+def test_persisted_cache_is_only_reused_with_same_settings(make_generator):
+    generator = make_generator()
+    generator.settings.update(cache_size=10, cache_persist=True)
+    generator.format_hashtag("hello world")
+    generator.close()
+    assert (generator.config_dir / "cache.json").exists()
+
+    warm = make_generator()
+    warm.settings.update(cache_size=10, cache_persist=True)
+    warm.format_hashtag("hello world")
+    assert (warm.cache.hits, warm.cache.misses) == (1, 0)
+
+    other = make_generator()
+    other.settings.update(cache_size=10, cache_persist=True, capitalize_first_letter=False)
+    assert other.format_hashtag("hello world") == "#helloworld"
+    assert (other.cache.hits, other.cache.misses) == (0, 1)
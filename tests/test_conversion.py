@@ -0,0 +1,113 @@
+"""Single-line, batch and parallel conversion give the same hashtags"""
+
+import json
+
+import pytest
+
+from exporters import open_exporter
+from suggest import SEQ_BITS
+
+LINES = [
+    "hello world",
+    "  leading and trailing spaces  ",
+    "already #Tagged text",
+    "special chars: a-b_c! (d)",
+    "Ünïcödé wörds façade",
+    "日本語 テキスト",
+    "tabs\tand\tmore   spaces",
+    "x",
+] * 50
+
+
+@pytest.fixture
+def input_file(tmp_path):
+    path = tmp_path / "input.txt"
+    path.write_text("\n".join(LINES) + "\n", encoding="utf-8")
+    return path
+
+
+def read_records(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def single_line_records(generator):
+    return [{"text": line.strip(), "hashtag": generator.generate_hashtag(line.strip())}
+            for line in LINES]
+
+
+@pytest.mark.parametrize("settings", [
+    {},
+    {"remove_special_chars": True},
+    {"capitalize_first_letter": False, "normalize_unicode": False},
+])
+def test_batch_matches_single_line(generator, tmp_path, input_file, settings):
+    generator.settings.update(settings)
+    expected = single_line_records(generator)
+
+    output = tmp_path / "batch.ndjson"
+    with open(input_file, encoding="utf-8") as lines, \
+            open_exporter(str(output), "ndjson", include_text=True) as exporter:
+        assert generator.generate_batch(lines, exporter) == len(LINES)
+
+    assert read_records(output) == expected
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_parallel_matches_single_line(generator, tmp_path, input_file, ordered):
+    expected = single_line_records(generator)
+
+    output = tmp_path / "parallel.ndjson"
+    with open_exporter(str(output), "ndjson", include_text=True) as exporter:
+        count = generator.generate_file_parallel(str(input_file), exporter, jobs=3,
+                                                 ordered=ordered)
+
+    assert count == len(LINES)
+    records = read_records(output)
+    if ordered:
+        assert records == expected
+    else:
+        key = lambda record: (record["text"], record["hashtag"])
+        assert sorted(records, key=key) == sorted(expected, key=key)
+
+
+def test_generate_many_matches_single_line(generator):
+    texts = [line.strip() for line in LINES]
+    expected = [record["hashtag"] for record in single_line_records(generator)]
+
+    assert generator.generate_many(texts) == expected
+
+
+def test_batch_and_parallel_history_match(make_generator, tmp_path, input_file):
+    batch = make_generator()
+    with open(input_file, encoding="utf-8") as lines, \
+            open_exporter(str(tmp_path / "batch.txt"), "text") as exporter:
+        batch.generate_batch(lines, exporter)
+
+    parallel = make_generator()
+    with open_exporter(str(tmp_path / "parallel.txt"), "text") as exporter:
+        parallel.generate_file_parallel(str(input_file), exporter, jobs=3)
+
+    assert parallel.history.to_list() == batch.history.to_list()
+    assert (tmp_path / "parallel.txt").read_text("utf-8") == \
+        (tmp_path / "batch.txt").read_text("utf-8")
+
+
+def test_parallel_suggestions_match_batch(make_generator, tmp_path, input_file, monkeypatch):
+    def suggestion_counts(generator):
+        index = generator.suggestions.load()
+        return {key: score >> SEQ_BITS for key, score in index.scores.items()}
+
+    batch = make_generator()
+    with open(input_file, encoding="utf-8") as lines, \
+            open_exporter(str(tmp_path / "batch.txt"), "text") as exporter:
+        batch.generate_batch(lines, exporter)
+
+    monkeypatch.setenv("HOME", str(tmp_path / "parallel-home"))
+    parallel = make_generator()
+    with open_exporter(str(tmp_path / "parallel.txt"), "text") as exporter:
+        parallel.generate_file_parallel(str(input_file), exporter, jobs=3)
+
+    assert suggestion_counts(parallel) == suggestion_counts(batch)
+    assert set(suggestion_counts(batch).values()) == {50}
+    assert parallel.suggest("#", 20) == batch.suggest("#", 20)
@@ -0,0 +1,107 @@
+"""Streaming NDJSON, CSV, JSON and gzip exporters"""
+
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+from exporters import format_for_filename, open_exporter
+
+TEXTS = ["hello world", 'quote " and, comma', "café", "line\nbreak", ""]
+HASHTAGS = ["#HelloWorld", '#Quote"And,Comma', "#Café", "#LineBreak", ""]
+SETTINGS = {"remove_special_chars": False, "capitalize_first_letter": True}
+
+
+def export(path, export_format=None, chunks=2, **options):
+    """Write TEXTS in several chunks and return the exported text"""
+    with open_exporter(str(path), export_format, **options) as exporter:
+        for i in range(chunks):
+            part = slice(i * len(TEXTS) // chunks, (i + 1) * len(TEXTS) // chunks)
+            exporter.write_records(TEXTS[part], HASHTAGS[part])
+    if str(path).endswith(".gz"):
+        with gzip.open(path, "rt", encoding="utf-8", newline="") as f:
+            return f.read()
+    with open(path, encoding="utf-8", newline="") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("filename, expected", [
+    (None, "text"), ("tags.txt", "text"), ("tags.ndjson", "ndjson"), ("tags.JSONL", "ndjson"),
+    ("tags.csv.gz", "csv"), ("tags.json", "json"), ("tags.json.gz", "json"),
+])
+def test_format_for_filename(filename, expected):
+    assert format_for_filename(filename) == expected
+
+
+@pytest.mark.parametrize("suffix", ["", ".gz"])
+def test_ndjson_round_trip(tmp_path, suffix):
+    data = export(tmp_path / f"out.ndjson{suffix}", include_text=True, settings=SETTINGS)
+    records = [json.loads(line) for line in data.splitlines()]
+    assert records == [{"text": text, "hashtag": hashtag, "settings": SETTINGS}
+                       for text, hashtag in zip(TEXTS, HASHTAGS)]
+
+
+@pytest.mark.parametrize("suffix", ["", ".gz"])
+@pytest.mark.parametrize("chunks", [1, 2, 5])
+def test_json_round_trip(tmp_path, suffix, chunks):
+    data = export(tmp_path / f"out.json{suffix}", chunks=chunks, include_text=True)
+    assert json.loads(data) == [{"text": text, "hashtag": hashtag}
+                                for text, hashtag in zip(TEXTS, HASHTAGS)]
+
+
+def test_empty_json_array(tmp_path):
+    with open_exporter(str(tmp_path / "out.json")):
+        pass
+    assert json.loads((tmp_path / "out.json").read_text()) == []
+
+
+@pytest.mark.parametrize("suffix", ["", ".gz"])
+@pytest.mark.parametrize("settings", [None, SETTINGS])
+def test_csv_round_trip(tmp_path, suffix, settings):
+    data = export(tmp_path / f"out.csv{suffix}", include_text=True, settings=settings)
+    rows = list(csv.DictReader(io.StringIO(data)))
+
+    expected = [{"text": text, "hashtag": hashtag} for text, hashtag in zip(TEXTS, HASHTAGS)]
+    if settings:
+        for row in expected:
+            row.update({name: str(value) for name, value in settings.items()})
+    assert rows == expected
+
+
+def test_text_output(tmp_path):
+    assert export(tmp_path / "out.txt") == "\n".join(HASHTAGS) + "\n"
+
+
+def test_csv_append_writes_header_once(tmp_path):
+    path = tmp_path / "out.csv"
+    for _ in range(2):
+        with open_exporter(str(path), append=True) as exporter:
+            exporter.write_records(["one"], ["#One"])
+    assert path.read_text() == "hashtag\n#One\n#One\n"
+
+
+@pytest.mark.parametrize("suffix", ["", ".gz"])
+def test_ndjson_append(tmp_path, suffix):
+    path = tmp_path / f"out.ndjson{suffix}"
+    for hashtag in ["#One", "#Two"]:
+        with open_exporter(str(path), append=True) as exporter:
+            exporter.write_records([hashtag], [hashtag])
+    opener = gzip.open if suffix else open
+    with opener(path, "rt") as f:
+        assert [json.loads(line)["hashtag"] for line in f] == ["#One", "#Two"]
+
+
+def test_json_cannot_be_appended(tmp_path):
+    with pytest.raises(ValueError, match="cannot be appended"):
+        open_exporter(str(tmp_path / "out.json"), append=True)
+
+
+def test_exporter_is_picklable_without_its_file(tmp_path):
+    import pickle
+
+    with open_exporter(str(tmp_path / "out.csv"), include_text=True) as exporter:
+        copy = pickle.loads(pickle.dumps(exporter))
+        assert copy.out is None
+        assert copy.format(["a"], ["#A"]) == exporter.format(["a"], ["#A"])
@@ -0,0 +1,57 @@
+"""Tests for the GUI's use of the shared CLI engine"""
+
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+import transform
+from main import HashtagGeneratorCLI
+
+pytest.importorskip("tkinter")
+
+GUI_MAIN = Path(__file__).resolve().parent.parent / "versions" / "GUI" / "main.py"
+
+
+@pytest.fixture(scope="module")
+def gui():
+    # Loaded under its own name, since the CLI's main.py is already "main"
+    spec = importlib.util.spec_from_file_location("gui_main", GUI_MAIN)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def gui_generator(gui, tmp_path, monkeypatch):
+    # The GUI keeps config.json and history.json in the working directory
+    monkeypatch.chdir(tmp_path)
+    return gui.HashtagGenerator()
+
+
+def test_gui_uses_the_cli_transformer(gui, gui_generator):
+    assert gui.HashtagTransformer is transform.HashtagTransformer
+    assert gui.ResultCache is transform.ResultCache
+    assert isinstance(gui_generator.get_transformer(), transform.HashtagTransformer)
+
+
+@pytest.mark.parametrize("text", ["hello world", "tabs\tand\nnewlines", "Ünïcode  café!", ""])
+def test_gui_and_cli_produce_the_same_hashtags(gui_generator, generator, text):
+    generator.settings["remove_special_chars"] = True
+    assert gui_generator.format_hashtag(text) == generator.format_hashtag(text)
+
+
+def test_gui_removes_all_whitespace(gui_generator):
+    assert gui_generator.format_hashtag("one\ttwo\nthree") == "#OneTwoThree"
+
+
+def test_gui_batch_matches_single_texts(gui_generator):
+    texts = ["first line", "second\tline", "first line"]
+    assert gui_generator.generate_many(texts) == [gui_generator.format_hashtag(t) for t in texts]
+    assert gui_generator.history.to_list() == ["#FirstLine", "#SecondLine"]
+
+
+def test_gui_cache_follows_settings(gui_generator):
+    assert gui_generator.format_hashtag("a-b c") == "#AbC"
+    gui_generator.settings["remove_special_chars"] = False
+    assert gui_generator.format_hashtag("a-b c") == "#A-BC"
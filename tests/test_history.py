@@ -0,0 +1,213 @@
+"""History persistence and moving history between backends"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from history import HashtagHistory, HistoryJournal, PackedHistory, SqliteHistory
+
+BACKENDS = ["json", "sqlite", "packed"]
+
+
+def settings_args(**changes):
+    """Arguments for update_settings that change only the given settings"""
+    args = SimpleNamespace(no_special=None, capitalize=None, normalize_unicode=None,
+                           history_size=None, cache_size=None, cache_persist=None,
+                           plugins=None, history_backend=None)
+    for name, value in changes.items():
+        setattr(args, name, value)
+    return args
+
+
+def convert(make_generator, *texts):
+    """Convert texts in a generator of their own, as separate CLI calls would"""
+    generator = make_generator()
+    hashtags = [generator.generate_hashtag(text) for text in texts]
+    generator.close()
+    return hashtags
+
+
+def stored_history(make_generator):
+    """Return the history a new CLI call sees, most recent first"""
+    return make_generator().history.to_list()
+
+
+def test_hashtag_history_moves_repeated_tags_to_front():
+    history = HashtagHistory(["#B", "#A"], max_items=3)
+    history.add("#C")
+    history.add("#A")
+    history.add("#D")
+
+    assert history.to_list() == ["#D", "#A", "#C"]
+    assert "#B" not in history
+
+
+def test_journal_is_folded_into_snapshot(home):
+    config_dir = home / "config"
+    journal = HistoryJournal(config_dir, max_items=5)
+    for tag in ["#One", "#Two", "#One"]:
+        journal.record(tag)
+    journal.flush()
+
+    assert journal.journal_file.exists()
+    assert HistoryJournal(config_dir, 5).load().to_list() == ["#One", "#Two"]
+
+    assert journal.compact().to_list() == ["#One", "#Two"]
+    assert not journal.journal_file.exists()
+    assert HistoryJournal(config_dir, 5).load().to_list() == ["#One", "#Two"]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_history_survives_restart(make_generator, backend):
+    generator = make_generator()
+    generator.update_settings(settings_args(history_backend=backend, history_size=3))
+    generator.close()
+
+    convert(make_generator, "one", "two")
+    convert(make_generator, "three", "four", "two")
+
+    assert stored_history(make_generator) == ["#Two", "#Four", "#Three"]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_clear_history(make_generator, backend):
+    generator = make_generator()
+    generator.update_settings(settings_args(history_backend=backend))
+    generator.close()
+    convert(make_generator, "one")
+
+    generator = make_generator()
+    generator.clear_history()
+    generator.close()
+
+    assert stored_history(make_generator) == []
+
+
+@pytest.mark.parametrize("backends", [
+    ["packed", "json"],
+    ["sqlite", "packed"],
+    ["packed", "sqlite", "json"],
+    ["sqlite", "json", "packed", "json"],
+])
+def test_switching_backends_keeps_history(make_generator, backends):
+    convert(make_generator, "one", "two", "three")
+    expected = ["#Three", "#Two", "#One"]
+
+    for step, backend in enumerate(backends):
+        generator = make_generator()
+        generator.update_settings(settings_args(history_backend=backend))
+        generator.close()
+        assert stored_history(make_generator) == expected
+
+        # Tags added under each backend move on with the rest
+        expected[:0] = convert(make_generator, f"step {step} {backend}")
+        assert stored_history(make_generator) == expected
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "packed"])
+def test_cleared_history_stays_cleared_after_migration(make_generator, backend):
+    convert(make_generator, "old secret")
+
+    generator = make_generator()
+    generator.update_settings(settings_args(history_backend=backend))
+    generator.close()
+    generator = make_generator()
+    generator.clear_history()
+    generator.close()
+
+    assert stored_history(make_generator) == []
+    assert not (generator.config_dir / "history.json").exists()
+    assert not (generator.config_dir / "history.journal").exists()
+
+
+def test_json_history_is_imported_once(make_generator):
+    convert(make_generator, "old secret")
+    generator = make_generator()
+    generator.settings["history_backend"] = "sqlite"
+    generator.save_settings()
+    generator.close()
+
+    # The next call finds the backend changed in config.json and imports
+    assert stored_history(make_generator) == ["#OldSecret"]
+    assert not (generator.config_dir / "history.json").exists()
+
+    generator = make_generator()
+    generator.clear_history()
+    generator.close()
+    assert stored_history(make_generator) == []
+
+
+def test_sqlite_add_many_matches_single_adds(home):
+    tags = ["#A", "#B", "#A", "#C", "#D", "#B", "#E"]
+    one_by_one = SqliteHistory(home / "one.db", max_items=4)
+    for tag in tags:
+        one_by_one.add(tag)
+    one_by_one.flush()
+    batched = SqliteHistory(home / "many.db", max_items=4)
+    batched.add_many(tags)
+    batched.flush()
+
+    assert batched.to_list() == one_by_one.to_list() == ["#E", "#B", "#D", "#C"]
+    use_count = "SELECT use_count FROM tags WHERE tag = '#B'"
+    assert batched._conn.execute(use_count).fetchone() == (2,)
+
+    # A later batch moves existing tags to the front and adds to their count
+    batched.add_many(["#C", "#F"])
+    batched.flush()
+    assert batched.to_list() == ["#F", "#C", "#E", "#B"]
+    assert batched._conn.execute(use_count.replace("#B", "#C")).fetchone() == (2,)
+    one_by_one.close()
+    batched.close()
+
+
+def test_packed_history_keeps_its_own_journal(home):
+    config_dir = home / "config"
+    json_history = HistoryJournal(config_dir, 10)
+    json_history.record("#Json")
+    json_history.flush()
+
+    packed = PackedHistory(config_dir, 10)
+    packed.add("#Packed")
+    packed.record("#Packed")
+    packed.compact()
+    packed.close()
+
+    assert HistoryJournal(config_dir, 10).load().to_list() == ["#Json"]
+    assert PackedHistory(config_dir, 10).to_list() == ["#Packed"]
+
+
+def test_packed_history_search_and_bound(home):
+    packed = PackedHistory(home / "config", max_items=3)
+    packed.import_tags(["#Gamma", "#Beta", "#Alpha", "#Alphabet"])
+
+    assert packed.to_list() == ["#Gamma", "#Beta", "#Alpha"]
+    assert packed.page(prefix="#Al") == ["#Alpha"]
+    assert packed.page(contains="et") == ["#Beta"]
+    assert "#Alphabet" not in packed
+    packed.close()
+
+
+def test_packed_compact_rewrites_only_when_needed(home, monkeypatch):
+    packed = PackedHistory(home / "config", max_items=3)
+    packed.import_tags(["#Gamma", "#Beta", "#Alpha"])
+    rewrites = []
+    rewrite = packed._rewrite_unlocked
+    monkeypatch.setattr(packed, "_rewrite_unlocked",
+                        lambda front: rewrites.append(front) or rewrite(front))
+
+    packed.compact()
+    packed.max_items = 5
+    packed.compact()
+    assert rewrites == []
+
+    packed.add("#Delta")
+    packed.record("#Delta")
+    packed.compact()
+    assert rewrites == [["#Delta"]]
+    assert not packed._journal.journal_file.exists()
+
+    packed.max_items = 2
+    packed.compact()
+    assert rewrites == [["#Delta"], []]
+    packed.close()
+    assert PackedHistory(home / "config", 5).to_list() == ["#Delta", "#Gamma"]
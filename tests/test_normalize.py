@@ -0,0 +1,65 @@
+"""Unicode normalization with cached code point class tables"""
+
+import json
+
+import pytest
+
+import normalize
+from normalize import TABLES_FILE, UnicodeTables
+from transform import HashtagTransformer
+
+
+@pytest.fixture(scope="module")
+def tables(tmp_path_factory):
+    """Tables built once and cached for every test in this module"""
+    tables = UnicodeTables(tmp_path_factory.mktemp("unicode"))
+    tables.load_classes()
+    return tables
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("ＦＵＬＬ width", "#FullWidth"),
+    ("ﬁne ligature", "#FineLigature"),
+    ("café déjà vu!", "#CaféDéjàVu"),
+    ("नमस्ते दुनिया", "#नमस्तेदुनिया"),
+    ("emoji 🎉 party", "#EmojiParty"),
+    ("thai​word", "#ThaiWord"),
+    ("snake_case and-dash", "#SnakecaseAnddash"),
+])
+def test_normalized_hashtags(tables, text, expected):
+    transformer = HashtagTransformer(True, True, tables=tables)
+    assert transformer.transform(text) == expected
+    assert transformer.transform_many([text, "plain"]) == [expected, "#Plain"]
+
+
+def test_special_characters_kept_when_not_removed(tables):
+    transformer = HashtagTransformer(False, True, tables=tables)
+    assert transformer.transform("ＦＵＬＬ-width!") == "#Full-Width!"
+
+
+def test_ascii_matches_filter_without_tables(tables):
+    texts = ["hello world", "a-b_c! (d)", "tabs\tand  spaces", "123 go"]
+    for remove_special in (True, False):
+        with_tables = HashtagTransformer(remove_special, True, tables=tables)
+        without = HashtagTransformer(remove_special, True)
+        assert with_tables.transform_many(texts) == without.transform_many(texts)
+
+
+def test_cached_tables_are_not_rebuilt(tables, monkeypatch):
+    def build_tables():
+        raise AssertionError("tables rebuilt")
+
+    monkeypatch.setattr(normalize, "build_tables", build_tables)
+    copy = UnicodeTables(tables.cache_dir)
+    assert copy.load_classes() == tables.load_classes()
+
+
+def test_stale_tables_are_rebuilt(tables, tmp_path, monkeypatch):
+    data = json.loads((tables.cache_dir / TABLES_FILE).read_text())
+    data["format"] = normalize.TABLES_FORMAT - 1
+    (tmp_path / TABLES_FILE).write_text(json.dumps(data))
+    monkeypatch.setattr(normalize, "build_tables", lambda: {"bmp": [], "astral": []})
+
+    assert UnicodeTables(tmp_path).load_classes() == {"bmp": [], "astral": []}
+    saved = json.loads((tmp_path / TABLES_FILE).read_text())
+    assert saved["format"] == normalize.TABLES_FORMAT
@@ -0,0 +1,132 @@
+"""Plugin pipeline: built-in plugins, plugin files and stage checks"""
+
+import pickle
+
+import pytest
+
+from plugins import PLUGINS_DIR, Pipeline, map_joined
+from stats import Stats
+from transform import HashtagTransformer
+
+TEXTS = ["the lord of the rings", "a day at the beach", "summer vibes", "x"]
+
+
+def convert(specs, texts=TEXTS, plugin_dir=None):
+    transformer = HashtagTransformer(True, True, pipeline=Pipeline(specs, plugin_dir))
+    return transformer.transform_many(texts)
+
+
+def write_plugin(directory, name, source):
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / f"{name}.py").write_text(source, encoding="utf-8")
+
+
+@pytest.mark.parametrize("specs, expected", [
+    (["stopwords"], ["#LordRings", "#DayBeach", "#SummerVibes", "#X"]),
+    (["stopwords=the,summer"], ["#LordOfRings", "#ADayAtBeach", "#Vibes", "#X"]),
+    (["max-length=6"], ["#TheLo", "#ADayA", "#Summe", "#X"]),
+    (["case=lower"], ["#thelordoftherings", "#adayatthebeach", "#summervibes", "#x"]),
+    (["case=upper"], ["#THELORDOFTHERINGS", "#ADAYATTHEBEACH", "#SUMMERVIBES", "#X"]),
+    (["case=camel"], ["#theLordOfTheRings", "#aDayAtTheBeach", "#summerVibes", "#x"]),
+    (["stopwords", "case=camel", "max-length=8"],
+     ["#lordRin", "#dayBeac", "#summerV", "#x"]),
+])
+def test_builtin_plugins(specs, expected):
+    assert convert(specs) == expected
+
+
+def test_single_text_matches_batch():
+    transformer = HashtagTransformer(True, True, pipeline=Pipeline(["stopwords", "case=camel"]))
+    assert [transformer.transform(text) for text in TEXTS] == transformer.transform_many(TEXTS)
+
+
+def test_stopwords_keep_words_containing_them():
+    assert convert(["stopwords"], ["theory of andromeda"]) == ["#TheoryAndromeda"]
+
+
+@pytest.mark.parametrize("spec, message", [
+    ("max-length", "needs a number"),
+    ("max-length=abc", "needs a number"),
+    ("max-length=1", "at least 2"),
+    ("case=title", "must be one of"),
+    ("no_such_plugin_xyz", "Unknown plugin 'no_such_plugin_xyz'"),
+])
+def test_bad_specs_rejected(spec, message):
+    with pytest.raises(ValueError, match=message):
+        Pipeline([spec])
+
+
+def test_plugin_file_from_plugins_dir(tmp_path):
+    plugin_dir = tmp_path / PLUGINS_DIR
+    write_plugin(plugin_dir, "suffix_test", (
+        "def register(pipeline, arg):\n"
+        "    suffix = arg or '2024'\n"
+        "    pipeline.add_stage('after', lambda bodies: [body + suffix for body in bodies])\n"))
+    assert convert(["suffix_test"], ["summer vibes"], plugin_dir) == ["#SummerVibes2024"]
+    assert convert(["suffix_test=Go"], ["summer vibes"], plugin_dir) == ["#SummerVibesGo"]
+
+
+def test_plugin_without_register_rejected(tmp_path):
+    plugin_dir = tmp_path / PLUGINS_DIR
+    write_plugin(plugin_dir, "no_register_test", "VALUE = 1\n")
+    with pytest.raises(ValueError, match="has no register"):
+        Pipeline(["no_register_test"], plugin_dir)
+
+
+@pytest.mark.parametrize("result", [[], ["one", "two", "three"]])
+def test_stage_returning_wrong_length_rejected(result):
+    pipeline = Pipeline()
+    pipeline.add_stage("after", lambda bodies: result, name="broken")
+    transformer = HashtagTransformer(True, True, pipeline=pipeline)
+    with pytest.raises(ValueError, match=f"'broken' returned {len(result)} items for a batch "
+                                         "of 2"):
+        transformer.transform_many(["a", "b"])
+
+
+def test_stage_may_return_any_iterable():
+    pipeline = Pipeline()
+    pipeline.add_stage("before", lambda texts: (text.upper() for text in texts), name="gen")
+    assert pipeline.run("before", ["a", "b"]) == ["A", "B"]
+
+
+def test_unknown_stage_point_rejected():
+    with pytest.raises(ValueError, match="Unknown stage point 'during'"):
+        Pipeline().add_stage("during", lambda items: items)
+
+
+def test_stages_recorded_in_stats():
+    stats = Stats()
+    pipeline = Pipeline(["stopwords", "case=lower"], stats=stats)
+    HashtagTransformer(True, True, pipeline=pipeline).transform_many(TEXTS)
+    stages = stats.to_dict()["stages"]
+    assert stages["plugin:stopwords"]["calls"] == 1
+    assert stages["plugin:case"]["calls"] == 1
+
+
+def test_pipeline_pickles_as_specs(tmp_path):
+    plugin_dir = tmp_path / PLUGINS_DIR
+    write_plugin(plugin_dir, "suffix_pickle_test", (
+        "def register(pipeline, arg):\n"
+        "    pipeline.add_stage('after', lambda bodies: [body + '!' for body in bodies])\n"))
+    pipeline = pickle.loads(pickle.dumps(Pipeline(["case=upper", "suffix_pickle_test"],
+                                                  plugin_dir)))
+    assert pipeline.specs == ["case=upper", "suffix_pickle_test"]
+    assert pipeline.run("after", ["ab", "c"]) == ["AB!", "C!"]
+
+
+def test_map_joined_falls_back_when_newlines_change():
+    assert map_joined(str.upper, ["a", "b"]) == ["A", "B"]
+    assert map_joined(lambda text: text.replace("\n", " "), ["a", "b"]) == ["a", "b"]
+    assert map_joined(str.upper, ["a\nb", "c"]) == ["A\nB", "C"]
+
+
+def test_generator_converts_with_configured_plugins(generator):
+    generator.settings["plugins"] = ["stopwords", "case=camel"]
+    assert generator.generate_hashtag("the end of summer") == "#endSummer"
+    assert generator.generate_many(["a walk in the park"]) == ["#walkPark"]
+
+
+def test_generator_warns_and_converts_without_broken_plugins(generator, capsys):
+    generator.settings["plugins"] = ["no_such_plugin_xyz"]
+    assert generator.generate_hashtag("summer vibes") == "#SummerVibes"
+    assert "Could not load plugins" in capsys.readouterr().err
@@ -0,0 +1,196 @@
+"""HTTP and daemon endpoints of the local server"""
+
+import json
+import asyncio
+import threading
+
+import pytest
+
+from server import HashtagServer, RequestError
+
+FAILING_PLUGIN = '''
+def register(pipeline, arg):
+    def fail(texts):
+        raise RuntimeError("plugin failed")
+    pipeline.add_stage("after", fail)
+'''
+
+
+@pytest.fixture
+def server(generator):
+    return HashtagServer(generator)
+
+
+@pytest.fixture
+def failing_plugin(generator):
+    plugin_dir = generator.config_dir / "plugins"
+    plugin_dir.mkdir(parents=True)
+    (plugin_dir / "fail.py").write_text(FAILING_PLUGIN)
+    generator.settings["plugins"] = ["fail"]
+
+
+def request(server, method, target, body=b"", headers=None):
+    """Dispatch a request, returning (status, content type, decoded body)"""
+    try:
+        status, content_type, payload = server.dispatch(method, target, headers or {}, body)
+    except RequestError as e:
+        return e.status, "application/json", json.loads(server._error(e))
+    if content_type == "application/x-ndjson":
+        return status, content_type, [json.loads(line) for line in payload.splitlines()]
+    return status, content_type, json.loads(payload)
+
+
+def test_health(server):
+    assert request(server, "GET", "/health") == (200, "application/json", {"status": "ok"})
+
+
+def test_hashtag_get_and_post(server, generator):
+    expected = generator.format_hashtag("hello world")
+
+    assert request(server, "GET", "/hashtag?text=hello%20world")[2] == {"hashtag": expected}
+    assert request(server, "POST", "/hashtag", b'{"text": "hello world"}')[2] == \
+        {"hashtag": expected}
+    assert request(server, "POST", "/hashtag", b'"hello world"')[2] == {"hashtag": expected}
+
+
+def test_batch_json_and_ndjson(server, generator):
+    texts = ["one", "two words", "Ünïcödé"]
+    expected = generator.get_transformer().transform_many(texts)
+
+    status, _, body = request(server, "POST", "/batch", json.dumps(texts).encode())
+    assert (status, body) == (200, {"hashtags": expected})
+
+    ndjson = "".join(json.dumps({"text": text}) + "\n" for text in texts).encode()
+    status, content_type, records = request(server, "POST", "/batch", ndjson,
+                                            {"content-type": "application/x-ndjson"})
+    assert (status, content_type) == (200, "application/x-ndjson")
+    assert records == [{"text": text, "hashtag": hashtag}
+                       for text, hashtag in zip(texts, expected)]
+
+
+@pytest.mark.parametrize("method, target, body, status", [
+    ("GET", "/missing", b"", 404),
+    ("DELETE", "/hashtag", b"", 405),
+    ("GET", "/batch", b"", 405),
+    ("POST", "/hashtag", b"{not json", 400),
+    ("POST", "/hashtag", b'{"text": 1}', 400),
+    ("POST", "/batch", b'{"text": "one"}', 400),
+])
+def test_request_errors(server, method, target, body, status):
+    code, _, payload = request(server, method, target, body)
+    assert code == status
+    assert "error" in payload
+
+
+def test_metrics_only_with_stats(server, generator):
+    assert request(server, "GET", "/metrics")[0] == 404
+
+    generator.enable_stats()
+    status, content_type, payload = server.dispatch("GET", "/metrics", {}, b"")
+    assert status == 200
+    assert content_type.startswith("text/plain")
+
+
+@pytest.mark.usefixtures("failing_plugin")
+@pytest.mark.parametrize("method, target, body", [
+    ("GET", "/hashtag?text=hello", b""),
+    ("POST", "/batch", b'["hello"]'),
+])
+def test_plugin_error_is_500(server, method, target, body):
+    status, _, payload = request(server, method, target, body)
+    assert status == 500
+    assert "plugin failed" in payload["error"]
+
+
+def test_requests_are_added_to_history(server, generator):
+    request(server, "GET", "/hashtag?text=first")
+    request(server, "POST", "/batch", b'["second", "third"]')
+    asyncio.run(server._flush_history())
+
+    assert generator.history.to_list()[:3] == ["#Third", "#Second", "#First"]
+
+
+async def exchange(server, raw):
+    """Send raw HTTP to a running server and read until it closes the connection"""
+    listener = await asyncio.start_server(server._handle_connection, "127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+    async with listener:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(raw)
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), 5)
+        writer.close()
+    return response
+
+
+def test_keep_alive_connection(server):
+    raw = (b"GET /hashtag?text=one HTTP/1.1\r\nHost: x\r\n\r\n"
+           b"GET /missing HTTP/1.1\r\nHost: x\r\n\r\n"
+           b"GET /health HTTP/1.1\r\nConnection: close\r\n\r\n")
+    response = asyncio.run(exchange(server, raw))
+
+    assert response.count(b"HTTP/1.1 ") == 3
+    assert b"HTTP/1.1 404 Not Found" in response
+    assert response.endswith(b'{"status": "ok"}')
+
+
+@pytest.mark.usefixtures("failing_plugin")
+def test_plugin_error_response_over_http(server):
+    raw = b"GET /hashtag?text=hello HTTP/1.1\r\nHost: x\r\n\r\n"
+    response = asyncio.run(exchange(server, raw))
+
+    head, _, body = response.partition(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 500 Internal Server Error")
+    assert b"Connection: close" in head
+    assert "plugin failed" in json.loads(body)["error"]
+
+
+def test_daemon_protocol(server, generator, tmp_path):
+    async def convert(text):
+        server.socket_path = tmp_path / "d.sock"
+        listener = await asyncio.start_unix_server(server._handle_daemon_client,
+                                                   path=str(server.socket_path))
+        async with listener:
+            reader, writer = await asyncio.open_unix_connection(str(server.socket_path))
+            writer.write(text.encode("utf-8"))
+            writer.write_eof()
+            reply = await asyncio.wait_for(reader.read(), 5)
+            writer.close()
+        return reply.decode("utf-8")
+
+    assert asyncio.run(convert("hello world\n")) == generator.format_hashtag("hello world")
+
+
+def test_daemon_rejects_oversized_requests(server, tmp_path, monkeypatch):
+    monkeypatch.setattr("server.MAX_BODY_BYTES", 16)
+
+    async def send(text):
+        path = str(tmp_path / "d.sock")
+        listener = await asyncio.start_unix_server(server._handle_daemon_client, path=path)
+        async with listener:
+            reader, writer = await asyncio.open_unix_connection(path)
+            writer.write(text.encode("utf-8"))
+            writer.write_eof()
+            reply = await asyncio.wait_for(reader.read(), 5)
+            writer.close()
+        return reply
+
+    assert asyncio.run(send("x" * 17)) == b""
+    assert asyncio.run(send("x" * 16)) == b"#" + b"X" + b"x" * 15
+
+
+def test_settings_reload_waits_for_the_history_thread(server, generator):
+    config = dict(generator.settings, history_max_items=3)
+    generator.config_dir.mkdir(parents=True, exist_ok=True)
+    (generator.config_dir / "config.json").write_text(json.dumps(config))
+
+    with server._history_lock:
+        reload = threading.Thread(target=request, args=(server, "GET", "/health"))
+        reload.start()
+        reload.join(0.2)
+        # The new bound is not applied while tags are being added
+        assert reload.is_alive()
+        assert generator.journal.max_items == 10
+    reload.join()
+
+    assert generator.journal.max_items == 3
@@ -0,0 +1,106 @@
+"""Stage timings and counters recorded with --stats"""
+
+import pickle
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from exporters import open_exporter
+from stats import Stats, utf8_size
+
+
+def run_batch(generator, tmp_path, lines):
+    with open_exporter(str(tmp_path / "out.txt"), "text") as exporter:
+        generator.generate_batch(lines, exporter)
+    return generator.collect_stats().counters
+
+
+@pytest.mark.parametrize("text", ["", "ascii", "café", "日本語", "🎉 emoji"])
+def test_utf8_size(text):
+    assert utf8_size(text) == len(text.encode("utf-8"))
+
+
+def test_stages_and_counters():
+    stats = Stats()
+    with stats.stage("read"):
+        pass
+    with stats.stage("read"):
+        pass
+    stats.count("tags_generated", 3)
+    stats.count("tags_generated")
+    stats.set("cache_hits", 7)
+
+    data = stats.to_dict()
+    assert data["stages"]["read"]["calls"] == 2
+    assert data["counters"] == {"tags_generated": 4, "cache_hits": 7}
+    metrics = stats.to_prometheus()
+    assert 'hashtag_stage_calls_total{stage="read"} 2' in metrics
+    assert "hashtag_tags_generated_total 4" in metrics
+    assert "tags_generated" in stats.summary()
+
+
+def test_counts_from_several_threads_add_up():
+    stats = Stats()
+
+    def work():
+        for _ in range(10000):
+            stats.count("tags_generated")
+            with stats.stage("history"):
+                pass
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert stats.counters["tags_generated"] == 40000
+    assert stats.stages["history"][0] == 40000
+
+
+def test_stats_survive_pickling():
+    stats = Stats()
+    stats.count("tags_generated", 2)
+    copy = pickle.loads(pickle.dumps(stats))
+    copy.count("tags_generated")
+    assert copy.counters == {"tags_generated": 3}
+
+
+def test_batch_counts_tags_and_utf8_bytes(generator, tmp_path):
+    generator.enable_stats()
+    counters = run_batch(generator, tmp_path, ["café au lait", "日本語"])
+
+    assert counters["tags_generated"] == 2
+    assert counters["input_bytes"] == len("café au lait\n日本語\n".encode("utf-8"))
+    output = (tmp_path / "out.txt").read_text("utf-8")
+    assert counters["output_bytes"] == len(output.encode("utf-8"))
+
+
+def test_repeated_texts_in_a_chunk_are_cache_hits(generator, tmp_path):
+    generator.settings["cache_size"] = 100
+    generator.enable_stats()
+    counters = run_batch(generator, tmp_path, ["same line"] * 1000 + ["other line"])
+
+    assert counters["cache_misses"] == 2
+    assert counters["cache_hits"] == 999
+
+
+def test_history_hits_come_from_history(generator, tmp_path):
+    generator.update_settings(SimpleNamespace(
+        no_special=None, capitalize=None, normalize_unicode=None, history_size=None,
+        cache_size=None, cache_persist=None, plugins=None, history_backend="sqlite"))
+    generator.generate_hashtag("known")
+    generator.enable_stats()
+    counters = run_batch(generator, tmp_path, ["same line"] * 1000 + ["known"])
+
+    assert counters["history_misses"] == 1
+    assert counters["history_hits"] == 1000
+
+
+def test_history_hits_are_not_guessed_without_loaded_history(generator, tmp_path):
+    generator.enable_stats()
+    counters = run_batch(generator, tmp_path, ["same line"] * 1000)
+
+    assert "history_hits" not in counters
+    assert "history_misses" not in counters
@@ -0,0 +1,136 @@
+"""Prefix index and suggestion store"""
+
+import random
+
+import pytest
+
+from suggest import (HEAVY_PREFIX_TAGS, RANKED_TAGS, SEQ_BITS, SUGGEST_MIN_ITEMS, PrefixIndex,
+                     SuggestionStore)
+
+
+def brute_force(uses, prefix, limit):
+    """Rank tags starting with prefix by use count, then by most recent use"""
+    counts = {}
+    last_use = {}
+    for position, tag in enumerate(uses):
+        key = tag.casefold()
+        counts[key] = counts.get(key, 0) + 1
+        last_use[key] = (position, tag)
+    keys = [key for key in counts if key.startswith(prefix.casefold())]
+    keys.sort(key=lambda key: (counts[key], last_use[key][0]), reverse=True)
+    return [last_use[key][1] for key in keys[:limit]]
+
+
+@pytest.fixture
+def uses():
+    """Enough uses that the short prefixes become heavy and get rankings"""
+    rng = random.Random(7)
+    words = ["#Summer", "#Sun", "#Sunset", "#Spring", "#Snow", "#Winter"]
+    return [f"{rng.choice(words)}{rng.randrange(300)}" for _ in range(5000)]
+
+
+def test_suggestions_rank_by_count_then_recency():
+    index = PrefixIndex()
+    for tag in ["#SummerVibes", "#SunnyDay", "#SummerVibes", "#SunnyDay", "#SunsetGlow"]:
+        index.add(tag)
+
+    assert index.suggest("#su") == ["#SunnyDay", "#SummerVibes", "#SunsetGlow"]
+    assert index.suggest("#SUMMER") == ["#SummerVibes"]
+    assert index.suggest("#x") == []
+    assert index.suggest("#su", 0) == []
+
+
+def test_heavy_prefixes_match_brute_force(uses):
+    index = PrefixIndex()
+    for tag in uses:
+        index.add(tag)
+
+    assert len(index) > HEAVY_PREFIX_TAGS
+    for prefix in ["", "#", "#s", "#su", "#sun", "#summer1", "#winter"]:
+        for limit in [5, RANKED_TAGS, RANKED_TAGS + 5]:
+            assert index.suggest(prefix, limit) == brute_force(uses, prefix, limit), prefix
+
+
+def test_add_counts_matches_single_adds(uses):
+    one_by_one = PrefixIndex()
+    for tag in uses:
+        one_by_one.add(tag)
+    counts = {}
+    for tag in uses:
+        counts[tag] = counts.pop(tag, 0) + 1
+    bulk = PrefixIndex()
+    bulk.add_counts(counts)
+
+    assert bulk.keys == one_by_one.keys
+    for prefix in ["#", "#s", "#sun", "#winter2"]:
+        assert bulk.suggest(prefix, 30) == one_by_one.suggest(prefix, 30)
+
+
+def test_prune_keeps_most_recent_tags(uses):
+    index = PrefixIndex()
+    for tag in uses:
+        index.add(tag)
+    recent = list(dict.fromkeys(tag.casefold() for tag in reversed(uses)))[:100]
+
+    index.prune(100)
+
+    assert len(index) == 100
+    assert sorted(index.keys) == sorted(recent)
+    assert set(index.scores) == set(index.tags) == set(recent)
+    kept = [tag for tag in uses if tag.casefold() in recent]
+    for prefix in ["#", "#s", "#sun"]:
+        assert [tag.casefold() for tag in index.suggest(prefix, 30)] == \
+            [tag.casefold() for tag in brute_force(kept, prefix, 30)]
+
+
+def test_index_round_trip(uses):
+    index = PrefixIndex()
+    for tag in uses:
+        index.add(tag)
+    restored = PrefixIndex.from_dict(index.to_dict())
+
+    assert restored.suggest("#s", 10) == index.suggest("#s", 10)
+    restored.add("#Snowfall")
+    assert "#Snowfall" in restored.suggest("#snowf")
+
+
+def test_store_is_bounded(home):
+    store = SuggestionStore(home / "config", max_items=10)
+    assert store.max_items == SUGGEST_MIN_ITEMS
+
+    tags = [f"#Tag{i}" for i in range(3 * SUGGEST_MIN_ITEMS)]
+    store.record_many(tags)
+    assert len(store._pending) == SUGGEST_MIN_ITEMS
+
+    index = store.load()
+    assert len(index) == SUGGEST_MIN_ITEMS
+    assert index.suggest(f"#Tag{len(tags) - 1}") == [tags[-1]]
+    assert index.suggest("#Tag0") == []
+
+    # The loaded index follows new tags and prunes itself past twice the bound
+    store.record_many([f"#More{i}" for i in range(SUGGEST_MIN_ITEMS + 1)])
+    assert len(index) <= 2 * SUGGEST_MIN_ITEMS
+    store.close()
+
+
+def test_store_persists_counts_across_processes(home):
+    config_dir = home / "config"
+    first = SuggestionStore(config_dir)
+    first.record_many(["#SummerVibes", "#SunnyDay", "#SunnyDay"])
+    first.close()
+    second = SuggestionStore(config_dir)
+    second.record_counts({"#SummerVibes": 2, "#Snow": 1})
+    second.close()
+
+    index = SuggestionStore(config_dir).load()
+    assert index.suggest("#s") == ["#SummerVibes", "#SunnyDay", "#Snow"]
+    assert index.scores["#summervibes"] >> SEQ_BITS == 3
+
+
+def test_generator_suggests_from_converted_text(generator):
+    for text in ["summer vibes", "summer vibes", "summer nights", "winter"]:
+        generator.generate_hashtag(text)
+
+    assert generator.suggest("summer") == ["#SummerVibes", "#SummerNights"]
+    assert generator.suggest("#Summer N") == []
+    assert generator.suggest("summer n") == ["#SummerNights"]
@@ -0,0 +1,128 @@
+"""Templates compiled once and rendered from CSV, NDJSON and text columns"""
+
+import io
+
+import pytest
+
+from templates import Template, input_format_for_filename, read_columns
+
+
+def render(generator, source, template, input_format="csv", chunk_rows=2):
+    template = Template(template)
+    out = io.StringIO()
+    chunks = read_columns(io.StringIO(source), input_format, template.columns, chunk_rows)
+    count = generator.generate_templated(chunks, out, template)
+    lines = out.getvalue().splitlines()
+    assert count == len(lines)
+    return lines
+
+
+def test_columns_and_hashtag_columns():
+    template = Template("{brand}: {#phrase} {#brand} {brand}")
+    assert template.columns == ["brand", "phrase"]
+    assert template.hashtag_columns == ["phrase", "brand"]
+    assert template.slots == [("brand", False), ("phrase", True), ("brand", True),
+                              ("brand", False)]
+
+
+@pytest.mark.parametrize("source, expected", [
+    ("{{literal}} {#text}", "{literal} #HelloWorld"),
+    ("{{{#text}}}", "{#HelloWorld}"),
+    ("}}{text}{{", "}hello world{"),
+    ("100% {#text} #{text}", "100% #HelloWorld #hello world"),
+    ("%s %(x)s {#text}", "%s %(x)s #HelloWorld"),
+])
+def test_literal_text_is_kept(source, expected):
+    template = Template(source)
+    assert template.render_many({"text": ["hello world"]}, {"text": ["#HelloWorld"]}) == [expected]
+
+
+@pytest.mark.parametrize("source, message", [
+    ("plain text", "no fields"),
+    ("{#}", "need a column name"),
+    ("{}", "need a column name"),
+    ("{text:>10}", "cannot have a format spec"),
+    ("{text!r}", "cannot have a format spec"),
+    ("{text", "Invalid template"),
+    ("text}", "Invalid template"),
+])
+def test_invalid_templates_rejected(source, message):
+    with pytest.raises(ValueError, match=message):
+        Template(source)
+
+
+@pytest.mark.parametrize("filename, expected", [
+    ("rows.csv", "csv"),
+    ("ROWS.CSV", "csv"),
+    ("rows.ndjson", "ndjson"),
+    ("rows.jsonl", "ndjson"),
+    ("rows.txt", "text"),
+    ("rows.csv.gz", "text"),
+    (None, "text"),
+])
+def test_input_format_for_filename(filename, expected):
+    assert input_format_for_filename(filename) == expected
+
+
+def test_csv_rows(generator):
+    source = ('brand,phrase,year\n'
+              'Acme,summer sale,2024\n'
+              '"Quote ""Co""","new, shiny things",2025\n'
+              'Short,only phrase\n')
+    assert render(generator, source, "{brand} {#phrase} #{year}") == [
+        "Acme #SummerSale #2024",
+        'Quote "Co" #New,ShinyThings #2025',
+        "Short #OnlyPhrase #",
+    ]
+
+
+def test_csv_missing_column_rejected(generator):
+    with pytest.raises(ValueError, match="Column 'year' is not in the CSV header"):
+        render(generator, "brand,phrase\nAcme,sale\n", "{#phrase} {year}")
+
+
+def test_empty_csv_renders_nothing(generator):
+    assert render(generator, "", "{#phrase}") == []
+
+
+def test_ndjson_rows(generator):
+    source = ('{"phrase": "summer sale", "year": 2024}\n'
+              '\n'
+              '{"phrase": "winter", "year": null, "tags": ["a", "b"]}\n'
+              '{"year": "soon"}\n')
+    assert render(generator, source, "{#phrase} {year} {tags}", "ndjson") == [
+        "#SummerSale 2024 ",
+        '#Winter  ["a", "b"]',
+        " soon ",
+    ]
+
+
+def test_ndjson_lines_must_be_objects(generator):
+    with pytest.raises(ValueError, match="must be a JSON object"):
+        render(generator, '{"phrase": "a"}\n["phrase"]\n', "{#phrase}", "ndjson")
+
+
+def test_text_rows(generator):
+    assert render(generator, "hello world\n  padded line  \n", "{text} -> {#text}", "text") == [
+        "hello world -> #HelloWorld",
+        "padded line -> #PaddedLine",
+    ]
+
+
+def test_text_input_only_has_text_column(generator):
+    with pytest.raises(ValueError, match="only has the column 'text', not 'phrase'"):
+        render(generator, "hello\n", "{#phrase}", "text")
+
+
+def test_hashtags_match_batch_conversion_and_reach_history(generator, make_generator):
+    phrases = ["summer sale", "new arrivals", "summer sale", "last chance"]
+    source = "phrase\n" + "\n".join(phrases) + "\n"
+    assert render(generator, source, "{#phrase}", chunk_rows=3) == make_generator().generate_many(
+        phrases)
+    assert generator.history.to_list() == ["#LastChance", "#SummerSale", "#NewArrivals"]
+
+
+def test_hashtag_columns_use_current_settings(generator):
+    generator.settings["capitalize_first_letter"] = False
+    generator.settings["plugins"] = ["max-length=6"]
+    assert render(generator, "phrase\nsummer sale\n", "{#phrase}") == ["#summe"]
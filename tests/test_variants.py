@@ -0,0 +1,69 @@
+"""Several setting profiles converted in one pass with --variant"""
+
+import io
+import json
+
+import pytest
+
+from transform import VariantTransformer
+
+TEXTS = ["hello world", "café déjà vu!", "ＦＵＬＬ width", "snake_case and-dash", ""]
+
+SPECS = ["no-capitalize", "no-special", "no-special,no-capitalize", "no-normalize,keep-special"]
+
+
+def settings_for(spec):
+    """The settings a variant spec selects, starting from the defaults"""
+    from main import VARIANT_OPTIONS
+
+    settings = {}
+    for option in spec.split(","):
+        key, value = VARIANT_OPTIONS[option]
+        settings[key] = value
+    return settings
+
+
+def expected_column(make_generator, spec):
+    """Convert TEXTS one at a time with a generator set up like the variant"""
+    generator = make_generator()
+    generator.settings.update(settings_for(spec))
+    return [generator.format_hashtag(text) for text in TEXTS]
+
+
+def test_each_variant_matches_its_settings(generator, make_generator):
+    variants = [generator.parse_variant(spec) for spec in SPECS]
+    columns = VariantTransformer(variants).transform_many(TEXTS)
+
+    assert [name for name, _ in variants] == SPECS
+    for spec, column in zip(SPECS, columns):
+        assert column == expected_column(make_generator, spec), spec
+
+
+def test_texts_with_newlines_are_converted_one_by_one(generator):
+    variants = [generator.parse_variant(spec) for spec in ["capitalize", "no-capitalize"]]
+    columns = VariantTransformer(variants).transform_many(["two\nlines", "one line"])
+
+    assert columns == [["#TwoLines", "#OneLine"], ["#twolines", "#oneline"]]
+
+
+def test_unknown_option_is_rejected(generator):
+    with pytest.raises(ValueError, match="Unknown variant option 'shout'"):
+        generator.parse_variant("no-special,shout")
+
+
+@pytest.mark.parametrize("output_format", ["tsv", "ndjson"])
+def test_generate_variants_output(generator, make_generator, output_format):
+    variants = [generator.parse_variant(spec) for spec in SPECS]
+    out = io.StringIO()
+
+    assert generator.generate_variants(TEXTS, out, variants, output_format) == len(TEXTS)
+
+    columns = [expected_column(make_generator, spec) for spec in SPECS]
+    rows = out.getvalue().split("\n")[:-1]
+    if output_format == "tsv":
+        assert rows == ["\t".join(row) for row in zip(*columns)]
+    else:
+        assert [json.loads(row) for row in rows] == [
+            {"text": text, **dict(zip(SPECS, row))} for text, row in zip(TEXTS, zip(*columns))]
+    # Variants are alternatives, none of them is added to history
+    assert generator.history.to_list() == []
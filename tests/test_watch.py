@@ -0,0 +1,174 @@
+"""Follow mode: appended lines, partial lines, rotation, truncation and checkpoints"""
+
+import os
+
+import pytest
+
+import watch
+from exporters import open_exporter
+from watch import FollowedFile, follow, load_checkpoint
+
+
+def append(path, data):
+    with open(path, "ab") as f:
+        f.write(data.encode("utf-8") if isinstance(data, str) else data)
+
+
+def read_new(followed):
+    """Return every line handed out by one read_lines() pass"""
+    return [line for lines in followed.read_lines() for line in lines]
+
+
+@pytest.fixture
+def log(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_text("")
+    return path
+
+
+@pytest.fixture
+def followed(log):
+    f = FollowedFile(log)
+    yield f
+    f.close()
+
+
+def test_appended_lines(log, followed):
+    assert read_new(followed) == []
+    append(log, "first line\nsecond line\n")
+    assert read_new(followed) == ["first line", "second line"]
+    assert read_new(followed) == []
+    append(log, "third line\n")
+    assert read_new(followed) == ["third line"]
+
+
+def test_partial_line_waits_for_newline(log, followed):
+    append(log, "complete\nhalf a li")
+    assert read_new(followed) == ["complete"]
+    assert followed.offset == len("complete\n")
+    assert read_new(followed) == []
+    append(log, "ne\n")
+    assert read_new(followed) == ["half a line"]
+    assert followed.offset == os.path.getsize(log)
+
+
+def test_multibyte_character_split_across_reads(log, followed, monkeypatch):
+    monkeypatch.setattr(watch, "WATCH_READ_SIZE", 3)
+    append(log, "café\nnaïve\n")
+    assert read_new(followed) == ["café", "naïve"]
+
+
+def test_rotation_finishes_old_file_then_reads_new_one(log, followed):
+    append(log, "before rotation\n")
+    assert read_new(followed) == ["before rotation"]
+
+    append(log, "late line\nno newline")
+    os.rename(log, str(log) + ".1")
+    assert read_new(followed) == ["late line"]
+
+    log.write_text("new file line\n")
+    assert read_new(followed) == ["no newline", "new file line"]
+
+
+def test_truncation_reads_from_the_top(log, followed):
+    append(log, "old line one\nold line two\n")
+    assert read_new(followed) == ["old line one", "old line two"]
+    with open(log, "r+b") as f:
+        f.truncate(0)
+    append(log, "fresh\n")
+    assert read_new(followed) == ["fresh"]
+
+
+def test_resume_from_state(log):
+    append(log, "one\ntwo\n")
+    first = FollowedFile(log)
+    assert read_new(first) == ["one", "two"]
+    state = first.state()
+    first.close()
+
+    append(log, "three\n")
+    resumed = FollowedFile(log, state)
+    assert read_new(resumed) == ["three"]
+    resumed.close()
+
+
+def test_resume_after_rotation_while_stopped(log):
+    append(log, "one\n")
+    first = FollowedFile(log)
+    assert read_new(first) == ["one"]
+    state = first.state()
+    first.close()
+
+    append(log, "two\n")
+    os.rename(log, str(log) + ".1")
+    log.write_text("three\n")
+    resumed = FollowedFile(log, state)
+    assert read_new(resumed) == ["two", "three"]
+    resumed.close()
+
+
+def test_resume_after_rewrite_while_stopped(log):
+    append(log, "original contents\n")
+    first = FollowedFile(log)
+    read_new(first)
+    state = first.state()
+    first.close()
+
+    # Same inode, same length or longer, but different leading bytes
+    with open(log, "r+b") as f:
+        f.write(b"rewritten content!\nmore\n")
+    resumed = FollowedFile(log, state)
+    assert read_new(resumed) == ["rewritten content!", "more"]
+    resumed.close()
+
+
+def test_missing_file_is_read_once_created(tmp_path):
+    path = tmp_path / "later.log"
+    followed = FollowedFile(path)
+    assert read_new(followed) == []
+    path.write_text("appeared\n")
+    assert read_new(followed) == ["appeared"]
+    followed.close()
+
+
+def run_once(generator, paths, output, checkpoint):
+    with open_exporter(str(output), "text", append=True) as exporter:
+        return follow(generator, [str(path) for path in paths], exporter, checkpoint,
+                      once=True)
+
+
+def test_follow_converts_and_checkpoints(generator, tmp_path, log):
+    output = tmp_path / "out.txt"
+    checkpoint = tmp_path / "watch.json"
+    append(log, "summer vibes\nbeach day\npartial")
+
+    assert run_once(generator, [log], output, checkpoint) == 2
+    assert output.read_text().splitlines() == ["#SummerVibes", "#BeachDay"]
+    entry = load_checkpoint(str(checkpoint))[str(log)]
+    assert entry["offset"] == len("summer vibes\nbeach day\n")
+
+    append(log, " line\n")
+    assert run_once(generator, [log], output, checkpoint) == 1
+    assert run_once(generator, [log], output, checkpoint) == 0
+    assert output.read_text().splitlines() == ["#SummerVibes", "#BeachDay", "#PartialLine"]
+    assert generator.history.to_list()[:3] == ["#PartialLine", "#BeachDay", "#SummerVibes"]
+
+
+def test_follow_several_files(generator, tmp_path, log):
+    other = tmp_path / "other.log"
+    append(log, "from app\n")
+    other.write_text("from other\n")
+    output = tmp_path / "out.txt"
+
+    assert run_once(generator, [log, other], output, tmp_path / "watch.json") == 2
+    assert output.read_text().splitlines() == ["#FromApp", "#FromOther"]
+
+
+def test_bad_checkpoint_is_ignored(tmp_path, capsys):
+    checkpoint = tmp_path / "watch.json"
+    checkpoint.write_text("{not json")
+    assert load_checkpoint(str(checkpoint)) == {}
+    assert "Could not load watch checkpoint" in capsys.readouterr().err
+    checkpoint.write_text('{"format": 0, "files": {"x": {}}}')
+    assert load_checkpoint(str(checkpoint)) == {}
+    assert load_checkpoint(str(tmp_path / "missing.json")) == {}
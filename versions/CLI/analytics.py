@@ -0,0 +1,288 @@
+"""Bounded-memory frequency analytics for hashtag streams
+
+CountMinSketch estimates how often any tag was seen and TopK tracks the
+most frequent tags with the space-saving algorithm. Both use a fixed
+amount of memory chosen from error bounds, and sketches built by separate
+runs or worker processes can be merged into one.
+"""
+
+import sys
+import math
+import json
+import base64
+import hashlib
+import heapq
+import operator
+from array import array
+from collections import Counter
+from pathlib import Path
+
+from history import atomic_write_json
+
+# Bump whenever the saved sketch layout changes
+SKETCH_FORMAT = 1
+
+
+class CountMinSketch:
+    """Approximate counts that never underestimate
+
+    With width ceil(e / epsilon) and depth ceil(ln(1 / delta)), an estimate
+    exceeds the true count by more than epsilon * total with probability
+    at most delta.
+    """
+
+    def __init__(self, width, depth):
+        self.width = width
+        self.depth = depth
+        self.total = 0
+        self.rows = [array("q", bytes(8 * width)) for _ in range(depth)]
+
+    @classmethod
+    def from_error(cls, epsilon, delta):
+        """Size a sketch for the given error bound and failure probability"""
+        return cls(math.ceil(math.e / epsilon), math.ceil(math.log(1 / delta)))
+
+    def _columns(self, tag):
+        """Return the counter index of tag in each row
+
+        Uses two halves of one stable digest (Python's own str hash is
+        salted per process, which would make sketches unmergeable).
+        """
+        digest = hashlib.blake2b(tag.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        step = int.from_bytes(digest[8:], "little") | 1
+        width = self.width
+        return [(first + i * step) % width for i in range(self.depth)]
+
+    def add(self, tag, count=1):
+        """Count tag count more times"""
+        self.total += count
+        for row, column in zip(self.rows, self._columns(tag)):
+            row[column] += count
+
+    def add_counts(self, counts):
+        """Add a mapping of tag -> count, hashing inline to save calls per tag"""
+        rows = self.rows
+        width = self.width
+        blake2b = hashlib.blake2b
+        from_bytes = int.from_bytes
+        for tag, count in counts.items():
+            digest = blake2b(tag.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+            # Same columns as _columns: first + i * step for row i
+            column = from_bytes(digest[:8], "little")
+            step = from_bytes(digest[8:], "little") | 1
+            for row in rows:
+                row[column % width] += count
+                column += step
+            self.total += count
+
+    def estimate(self, tag):
+        """Return an upper bound on how often tag was counted"""
+        return min(row[column] for row, column in zip(self.rows, self._columns(tag)))
+
+    def merge(self, other):
+        """Add the counts of a sketch with the same dimensions"""
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError(f"Cannot merge a {other.width}x{other.depth} count-min sketch "
+                             f"into a {self.width}x{self.depth} one")
+        self.total += other.total
+        for row, other_row in zip(self.rows, other.rows):
+            row[:] = array("q", map(operator.add, row, other_row))
+
+    def to_dict(self):
+        """Return the sketch as JSON-serializable data"""
+        rows = []
+        for row in self.rows:
+            if sys.byteorder != "little":
+                row = array("q", row)
+                row.byteswap()
+            rows.append(base64.b64encode(row.tobytes()).decode("ascii"))
+        return {"width": self.width, "depth": self.depth, "total": self.total, "rows": rows}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a sketch saved with to_dict"""
+        sketch = cls(data["width"], data["depth"])
+        sketch.total = data["total"]
+        for row, encoded in zip(sketch.rows, data["rows"]):
+            row[:] = array("q", base64.b64decode(encoded))
+            if sys.byteorder != "little":
+                row.byteswap()
+        return sketch
+
+
+class TopK:
+    """Heavy hitters tracked with the space-saving algorithm
+
+    At most capacity tags are counted. A new tag replaces the one with the
+    lowest count and inherits that count as its possible overcount, so
+    every count is at most total / capacity too high and any tag seen more
+    often than that is guaranteed to be present.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        # Tag -> [count, maximum overcount]
+        self.counts = {}
+        # (count, tag) pairs; entries whose count is out of date are skipped
+        self._heap = []
+
+    def _push(self, count, tag):
+        heap = self._heap
+        if len(heap) > 4 * self.capacity:
+            # Drop the out-of-date entries once they outnumber the live ones
+            heap[:] = [(entry[0], key) for key, entry in self.counts.items()]
+            heapq.heapify(heap)
+        heapq.heappush(heap, (count, tag))
+
+    def _pop_min(self):
+        """Remove and return the tag with the lowest count, and its entry"""
+        while True:
+            count, tag = heapq.heappop(self._heap)
+            entry = self.counts.get(tag)
+            if entry is not None and entry[0] == count:
+                del self.counts[tag]
+                return tag, entry
+
+    def min_count(self):
+        """Return the count a new tag would inherit, 0 until the table is full"""
+        if len(self.counts) < self.capacity:
+            return 0
+        while True:
+            count, tag = self._heap[0]
+            entry = self.counts.get(tag)
+            if entry is not None and entry[0] == count:
+                return count
+            heapq.heappop(self._heap)
+
+    def add(self, tag, count=1):
+        """Count tag count more times"""
+        entry = self.counts.get(tag)
+        if entry is not None:
+            entry[0] += count
+        elif len(self.counts) < self.capacity:
+            entry = self.counts[tag] = [count, 0]
+        else:
+            _, evicted = self._pop_min()
+            entry = self.counts[tag] = [evicted[0] + count, evicted[0]]
+        self._push(entry[0], tag)
+
+    def merge(self, other):
+        """Combine with another summary, keeping the same guarantees
+
+        A tag missing from one side may still have been seen there up to
+        that side's minimum count, which is added to both its count and
+        its overcount.
+        """
+        self_min, other_min = self.min_count(), other.min_count()
+        merged = {}
+        for tag in self.counts.keys() | other.counts.keys():
+            count, error = self.counts.get(tag, (self_min, self_min))
+            other_count, other_error = other.counts.get(tag, (other_min, other_min))
+            merged[tag] = [count + other_count, error + other_error]
+
+        capacity = max(self.capacity, other.capacity)
+        if len(merged) > capacity:
+            merged = dict(heapq.nlargest(capacity, merged.items(), key=lambda item: item[1][0]))
+        self.capacity = capacity
+        self.counts = merged
+        self._heap = [(entry[0], tag) for tag, entry in merged.items()]
+        heapq.heapify(self._heap)
+
+    def top(self, k):
+        """Return up to k (tag, count, overcount) tuples, most frequent first"""
+        items = heapq.nlargest(k, self.counts.items(), key=lambda item: item[1][0])
+        return [(tag, count, error) for tag, (count, error) in items]
+
+    def to_dict(self):
+        """Return the summary as JSON-serializable data"""
+        return {"capacity": self.capacity,
+                "items": [[tag, count, error] for tag, (count, error) in self.counts.items()]}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a summary saved with to_dict"""
+        top = cls(data["capacity"])
+        for tag, count, error in data["items"]:
+            top.counts[tag] = [count, error]
+        top._heap = [(entry[0], tag) for tag, entry in top.counts.items()]
+        heapq.heapify(top._heap)
+        return top
+
+
+class TagAnalytics:
+    """A count-min sketch and a top-K summary fed from the same stream"""
+
+    def __init__(self, sketch, top):
+        self.sketch = sketch
+        self.top_tags = top
+
+    @classmethod
+    def from_error(cls, epsilon, delta):
+        """Size both structures so counts are off by at most epsilon * total"""
+        return cls(CountMinSketch.from_error(epsilon, delta), TopK(math.ceil(1 / epsilon)))
+
+    @classmethod
+    def from_dimensions(cls, dimensions):
+        """Build an empty instance with the dimensions of another"""
+        width, depth, capacity = dimensions
+        return cls(CountMinSketch(width, depth), TopK(capacity))
+
+    @property
+    def dimensions(self):
+        return self.sketch.width, self.sketch.depth, self.top_tags.capacity
+
+    @property
+    def total(self):
+        return self.sketch.total
+
+    def add_many(self, hashtags):
+        """Count every non-empty hashtag in a chunk
+
+        Repeats within the chunk are folded together first, so each distinct
+        tag costs one update however often it occurs.
+        """
+        counts = Counter(hashtags)
+        counts.pop("", None)
+        self.sketch.add_counts(counts)
+        top_add = self.top_tags.add
+        for tag, count in counts.items():
+            top_add(tag, count)
+
+    def estimate(self, tag):
+        """Return an upper bound on how often tag was seen"""
+        estimate = self.sketch.estimate(tag)
+        entry = self.top_tags.counts.get(tag)
+        return min(estimate, entry[0]) if entry is not None else estimate
+
+    def top(self, k):
+        """Return up to k (tag, estimated count, guaranteed count) tuples
+
+        The true count lies between the guaranteed and the estimated count.
+        """
+        result = []
+        for tag, count, error in self.top_tags.top(k):
+            result.append((tag, min(count, self.sketch.estimate(tag)), count - error))
+        return result
+
+    def merge(self, other):
+        """Add the counts of another instance with the same sketch dimensions"""
+        self.sketch.merge(other.sketch)
+        self.top_tags.merge(other.top_tags)
+
+    def save(self, filename):
+        """Write the sketches to a JSON file"""
+        atomic_write_json(Path(filename), {
+            "format": SKETCH_FORMAT,
+            "count_min": self.sketch.to_dict(),
+            "top_k": self.top_tags.to_dict(),
+        }, indent=None)
+
+    @classmethod
+    def load(cls, filename):
+        """Read sketches written by save"""
+        with open(filename, "r") as f:
+            data = json.load(f)
+        if data.get("format") != SKETCH_FORMAT:
+            raise ValueError("unsupported sketch format")
+        return cls(CountMinSketch.from_dict(data["count_min"]), TopK.from_dict(data["top_k"]))
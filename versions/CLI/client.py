@@ -0,0 +1,77 @@
+"""Thin client for the Hashtag Generator daemon
+
+Converts text through a daemon started with `main.py --daemon`, which keeps
+settings and history loaded between calls. Only `-t TEXT` and piped input
+are sent to the daemon; any other arguments, or no running daemon, fall back
+to running main.py in this process. Imports are kept to a minimum so each
+call starts as fast as possible.
+"""
+
+import os
+import sys
+import socket
+
+
+def _socket_path():
+    """Return the daemon socket path, mirroring HashtagGeneratorCLI._get_config_dir"""
+    home = os.path.expanduser("~")
+
+    if sys.platform == "win32":
+        config_dir = os.path.join(home, "AppData", "Local", "HashtagGenerator")
+    elif sys.platform == "darwin":
+        config_dir = os.path.join(home, "Library", "Application Support", "HashtagGenerator")
+    else:  # Linux and other Unix-like
+        config_dir = os.path.join(home, ".config", "hashtag-generator")
+
+    # Same name as server.DAEMON_SOCKET_NAME
+    return os.path.join(config_dir, "daemon.sock")
+
+
+def request_hashtag(text, socket_path=None):
+    """Ask the daemon to convert text, raising OSError if it is not running"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path or _socket_path())
+        sock.sendall(text.encode("utf-8"))
+        sock.shutdown(socket.SHUT_WR)
+
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    return b"".join(chunks).decode("utf-8")
+
+
+def main():
+    """Convert through the daemon if possible, otherwise run main.py"""
+    args = sys.argv[1:]
+    text = None
+
+    if len(args) == 2 and args[0] in ("-t", "--text") and args[1]:
+        text = args[1]
+    elif not args and not sys.stdin.isatty():
+        text = sys.stdin.read().strip()
+        if not text:
+            return
+        args = ["-t", text]
+
+    if text is not None and hasattr(socket, "AF_UNIX"):
+        try:
+            hashtag = request_hashtag(text)
+            if hashtag:
+                print(hashtag)
+                return
+            # An empty reply means the daemon could not convert the text;
+            # converting in-process reports why
+        except (OSError, UnicodeError):
+            # No daemon running, fall back to converting in-process
+            pass
+
+    import main as cli
+    sys.argv = [sys.argv[0]] + args
+    cli.main()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""Streaming exporters for the Hashtag Generator CLI
+
+An exporter formats a whole chunk of records at once and hands the result
+to a large buffered write, so output of any size is produced in constant
+memory. Every record holds the hashtag and, if requested, the source text
+and the settings it was generated with. Output can be gzip-compressed on
+the fly.
+"""
+
+import io
+import os
+import csv
+import sys
+import gzip
+from itertools import repeat
+from json import dumps
+from json.encoder import encode_basestring
+
+EXPORT_FORMATS = ("text", "ndjson", "csv", "json")
+
+# File extensions that select a format when none is given
+FORMAT_EXTENSIONS = {".ndjson": "ndjson", ".jsonl": "ndjson", ".csv": "csv", ".json": "json"}
+
+# Buffer size for exported files, matching batch mode
+EXPORT_BUFFER_SIZE = 1024 * 1024
+
+# Fastest zlib level: output should keep up with the disk, and hashtags
+# compress well even so
+GZIP_LEVEL = 1
+
+
+def format_for_filename(filename):
+    """Return the format implied by a file name such as tags.csv.gz"""
+    if not filename:
+        return "text"
+    name = filename.lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    for extension, export_format in FORMAT_EXTENSIONS.items():
+        if name.endswith(extension):
+            return export_format
+    return "text"
+
+
+class Exporter:
+    """Base class: writes chunks of (text, hashtag) records to out
+
+    format() only depends on the options, not on out, so worker processes
+    can format chunks that the parent then passes to write().
+    """
+
+    def __init__(self, out, include_text=False, settings=None, close_out=True):
+        self.out = out
+        self.include_text = include_text
+        self.settings = settings
+        self.close_out = close_out
+
+    def __getstate__(self):
+        # Workers only format, the parent keeps the file
+        state = self.__dict__.copy()
+        state["out"] = None
+        return state
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def begin(self):
+        """Write anything that precedes the first record"""
+
+    def format(self, texts, hashtags):
+        """Return a chunk of records as one string"""
+        raise NotImplementedError
+
+    def write(self, data):
+        """Write a chunk returned by format()"""
+        self.out.write(data)
+
+    def write_records(self, texts, hashtags):
+        """Format and write a chunk, returning the number of characters written"""
+        data = self.format(texts, hashtags)
+        self.write(data)
+        return len(data)
+
+    def end(self):
+        """Write anything that follows the last record"""
+
+    def close(self):
+        """Finish the output and close the file unless it is stdout"""
+        self.end()
+        if self.close_out:
+            self.out.close()
+        else:
+            self.out.flush()
+
+
+class TextExporter(Exporter):
+    """One hashtag per line; the source text and settings are not written"""
+
+    def format(self, texts, hashtags):
+        return "\n".join(hashtags) + "\n" if hashtags else ""
+
+
+class NdjsonExporter(Exporter):
+    """One JSON object per line"""
+
+    def __init__(self, out, include_text=False, settings=None, close_out=True):
+        super().__init__(out, include_text, settings, close_out)
+        # The settings are the same for every record, so they are encoded once
+        self._suffix = "}"
+        if settings is not None:
+            self._suffix = ', "settings": ' + dumps(settings, ensure_ascii=False) + "}"
+
+    def _records(self, texts, hashtags):
+        """Return the encoded records of a chunk"""
+        suffix = self._suffix
+        if self.include_text:
+            return [f'{{"text": {text}, "hashtag": {hashtag}{suffix}'
+                    for text, hashtag in zip(map(encode_basestring, texts),
+                                             map(encode_basestring, hashtags))]
+        return [f'{{"hashtag": {hashtag}{suffix}' for hashtag in map(encode_basestring, hashtags)]
+
+    def format(self, texts, hashtags):
+        return "\n".join(self._records(texts, hashtags)) + "\n" if hashtags else ""
+
+
+class JsonExporter(NdjsonExporter):
+    """A single JSON array of records, streamed without holding it in memory"""
+
+    def __init__(self, out, include_text=False, settings=None, close_out=True):
+        super().__init__(out, include_text, settings, close_out)
+        self._empty = True
+
+    def begin(self):
+        self.out.write("[\n")
+
+    def format(self, texts, hashtags):
+        return ",\n".join(self._records(texts, hashtags))
+
+    def write(self, data):
+        if not data:
+            return
+        if not self._empty:
+            self.out.write(",\n")
+        self.out.write(data)
+        self._empty = False
+
+    def end(self):
+        self.out.write("]\n" if self._empty else "\n]\n")
+
+
+class CsvExporter(Exporter):
+    """Comma-separated values with a header row and one column per setting"""
+
+    def __init__(self, out, include_text=False, settings=None, close_out=True):
+        super().__init__(out, include_text, settings, close_out)
+        # The settings columns are the same in every row, so they are
+        # encoded once and appended to each line
+        self._suffix = ""
+        if settings:
+            buffer = io.StringIO()
+            csv.writer(buffer, lineterminator="").writerow(settings.values())
+            self._suffix = "," + buffer.getvalue()
+
+    def _columns(self):
+        columns = ["text", "hashtag"] if self.include_text else ["hashtag"]
+        return columns + list(self.settings or ())
+
+    def begin(self):
+        self.out.write(",".join(self._columns()) + "\n")
+
+    def _rows(self, columns):
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\n").writerows(zip(*columns))
+        return buffer.getvalue()
+
+    def format(self, texts, hashtags):
+        columns = [texts, hashtags] if self.include_text else [hashtags]
+        data = self._rows(columns)
+        if not self._suffix:
+            return data
+        # A field with a line break would make its row span several lines
+        if data.count("\n") == len(hashtags):
+            return data.replace("\n", self._suffix + "\n")
+        return self._rows(columns + [repeat(value) for value in self.settings.values()])
+
+
+EXPORTERS = {
+    "text": TextExporter,
+    "ndjson": NdjsonExporter,
+    "csv": CsvExporter,
+    "json": JsonExporter,
+}
+
+
+def open_output(filename, compress=False, append=False):
+    """Open filename for writing text, or stdout if filename is None
+
+    With append, output is added to the end of an existing file; gzip
+    output then becomes a new gzip member, which readers decompress as
+    part of the same stream.
+    """
+    if not compress:
+        if filename is None:
+            return sys.stdout
+        return open(filename, "a" if append else "w", buffering=EXPORT_BUFFER_SIZE)
+
+    if filename is None:
+        raw = gzip.GzipFile(fileobj=sys.stdout.buffer, mode="wb", compresslevel=GZIP_LEVEL)
+    else:
+        raw = gzip.GzipFile(filename, mode="ab" if append else "wb", compresslevel=GZIP_LEVEL)
+    # Closing the wrapper writes the gzip trailer but leaves stdout open
+    return io.TextIOWrapper(io.BufferedWriter(raw, EXPORT_BUFFER_SIZE))
+
+
+def open_exporter(filename, export_format=None, compress=None, include_text=False,
+                  settings=None, append=False):
+    """Open an exporter writing to filename, or to stdout if it is None
+
+    The format and compression default to what the file name implies.
+    With append, records are added after those already in the file and
+    a CSV header is only written to a new file. A JSON array cannot be
+    appended to.
+    """
+    if export_format is None:
+        export_format = format_for_filename(filename)
+    if compress is None:
+        compress = bool(filename) and filename.lower().endswith(".gz")
+    if append and export_format == "json":
+        raise ValueError("JSON output cannot be appended to, use ndjson")
+    started = (append and filename is not None and os.path.isfile(filename)
+               and os.path.getsize(filename) > 0)
+    out = open_output(filename, compress, append)
+    exporter = EXPORTERS[export_format](out, include_text, settings, close_out=out is not sys.stdout)
+    if not started:
+        exporter.begin()
+    return exporter
@@ -0,0 +1,964 @@
+"""History storage for the Hashtag Generator CLI"""
+
+import os
+import sys
+import json
+import time
+import mmap
+import zlib
+import struct
+from array import array
+from bisect import bisect_right
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from itertools import accumulate, chain, islice, takewhile
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Pending journal entries are written out once this many have accumulated
+JOURNAL_FLUSH_ITEMS = 50000
+
+# The journal is folded into the snapshot once it grows past this size
+JOURNAL_COMPACT_BYTES = 256 * 1024
+
+# Uncommitted SQLite history changes are committed once this many pile up
+SQLITE_COMMIT_ITEMS = 10000
+
+# Packed history file layout: magic, format version, tag count and hash
+# index slots, followed by count + 1 string table offsets (u64), the hash
+# index (u32) and the UTF-8 string table, all little-endian
+PACKED_MAGIC = b"HTGP"
+PACKED_FORMAT = 1
+PACKED_HEADER = struct.Struct("<4sIQQ")
+
+# Smaller packed files are searched without a hash index
+PACKED_INDEX_MIN_TAGS = 1024
+
+# The journal is folded into the packed file once it grows past a quarter
+# of the packed file, within these bounds, so rewriting a large file is
+# spread over many tags while replaying the journal on open stays quick
+PACKED_COMPACT_MIN_BYTES = JOURNAL_COMPACT_BYTES
+PACKED_COMPACT_MAX_BYTES = 16 * 1024 * 1024
+
+
+def atomic_write(path, write, mode="w"):
+    """Call write(f) on a temp file, then sync it and rename it over path"""
+    try:
+        file_mode = os.stat(path).st_mode & 0o777
+    except OSError:
+        file_mode = 0o644
+
+    import tempfile
+
+    fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        os.chmod(tmp_path, file_mode)
+        with os.fdopen(fd, mode) as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, str(path))
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_json(path, data, indent=2):
+    """Write data as JSON to path via a synced temp file and an atomic rename"""
+    atomic_write(path, lambda f: json.dump(data, f, indent=indent))
+
+
+class HashtagHistory:
+    """Bounded, most-recent-first hashtag history with O(1) add and lookup"""
+
+    def __init__(self, items=(), max_items=10):
+        """Build the history from a most-recent-first sequence of tags"""
+        # The most recent tag is kept at the end of the ordered dict
+        self._tags = OrderedDict()
+        self._max_items = max(0, max_items)
+        for tag in reversed(list(items)):
+            self.add(tag)
+
+    @property
+    def max_items(self):
+        """Maximum number of tags kept"""
+        return self._max_items
+
+    @max_items.setter
+    def max_items(self, value):
+        """Change the bound, evicting the oldest tags if needed"""
+        self._max_items = max(0, value)
+        while len(self._tags) > self._max_items:
+            self._tags.popitem(last=False)
+
+    def add(self, tag):
+        """Move tag to the front, returning True if the history changed"""
+        tags = self._tags
+        if tag in tags:
+            if next(reversed(tags)) == tag:
+                return False
+            tags.move_to_end(tag)
+            return True
+
+        if not self._max_items:
+            return False
+
+        tags[tag] = None
+        if len(tags) > self._max_items:
+            tags.popitem(last=False)
+        return True
+
+    def add_many(self, tags):
+        """Add tags in order, returning those that changed the history"""
+        return [tag for tag in tags if self.add(tag)]
+
+    def clear(self):
+        """Remove all tags"""
+        self._tags.clear()
+
+    def to_list(self):
+        """Return the tags most recent first, as stored in history.json"""
+        return list(reversed(self._tags))
+
+    def page(self, limit=None, offset=0, contains=None, prefix=None):
+        """Return up to limit tags, most recent first, after skipping offset"""
+        tags = iter(self)
+        if prefix:
+            tags = (tag for tag in tags if tag.startswith(prefix))
+        if contains:
+            tags = (tag for tag in tags if contains in tag)
+        stop = None if limit is None else offset + limit
+        return list(islice(tags, offset, stop))
+
+    def __contains__(self, tag):
+        return tag in self._tags
+
+    def __iter__(self):
+        return reversed(self._tags)
+
+    def __len__(self):
+        return len(self._tags)
+
+
+def recent_tags(hashtags, max_items):
+    """Return the distinct tags a history of max_items keeps after adding hashtags
+
+    The tags come oldest first, ready to be added in order. Only the end
+    of hashtags is scanned, so a bulk conversion can update history and
+    suggestions with a handful of tags per chunk.
+    """
+    recent = {}
+    if max_items > 0:
+        for hashtag in reversed(hashtags):
+            if hashtag and hashtag not in recent:
+                recent[hashtag] = None
+                if len(recent) >= max_items:
+                    break
+    return list(recent)[::-1]
+
+
+@contextmanager
+def file_lock(lock_file):
+    """Hold an exclusive lock on lock_file for the duration of the block"""
+    lock_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_file, "a+") as lock:
+        if fcntl:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        else:
+            lock.seek(0)
+            msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+            else:
+                lock.seek(0)
+                msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class HistoryJournal:
+    """Write-behind history persistence shared safely between processes
+
+    New tags are appended to history.journal, one JSON string per line, and
+    folded into the history.json snapshot during compaction. Every access to
+    the files happens under an exclusive lock on history.lock, so parallel
+    CLI processes can append without losing or corrupting each other's tags.
+    """
+
+    def __init__(self, config_dir, max_items=10, journal_name="history.journal"):
+        self.max_items = max_items
+        self.snapshot_file = config_dir / "history.json"
+        self.journal_file = config_dir / journal_name
+        self.lock_file = config_dir / "history.lock"
+        # Tags not yet written to the journal, oldest first
+        self._pending = OrderedDict()
+
+    def _locked(self):
+        """Hold the exclusive history lock for the duration of the block"""
+        return file_lock(self.lock_file)
+
+    def _read_unlocked(self):
+        """Rebuild history from the snapshot plus the journal"""
+        max_items = self.max_items
+        history = HashtagHistory(max_items=max_items)
+
+        if self.snapshot_file.exists():
+            try:
+                with open(self.snapshot_file, "r") as f:
+                    history = HashtagHistory(json.load(f), max_items)
+            except Exception as e:
+                print(f"Warning: Could not load history: {e}", file=sys.stderr)
+
+        if self.journal_file.exists():
+            with open(self.journal_file, "r") as f:
+                for line in f:
+                    try:
+                        history.add(json.loads(line))
+                    except ValueError:
+                        # Skip a line torn by a crash mid-write
+                        continue
+
+        return history
+
+    def load(self):
+        """Load the current history"""
+        if not (self.snapshot_file.exists() or self.journal_file.exists()):
+            return HashtagHistory(max_items=self.max_items)
+        with self._locked():
+            return self._read_unlocked()
+
+    def record(self, hashtag):
+        """Queue a tag for the journal, flushing once enough are pending"""
+        pending = self._pending
+        pending[hashtag] = None
+        # Only the latest position of a repeated tag matters on replay
+        pending.move_to_end(hashtag)
+        # Tags older than the history bound would be evicted on replay anyway
+        if len(pending) > self.max_items:
+            pending.popitem(last=False)
+        if len(pending) >= JOURNAL_FLUSH_ITEMS:
+            self.flush()
+
+    def flush(self):
+        """Write pending tags out, compacting if the journal has grown large"""
+        if self._flush_pending() >= JOURNAL_COMPACT_BYTES:
+            self.compact()
+
+    def _flush_pending(self):
+        """Append pending tags to the journal with a single synced write
+
+        Returns the journal size afterwards, or 0 if nothing was written.
+        """
+        if not self._pending:
+            return 0
+
+        data = "".join(json.dumps(tag) + "\n" for tag in self._pending)
+        with self._locked():
+            with open(self.journal_file, "a") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+                journal_size = f.tell()
+        self._pending.clear()
+        return journal_size
+
+    def compact(self):
+        """Fold the journal into the snapshot and return the merged history"""
+        self._flush_pending()
+        with self._locked():
+            history = self._read_unlocked()
+            atomic_write_json(self.snapshot_file, history.to_list())
+            if self.journal_file.exists():
+                os.unlink(self.journal_file)
+        return history
+
+    def clear(self):
+        """Drop all stored and pending history"""
+        self.replace([])
+
+    def replace(self, tags):
+        """Replace all stored and pending history with a most-recent-first sequence of tags"""
+        self._pending.clear()
+        with self._locked():
+            atomic_write_json(self.snapshot_file, HashtagHistory(tags, self.max_items).to_list())
+            if self.journal_file.exists():
+                os.unlink(self.journal_file)
+
+    def remove(self):
+        """Delete the snapshot and journal once their tags live in another store"""
+        self._pending.clear()
+        with self._locked():
+            for path in (self.snapshot_file, self.journal_file):
+                if path.exists():
+                    os.unlink(path)
+
+    def close(self):
+        """Flush pending tags before exit"""
+        self.flush()
+
+
+class SqliteHistory:
+    """History kept in an SQLite database instead of history.json
+
+    Tags are stored with first/last use timestamps and a use count. The
+    unique index on the tag serves prefix searches and, where SQLite has the
+    FTS5 trigram tokenizer, a trigram index serves substring searches, so
+    paging and searching never load the whole history into memory. The
+    history bound is applied when pending changes are committed.
+    """
+
+    def __init__(self, db_file, max_items=10):
+        import sqlite3
+
+        self.db_file = db_file
+        self.max_items = max_items
+        db_file.parent.mkdir(parents=True, exist_ok=True)
+        # The local HTTP service writes history from a single background thread
+        self._conn = sqlite3.connect(str(db_file), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._uncommitted = 0
+        self._has_fts = self._create_schema()
+
+    def _create_schema(self):
+        """Create the tables and indexes, returning True if FTS5 is available"""
+        with self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS tags (
+                    id INTEGER PRIMARY KEY,
+                    tag TEXT NOT NULL UNIQUE,
+                    first_used REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    use_count INTEGER NOT NULL DEFAULT 1,
+                    seq INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS tags_seq ON tags (seq);
+            """)
+
+        try:
+            with self._conn:
+                self._conn.executescript("""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS tags_fts USING fts5(
+                        tag, content='tags', content_rowid='id',
+                        tokenize='trigram case_sensitive 1'
+                    );
+                    CREATE TRIGGER IF NOT EXISTS tags_fts_insert AFTER INSERT ON tags BEGIN
+                        INSERT INTO tags_fts (rowid, tag) VALUES (new.id, new.tag);
+                    END;
+                    CREATE TRIGGER IF NOT EXISTS tags_fts_delete AFTER DELETE ON tags BEGIN
+                        INSERT INTO tags_fts (tags_fts, rowid, tag) VALUES ('delete', old.id, old.tag);
+                    END;
+                """)
+            return True
+        except self._conn.OperationalError:
+            # SQLite built without FTS5 or the trigram tokenizer
+            return False
+
+    def is_empty(self):
+        """Return True if no tags are stored"""
+        return self._conn.execute("SELECT 1 FROM tags LIMIT 1").fetchone() is None
+
+    def import_tags(self, tags):
+        """Import a most-recent-first sequence of tags, such as history.json"""
+        self.add_many(reversed(list(tags)))
+        self.flush()
+
+    def add(self, tag):
+        """Move tag to the front and count the use; always changes history"""
+        now = time.time()
+        self._conn.execute("""
+            INSERT INTO tags (tag, first_used, last_used, use_count, seq)
+            VALUES (?, ?, ?, 1, (SELECT COALESCE(MAX(seq), 0) + 1 FROM tags))
+            ON CONFLICT (tag) DO UPDATE SET
+                last_used = excluded.last_used,
+                use_count = use_count + 1,
+                seq = excluded.seq
+        """, (tag, now, now))
+
+        # Commit periodically so long runs don't block other processes
+        self._uncommitted += 1
+        if self._uncommitted >= SQLITE_COMMIT_ITEMS:
+            self._conn.commit()
+            self._uncommitted = 0
+        return True
+
+    def add_many(self, tags):
+        """Add tags in order in a single transaction, returning them all
+
+        Each distinct tag is written once with the number of times it was
+        used and the position of its last use. Tags the history bound
+        would evict before the batch ends are not written at all.
+        """
+        tags = list(tags)
+        if not tags:
+            return tags
+        counts = Counter(tags)
+        # Distinct tags ordered by their last use, most recent first
+        recent = list(islice(dict.fromkeys(reversed(tags)), max(0, self.max_items)))
+        recent.reverse()
+
+        now = time.time()
+        with self._conn:
+            seq = self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM tags").fetchone()[0]
+            self._conn.executemany("""
+                INSERT INTO tags (tag, first_used, last_used, use_count, seq)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (tag) DO UPDATE SET
+                    last_used = excluded.last_used,
+                    use_count = use_count + excluded.use_count,
+                    seq = excluded.seq
+            """, [(tag, now, now, counts[tag], seq + i) for i, tag in enumerate(recent, 1)])
+        self._uncommitted = 0
+        return tags
+
+    def record(self, hashtag):
+        """Nothing to queue, add() already wrote the tag"""
+
+    def flush(self):
+        """Apply the history bound and commit pending changes"""
+        self._conn.execute("""
+            DELETE FROM tags WHERE seq <= (
+                SELECT seq FROM tags ORDER BY seq DESC LIMIT 1 OFFSET ?
+            )
+        """, (max(0, self.max_items),))
+        self._conn.commit()
+        self._uncommitted = 0
+
+    def compact(self):
+        """Commit pending changes; the database needs no separate compaction"""
+        self.flush()
+        return self
+
+    def clear(self):
+        """Remove all tags"""
+        with self._conn:
+            self._conn.execute("DELETE FROM tags")
+
+    def replace(self, tags):
+        """Replace all tags with a most-recent-first sequence of tags"""
+        self.clear()
+        self.import_tags(tags)
+
+    def close(self):
+        """Commit pending changes and close the database"""
+        if self._conn is None:
+            return
+        self.flush()
+        self._conn.close()
+        self._conn = None
+
+    def page(self, limit=None, offset=0, contains=None, prefix=None):
+        """Return up to limit tags, most recent first, after skipping offset"""
+        where = []
+        params = []
+
+        if prefix:
+            # Range scan on the unique tag index
+            where.append("tag >= ? AND tag < ?")
+            params += [prefix, prefix + "\U0010ffff"]
+
+        if contains:
+            # The trigram index only matches queries of three or more characters
+            if self._has_fts and len(contains) >= 3:
+                where.append("id IN (SELECT rowid FROM tags_fts WHERE tags_fts MATCH ?)")
+                params.append('"' + contains.replace('"', '""') + '"')
+            else:
+                where.append("instr(tag, ?) > 0")
+                params.append(contains)
+
+        query = "SELECT tag FROM tags"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += " ORDER BY seq DESC LIMIT ? OFFSET ?"
+        params += [-1 if limit is None else limit, offset]
+
+        return [row[0] for row in self._conn.execute(query, params)]
+
+    def to_list(self):
+        """Return all tags most recent first"""
+        return self.page()
+
+    def __contains__(self, tag):
+        return self._conn.execute("SELECT 1 FROM tags WHERE tag = ?", (tag,)).fetchone() is not None
+
+    def __iter__(self):
+        return (row[0] for row in self._conn.execute("SELECT tag FROM tags ORDER BY seq DESC"))
+
+    def __bool__(self):
+        return not self.is_empty()
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM tags").fetchone()[0]
+
+
+def _encode_tag(tag):
+    return tag.encode("utf-8", "surrogatepass")
+
+
+def write_packed_tags(path, tags):
+    """Write UTF-8 encoded tags, most recent first, as a packed history file"""
+    offsets = array("Q", [0])
+    offsets.extend(accumulate(map(len, tags)))
+    _write_packed(path, offsets, map(zlib.crc32, tags), lambda f: f.writelines(tags))
+
+
+def _write_packed(path, offsets, hashes, write_strings):
+    """Write a packed history file from its string table offsets
+
+    hashes yields crc32 of every tag in order, and write_strings(f) writes
+    the string table. Tag i is found in the hash index by probing linearly
+    from its hash modulo the slot count for a slot holding i + 1.
+    """
+    count = len(offsets) - 1
+    slots = 0
+    index = array("I")
+    if count >= PACKED_INDEX_MIN_TAGS:
+        # At most half full, so probe sequences stay short
+        slots = 1 << (2 * count - 1).bit_length()
+        index = array("I", bytes(4 * slots))
+        mask = slots - 1
+        for number, tag_hash in enumerate(hashes, 1):
+            slot = tag_hash & mask
+            while index[slot]:
+                slot = (slot + 1) & mask
+            index[slot] = number
+    if sys.byteorder != "little":
+        offsets.byteswap()
+        index.byteswap()
+
+    def write(f):
+        f.write(PACKED_HEADER.pack(PACKED_MAGIC, PACKED_FORMAT, count, slots))
+        f.write(offsets.tobytes())
+        f.write(index.tobytes())
+        write_strings(f)
+
+    atomic_write(path, write, "wb")
+
+
+class PackedTags:
+    """Read-only view of a packed history file through mmap
+
+    Nothing is parsed up front: the offsets and the hash index are used
+    in place, and a tag is only decoded when it is returned.
+    """
+
+    def __init__(self, path=None):
+        self.count = 0
+        # Size of the mapped file in bytes
+        self.size = 0
+        self._map = None
+        self._views = []
+        self._offsets = array("Q", [0])
+        self._index = array("I")
+        self._strings = 0
+        if path is None or not path.exists():
+            return
+
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < PACKED_HEADER.size:
+                raise ValueError("packed history file is truncated")
+            # The mapping stays valid after the file is closed
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._load()
+        except BaseException:
+            self.close()
+            raise
+
+    def _load(self):
+        magic, version, count, slots = PACKED_HEADER.unpack_from(self._map)
+        if magic != PACKED_MAGIC or version != PACKED_FORMAT:
+            raise ValueError("unsupported packed history format")
+        offsets_start = PACKED_HEADER.size
+        index_start = offsets_start + 8 * (count + 1)
+        self._strings = index_start + 4 * slots
+        if len(self._map) < self._strings:
+            raise ValueError("packed history file is truncated")
+
+        view = memoryview(self._map)
+        self._views.append(view)
+        offsets = view[offsets_start:index_start].cast("Q")
+        index = view[index_start:self._strings].cast("I")
+        self._views += [offsets, index]
+        if sys.byteorder != "little":
+            offsets = array("Q", offsets)
+            offsets.byteswap()
+            index = array("I", index)
+            index.byteswap()
+        if len(self._map) < self._strings + offsets[count]:
+            raise ValueError("packed history file is truncated")
+        self._offsets = offsets
+        self._index = index
+        self.count = count
+        self.size = len(self._map)
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def offsets(self):
+        """String table offsets, one more than there are tags"""
+        return self._offsets
+
+    def strings(self, start, stop):
+        """Return the string table bytes of tags start to stop, without copying"""
+        base = self._strings
+        return self._views[0][base + self._offsets[start]:base + self._offsets[stop]]
+
+    def raw(self, i):
+        """Return the encoded tag i"""
+        start = self._strings
+        return self._map[start + self._offsets[i]:start + self._offsets[i + 1]]
+
+    def tag(self, i):
+        """Return tag i, counting from the most recent"""
+        return self.raw(i).decode("utf-8", "surrogatepass")
+
+    def tags(self, start=0, stop=None):
+        """Yield the tags from start up to stop, decoding them one at a time"""
+        stop = self.count if stop is None else min(stop, self.count)
+        for i in range(start, stop):
+            yield self.tag(i)
+
+    def find(self, tag):
+        """Return the position of tag, or -1 if it is not stored"""
+        encoded = _encode_tag(tag)
+        index = self._index
+        if not index:
+            return next(self.search(encoded, exact=True), -1)
+
+        mask = len(index) - 1
+        slot = zlib.crc32(encoded) & mask
+        while True:
+            number = index[slot]
+            if not number:
+                return -1
+            if self.raw(number - 1) == encoded:
+                return number - 1
+            slot = (slot + 1) & mask
+
+    def search(self, needle, prefix=False, exact=False):
+        """Yield in order the positions of the tags containing the encoded needle
+
+        The string table is searched as a whole, so tags that cannot match
+        are never decoded. With prefix or exact, the tag must start with
+        or equal needle.
+        """
+        if not self.count:
+            return
+        mm = self._map
+        offsets = self._offsets
+        base = self._strings
+        end = base + offsets[self.count]
+        position = mm.find(needle, base, end)
+        while position != -1:
+            found = position - base
+            # The tag this match starts in
+            i = bisect_right(offsets, found) - 1
+            tag_end = offsets[i + 1]
+            if found + len(needle) <= tag_end:
+                at_start = found == offsets[i]
+                if exact:
+                    if at_start and found + len(needle) == tag_end:
+                        yield i
+                elif at_start or not prefix:
+                    yield i
+                if at_start or not (prefix or exact):
+                    # Continue with the next tag
+                    position = mm.find(needle, base + tag_end, end)
+                    continue
+            # A prefix can only match at the start of a later tag
+            next_start = base + tag_end if prefix or exact else position + 1
+            position = mm.find(needle, next_start, end)
+
+    def close(self):
+        """Unmap the file"""
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._offsets = array("Q", [0])
+        self._index = array("I")
+        self.count = 0
+        self.size = 0
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+class PackedHistory:
+    """History kept in history.bin, a packed file read through mmap
+
+    Opening only maps the file, so it takes the same time however many
+    tags it holds. Membership tests use the hash index, and paging and
+    searching decode only the tags they return. New tags are appended to
+    history.bin.journal and kept in memory in front of the packed tags,
+    until compaction rewrites history.bin.
+    """
+
+    def __init__(self, config_dir, max_items=10):
+        self.packed_file = config_dir / "history.bin"
+        # Its own journal, so the JSON history's history.journal is never touched
+        self._journal = HistoryJournal(config_dir, max_items, "history.bin.journal")
+        self._max_items = max(0, max_items)
+        self._packed = PackedTags()
+        # Tags added since the packed file was written, most recent last
+        self._recent = OrderedDict()
+        # Recent tag -> its older position in the packed file
+        self._shadowed = {}
+        # Packed positions below this are visible, computed when needed
+        self._cutoff = None
+        with self._journal._locked():
+            self._open_unlocked()
+
+    @property
+    def max_items(self):
+        """Maximum number of tags kept"""
+        return self._max_items
+
+    @max_items.setter
+    def max_items(self, value):
+        """Change the bound; packed tags past it are dropped at compaction"""
+        self._max_items = max(0, value)
+        self._journal.max_items = value
+        while len(self._recent) > self._max_items:
+            tag, _ = self._recent.popitem(last=False)
+            self._shadowed.pop(tag, None)
+        self._cutoff = None
+
+    def _open_unlocked(self):
+        """Map history.bin and replay the journal on top of it"""
+        self._packed.close()
+        self._recent.clear()
+        self._shadowed.clear()
+        self._cutoff = None
+        try:
+            self._packed = PackedTags(self.packed_file)
+        except Exception as e:
+            print(f"Warning: Could not load history: {e}", file=sys.stderr)
+            self._packed = PackedTags()
+
+        journal_file = self._journal.journal_file
+        if journal_file.exists():
+            with open(journal_file, "r") as f:
+                for line in f:
+                    try:
+                        self.add(json.loads(line))
+                    except ValueError:
+                        # Skip a line torn by a crash mid-write
+                        continue
+
+    def _visible_cutoff(self):
+        """Return the packed position where tags fall out of the history bound"""
+        if self._cutoff is None:
+            # Recent tags come first; their older packed copies are skipped
+            cutoff = max(0, self._max_items - len(self._recent))
+            for position in sorted(self._shadowed.values()):
+                if position >= cutoff:
+                    break
+                cutoff += 1
+            self._cutoff = min(cutoff, len(self._packed))
+        return self._cutoff
+
+    def add(self, tag):
+        """Move tag to the front, returning True if the history changed"""
+        recent = self._recent
+        if tag in recent:
+            if next(reversed(recent)) == tag:
+                return False
+            recent.move_to_end(tag)
+            return True
+
+        if not self._max_items:
+            return False
+        position = self._packed.find(tag)
+        if position == 0 and not recent:
+            return False
+
+        recent[tag] = None
+        if position >= 0:
+            self._shadowed[tag] = position
+        if len(recent) > self._max_items:
+            evicted, _ = recent.popitem(last=False)
+            self._shadowed.pop(evicted, None)
+        self._cutoff = None
+        return True
+
+    def add_many(self, tags):
+        """Add tags in order, returning those that changed the history"""
+        return [tag for tag in tags if self.add(tag)]
+
+    def record(self, hashtag):
+        """Queue a tag for the journal"""
+        self._journal.record(hashtag)
+
+    def flush(self):
+        """Write pending tags out, compacting once the journal has grown large"""
+        threshold = min(max(PACKED_COMPACT_MIN_BYTES, self._packed.size // 4),
+                        PACKED_COMPACT_MAX_BYTES)
+        if self._journal._flush_pending() >= threshold:
+            self.compact()
+
+    def _rewrite_unlocked(self, front):
+        """Write history.bin as front, most recent first, then the packed tags it leaves room for"""
+        max_items = self._max_items
+        front = list(dict.fromkeys(front))[:max_items]
+        packed = self._packed
+        skip = {position for position in map(packed.find, front) if position >= 0}
+        encoded = [_encode_tag(tag) for tag in front]
+
+        # Runs of packed positions to keep, so that kept tags are copied
+        # straight from the map instead of becoming objects
+        runs = []
+        start = 0
+        room = max_items - len(encoded)
+        for position in sorted(skip) + [len(packed)]:
+            end = min(position, start + room)
+            if end > start:
+                runs.append((start, end))
+                room -= end - start
+            start = position + 1
+            if not room:
+                break
+
+        old_offsets = packed.offsets
+        offsets = array("Q", [0])
+        offsets.extend(accumulate(map(len, encoded)))
+        for start, end in runs:
+            shift = offsets[-1] - old_offsets[start]
+            offsets.extend(map(shift.__add__, old_offsets[start + 1:end + 1]))
+        raw = packed.raw
+        hashes = chain(map(zlib.crc32, encoded),
+                       *(map(zlib.crc32, map(raw, range(start, end))) for start, end in runs))
+
+        def write_strings(f):
+            f.writelines(encoded)
+            for start, end in runs:
+                f.write(packed.strings(start, end))
+            # A mapped file cannot be replaced on Windows
+            packed.close()
+
+        _write_packed(self.packed_file, offsets, hashes, write_strings)
+
+    def compact(self):
+        """Fold the journal into history.bin
+
+        history.bin is only rewritten when the journal holds tags or the
+        bound leaves packed tags to drop; otherwise it is just remapped.
+        """
+        self._journal._flush_pending()
+        with self._journal._locked():
+            # Pick up tags other processes have added since we opened
+            self._open_unlocked()
+            journal_file = self._journal.journal_file
+            journaled = journal_file.exists() and journal_file.stat().st_size > 0
+            if not journaled and len(self._packed) <= self._max_items:
+                return self
+            self._rewrite_unlocked(list(reversed(self._recent)))
+            if journal_file.exists():
+                os.unlink(journal_file)
+            self._open_unlocked()
+        return self
+
+    def import_tags(self, tags):
+        """Import a most-recent-first sequence of tags, such as history.json
+
+        The imported tags become the most recent ones.
+        """
+        self._journal._flush_pending()
+        with self._journal._locked():
+            self._open_unlocked()
+            self._rewrite_unlocked(list(tags) + list(reversed(self._recent)))
+            if self._journal.journal_file.exists():
+                os.unlink(self._journal.journal_file)
+            self._open_unlocked()
+
+    def clear(self):
+        """Remove all tags"""
+        self.replace([])
+
+    def replace(self, tags):
+        """Replace all tags with a most-recent-first sequence of tags"""
+        tags = list(dict.fromkeys(tags))[:self._max_items]
+        self._journal._pending.clear()
+        with self._journal._locked():
+            self._packed.close()
+            write_packed_tags(self.packed_file, [_encode_tag(tag) for tag in tags])
+            if self._journal.journal_file.exists():
+                os.unlink(self._journal.journal_file)
+            self._open_unlocked()
+
+    def close(self):
+        """Write pending tags and unmap the file"""
+        self.flush()
+        self._packed.close()
+
+    def is_empty(self):
+        """Return True if no tags are stored"""
+        return not self._recent and not self._visible_cutoff()
+
+    def _iter(self, contains=None, prefix=None, offset=0):
+        """Yield the tags most recent first, starting offset matches in"""
+        recent = [tag for tag in reversed(self._recent)
+                  if (not prefix or tag.startswith(prefix)) and (not contains or contains in tag)]
+        if offset < len(recent):
+            yield from recent[offset:]
+            offset = 0
+        else:
+            offset -= len(recent)
+
+        packed = self._packed
+        cutoff = self._visible_cutoff()
+        shadowed = set(self._shadowed.values())
+        if not (prefix or contains):
+            # Jump straight to the offset-th packed tag that is not shadowed
+            start = offset
+            for position in sorted(shadowed):
+                if position > start:
+                    break
+                start += 1
+            for i in range(start, cutoff):
+                if i not in shadowed:
+                    yield packed.tag(i)
+            return
+
+        needle = _encode_tag(prefix or contains)
+        positions = takewhile(cutoff.__gt__, packed.search(needle, prefix=bool(prefix)))
+        matches = (packed.tag(i) for i in positions if i not in shadowed)
+        if prefix and contains:
+            matches = (tag for tag in matches if contains in tag)
+        for tag in islice(matches, offset, None):
+            yield tag
+
+    def page(self, limit=None, offset=0, contains=None, prefix=None):
+        """Return up to limit tags, most recent first, after skipping offset"""
+        tags = self._iter(contains, prefix, offset)
+        return list(tags if limit is None else islice(tags, limit))
+
+    def to_list(self):
+        """Return all tags most recent first, as stored in history.json"""
+        return list(self._iter())
+
+    def __contains__(self, tag):
+        if tag in self._recent:
+            return True
+        position = self._packed.find(tag)
+        return 0 <= position < self._visible_cutoff()
+
+    def __iter__(self):
+        return self._iter()
+
+    def __bool__(self):
+        return not self.is_empty()
+
+    def __len__(self):
+        cutoff = self._visible_cutoff()
+        hidden = sum(1 for position in self._shadowed.values() if position < cutoff)
+        return len(self._recent) + cutoff - hidden
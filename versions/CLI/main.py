@@ -1,23 +1,71 @@
 import os
 import sys
 import json
+import atexit
 import argparse
+from contextlib import nullcontext
+from itertools import islice
 from pathlib import Path
 
+from stats import NullStats, Stats, utf8_size
+from history import HashtagHistory, HistoryJournal, atomic_write_json
+from normalize import UnicodeTables
+from suggest import SuggestionStore
+from plugins import PLUGINS_DIR, Pipeline
+from transform import (HashtagTransformer, InstrumentedTransformer, ResultCache,
+                       VariantTransformer)
+
+# Buffer size used for streaming batch input and output
+BATCH_BUFFER_SIZE = 1024 * 1024
+
+# Number of lines converted together in batch mode
+BATCH_CHUNK_LINES = 4096
+
+# Profile options accepted by --variant and the settings they change
+VARIANT_OPTIONS = {
+    "capitalize": ("capitalize_first_letter", True),
+    "no-capitalize": ("capitalize_first_letter", False),
+    "no-special": ("remove_special_chars", True),
+    "keep-special": ("remove_special_chars", False),
+    "normalize": ("normalize_unicode", True),
+    "no-normalize": ("normalize_unicode", False),
+}
+
 
 class HashtagGeneratorCLI:
     """Command Line Interface for the Hashtag Generator App"""
 
     def __init__(self):
         """Initialize the CLI with default settings"""
-        self.history = []
         self.settings = {
             "remove_special_chars": False,
             "capitalize_first_letter": True,
+            "normalize_unicode": True,
             "history_max_items": 10,
+            "history_backend": "json",
+            "cache_size": 0,
+            "cache_persist": False,
+            "plugins": [],
         }
+        # History is only read from disk the first time it is needed
+        self._history = None
+        self._suggestions = None
+        self._transformer = None
+        # Settings fingerprint the current transformer was built for
+        self._transformer_key = None
+        # Result cache for the current settings, when cache_size is set
+        self.cache = None
+        # Replaced by a Stats object when instrumentation is enabled
+        self.stats = NullStats()
+        # Tag frequency sketches fed by batch conversion, when enabled
+        self.analytics = None
         self.config_dir = self._get_config_dir()
+        # Modification time of config.json when it was last read or written
+        self._config_mtime = None
+        # Code point classes for normalize_unicode, read on first non-ASCII input
+        self.unicode_tables = UnicodeTables(self.config_dir)
         self.load_settings()
+        atexit.register(self.close)
 
     def _get_config_dir(self):
         """Get the appropriate configuration directory based on OS"""
@@ -30,107 +78,604 @@ class HashtagGeneratorCLI:
         else:  # Linux and other Unix-like
             config_dir = home / ".config" / "hashtag-generator"
             
-        # Create config directory if it doesn't exist
-        config_dir.mkdir(parents=True, exist_ok=True)
+        # The directory is created on the first write, not here
         return config_dir
 
     def load_settings(self):
         """Load settings from config file if it exists"""
         config_file = self.config_dir / "config.json"
-        history_file = self.config_dir / "history.json"
         
         if config_file.exists():
             try:
+                self._config_mtime = config_file.stat().st_mtime_ns
                 with open(config_file, "r") as f:
                     self.settings.update(json.load(f))
             except Exception as e:
                 print(f"Warning: Could not load settings: {e}", file=sys.stderr)
 
-        if history_file.exists():
+        self.open_history()
+
+    def reload_settings(self, history_lock=None):
+        """Re-read config.json if it changed since it was read, returning True if so
+
+        Used by long-running modes so that settings changed by another CLI
+        call apply to the next conversion. A new history backend only
+        takes effect on restart. A new history bound is applied while
+        holding history_lock, if given, so that it cannot change under a
+        thread adding tags.
+        """
+        config_file = self.config_dir / "config.json"
+        try:
+            mtime = config_file.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._config_mtime:
+            return False
+        
+        self._config_mtime = mtime
+        try:
+            with open(config_file, "r") as f:
+                settings = json.load(f)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            print(f"Warning: Could not reload settings: {e}", file=sys.stderr)
+            return False
+        settings.pop("history_backend", None)
+        self.settings.update(settings)
+        
+        # The transformer and cache follow the settings fingerprint by themselves
+        max_items = self.settings["history_max_items"]
+        with history_lock or nullcontext():
+            self.journal.max_items = max_items
+            if self._history is not None and self._history is not self.journal:
+                self._history.max_items = max_items
+        return True
+
+    def open_history(self, tags=None):
+        """Open the history store selected by the history_backend setting
+
+        When switching from another backend, tags (most recent first)
+        replace whatever the selected store already holds.
+        """
+        max_items = self.settings["history_max_items"]
+        json_history = self.journal = HistoryJournal(self.config_dir, max_items)
+        self._history = None
+        # JSON history is carried over the first time another store is used
+        has_json = tags is None and (json_history.snapshot_file.exists()
+                                     or json_history.journal_file.exists())
+        imported = False
+        
+        if self.settings["history_backend"] == "sqlite":
+            try:
+                from history import SqliteHistory
+                store = SqliteHistory(self.config_dir / "history.db", max_items)
+                if has_json and store.is_empty():
+                    store.import_tags(json_history.load().to_list())
+                    imported = True
+                self._history = self.journal = store
+            except Exception as e:
+                print(f"Warning: Could not open history database, using JSON history: {e}",
+                      file=sys.stderr)
+        elif self.settings["history_backend"] == "packed":
+            try:
+                from history import PackedHistory
+                store = PackedHistory(self.config_dir, max_items)
+                if has_json and not store.packed_file.exists():
+                    store.import_tags(json_history.load().to_list())
+                    imported = True
+                self._history = self.journal = store
+            except Exception as e:
+                print(f"Warning: Could not open packed history, using JSON history: {e}",
+                      file=sys.stderr)
+
+        if tags is not None:
             try:
-                with open(history_file, "r") as f:
-                    self.history = json.load(f)
+                self.journal.replace(tags)
+            except Exception as e:
+                print(f"Warning: Could not move history to the new backend: {e}", file=sys.stderr)
+                return
+            imported = True
+
+        if imported and self.journal is not json_history:
+            # The tags now live in the other store; left behind, the JSON
+            # files would be imported again once that store is cleared
+            try:
+                json_history.remove()
+            except OSError as e:
+                print(f"Warning: Could not remove JSON history: {e}", file=sys.stderr)
+
+    @property
+    def history(self):
+        """History, loaded from the journal on first access"""
+        if self._history is None:
+            try:
+                self._history = self.journal.load()
             except Exception as e:
                 print(f"Warning: Could not load history: {e}", file=sys.stderr)
+                self._history = HashtagHistory(max_items=self.settings["history_max_items"])
+        return self._history
+
+    @property
+    def suggestions(self):
+        """Suggestion store, seeded from history the first time it is used"""
+        if self._suggestions is None:
+            store = self._suggestions = SuggestionStore(self.config_dir,
+                                                        self.settings["history_max_items"])
+            if not store.exists():
+                # Oldest first, so the most recent tags rank highest
+                store.record_many(self.history.to_list()[::-1])
+        return self._suggestions
 
     def save_settings(self):
-        """Save settings to config file"""
+        """Save settings to config file and compact history"""
         config_file = self.config_dir / "config.json"
-        history_file = self.config_dir / "history.json"
         
         try:
-            with open(config_file, "w") as f:
-                json.dump(self.settings, f, indent=2)
-                
-            with open(history_file, "w") as f:
-                json.dump(self.history, f, indent=2)
+            with self.stats.stage("persist"):
+                config_file.parent.mkdir(parents=True, exist_ok=True)
+                atomic_write_json(config_file, self.settings)
+                self._config_mtime = config_file.stat().st_mtime_ns
+                self.journal.max_items = self.settings["history_max_items"]
+                self._history = self.journal.compact()
         except Exception as e:
             print(f"Error: Could not save settings: {e}", file=sys.stderr)
 
+    def close(self):
+        """Write any history still pending in the journal, and the warm cache"""
+        try:
+            with self.stats.stage("persist"):
+                self.journal.close()
+                if self._suggestions is not None:
+                    self._suggestions.close()
+        except Exception as e:
+            print(f"Error: Could not save history: {e}", file=sys.stderr)
+
+        if self.cache is not None and self.cache.changed and self.settings["cache_persist"]:
+            try:
+                with self.stats.stage("persist"):
+                    self.config_dir.mkdir(parents=True, exist_ok=True)
+                    atomic_write_json(self.config_dir / "cache.json", self.cache.to_dict(),
+                                      indent=None)
+                self.cache.changed = False
+            except Exception as e:
+                print(f"Error: Could not save cache: {e}", file=sys.stderr)
+
+    def _get_cache(self, fingerprint):
+        """Return a result cache for these settings, or None if caching is off
+
+        The cache is replaced whenever the settings fingerprint changes, so
+        results computed under other settings are never returned.
+        """
+        size = self.settings["cache_size"]
+        if size <= 0:
+            return None
+        if self.cache is not None and self.cache.fingerprint == fingerprint:
+            self.cache.max_items = size
+            return self.cache
+
+        cache = None
+        cache_file = self.config_dir / "cache.json"
+        if self.settings["cache_persist"] and cache_file.exists():
+            try:
+                with open(cache_file, "r") as f:
+                    data = json.load(f)
+                if tuple(data["fingerprint"]) == fingerprint:
+                    cache = ResultCache.from_dict(data, size)
+            except Exception as e:
+                print(f"Warning: Could not load cache: {e}", file=sys.stderr)
+
+        self.cache = cache or ResultCache(size, fingerprint)
+        return self.cache
+
+    def _settings_fingerprint(self):
+        """Return the settings that determine what a text is transformed into"""
+        return (self.settings["remove_special_chars"], self.settings["capitalize_first_letter"],
+                self.settings["normalize_unicode"], "\n".join(self.settings["plugins"]))
+
+    def compose_pipeline(self, specs=None):
+        """Compose the plugin pipeline for specs, by default the configured plugins
+
+        Returns None when there are no plugins. Raises ValueError, or the
+        plugin's own error, if a plugin cannot be loaded.
+        """
+        if specs is None:
+            specs = self.settings["plugins"]
+        if not specs:
+            return None
+        return Pipeline(specs, self.config_dir / PLUGINS_DIR, self.stats)
+
+    def get_pipeline(self):
+        """Return the pipeline of the current transformer"""
+        return self.get_transformer().pipeline
+
+    def get_transformer(self):
+        """Return the transformer compiled from the current settings"""
+        key = self._settings_fingerprint()
+        transformer = self._transformer
+        if transformer is None or key != self._transformer_key:
+            try:
+                pipeline = self.compose_pipeline()
+            except Exception as e:
+                print(f"Warning: Could not load plugins, converting without them: {e}",
+                      file=sys.stderr)
+                pipeline = None
+            cache = self._get_cache(key)
+            tables = self.unicode_tables if key[2] else None
+            if self.stats.enabled:
+                transformer = InstrumentedTransformer(*key[:2], self.stats, cache, tables,
+                                                      pipeline)
+            else:
+                transformer = HashtagTransformer(*key[:2], cache, tables, pipeline)
+            self._transformer = transformer
+            self._transformer_key = key
+        return transformer
+
+    def collect_stats(self):
+        """Return self.stats with the cache counters brought up to date"""
+        if self.cache is not None:
+            self.stats.set("cache_hits", self.cache.hits)
+            self.stats.set("cache_misses", self.cache.misses)
+        return self.stats
+
+    def enable_stats(self):
+        """Start recording per-stage timings and counters in self.stats"""
+        self.stats = Stats()
+        self._transformer = None
+        return self.stats
+
+    def format_hashtag(self, text):
+        """Transform input text into a hashtag without touching history"""
+        return self.get_transformer().transform(text)
+
+    def add_to_history(self, hashtag):
+        """Add a hashtag to history, returning True if history changed"""
+        # Without loaded history the tag goes straight to the journal, whose
+        # replay moves repeated tags to the front
+        if self._history is not None and not self._history.add(hashtag):
+            return False
+        self.journal.record(hashtag)
+        return True
+
+    def _update_history(self, hashtags, suggest=True):
+        """Add every non-empty hashtag to history and suggestions, counting hits and misses
+
+        A tag already in history, or earlier in the same batch, is a hit.
+        History that has not been loaded is not read just to count them.
+        """
+        hashtags = [hashtag for hashtag in hashtags if hashtag]
+        if self.stats.enabled and self._history is not None:
+            self._count_history_hits(hashtags)
+        with self.stats.stage("history"):
+            if suggest:
+                self.suggestions.record_many(hashtags)
+            if self._history is None:
+                # Without loaded history the tags go straight to the journal,
+                # whose replay moves repeated tags to the front
+                changed = hashtags
+            else:
+                # One transaction per call with the SQLite store
+                changed = self._history.add_many(hashtags)
+            for hashtag in changed:
+                self.journal.record(hashtag)
+
+    def _count_history_hits(self, hashtags):
+        """Count the hashtags about to be added as history hits or misses"""
+        history = self._history
+        seen = set()
+        for hashtag in hashtags:
+            if hashtag not in seen and hashtag not in history:
+                seen.add(hashtag)
+        self.stats.count("history_misses", len(seen))
+        self.stats.count("history_hits", len(hashtags) - len(seen))
+
     def generate_hashtag(self, text):
         """Transform input text into a hashtag format"""
-        if not text:
+        hashtag = self.format_hashtag(text)
+        if not hashtag:
             return ""
             
-        # Remove special characters if enabled
-        if self.settings["remove_special_chars"]:
-            # Keep alphanumeric and spaces only
-            text = ''.join(c for c in text if c.isalnum() or c.isspace())
+        # Add to history
+        self.stats.count("tags_generated")
+        self._update_history((hashtag,))
+            
+        return hashtag
+
+    def generate_many(self, texts):
+        """Transform many texts into hashtags in one pass"""
+        hashtags = self.get_transformer().transform_many(texts)
+        self.stats.count("tags_generated", len(hashtags))
+        self._update_history(hashtags)
+        return hashtags
+
+    def generate_batch(self, lines, exporter):
+        """Write one record per input line to an exporter from exporters.open_exporter"""
+        transformer = self.get_transformer()
+        stats = self.stats
+        lines = iter(lines)
+        count = 0
         
-        # Capitalize first letter of each word if enabled
-        if self.settings["capitalize_first_letter"]:
-            text = text.title()
+        while True:
+            with stats.stage("read"):
+                chunk = [line.strip() for line in islice(lines, BATCH_CHUNK_LINES)]
+            if not chunk:
+                break
+                
+            hashtags = transformer.transform_many(chunk)
+            with stats.stage("write"):
+                output = exporter.format(chunk, hashtags)
+                exporter.write(output)
+            count += len(hashtags)
+            
+            self._update_history(hashtags)
+            if self.analytics is not None:
+                with stats.stage("analytics"):
+                    self.analytics.add_many(hashtags)
+            if stats.enabled:
+                # Each line is counted with its newline
+                stats.count("input_bytes", utf8_size("\n".join(chunk)) + 1)
+                stats.count("output_bytes", utf8_size(output))
+            
+        stats.count("tags_generated", count)
+        return count
+
+    def parse_variant(self, spec):
+        """Turn a spec like "no-capitalize,keep-special" into a named transformer
+
+        Options not mentioned in the spec keep their current setting.
+        """
+        settings = {
+            "remove_special_chars": self.settings["remove_special_chars"],
+            "capitalize_first_letter": self.settings["capitalize_first_letter"],
+            "normalize_unicode": self.settings["normalize_unicode"],
+        }
+        for option in spec.split(","):
+            option = option.strip()
+            if option not in VARIANT_OPTIONS:
+                raise ValueError(f"Unknown variant option '{option}'")
+            key, value = VARIANT_OPTIONS[option]
+            settings[key] = value
+        tables = self.unicode_tables if settings["normalize_unicode"] else None
+        return spec, HashtagTransformer(settings["remove_special_chars"],
+                                        settings["capitalize_first_letter"], tables=tables,
+                                        pipeline=self.get_pipeline())
+
+    def generate_variants(self, lines, out, variants, output_format="tsv"):
+        """Write every variant of each input line to out, without touching history
+
+        Each line becomes a tab-separated row with one column per variant,
+        or an NDJSON object with the source text and one field per variant.
+        """
+        transformer = VariantTransformer(variants)
+        names = transformer.names
+        stats = self.stats
+        lines = iter(lines)
+        count = 0
         
-        # Remove spaces
-        hashtag = text.replace(" ", "")
+        while True:
+            with stats.stage("read"):
+                chunk = [line.strip() for line in islice(lines, BATCH_CHUNK_LINES)]
+            if not chunk:
+                break
+                
+            with stats.stage("variants"):
+                rows = zip(*transformer.transform_many(chunk))
+            with stats.stage("write"):
+                if output_format == "ndjson":
+                    output = "\n".join(json.dumps({"text": text, **dict(zip(names, row))},
+                                                  ensure_ascii=False)
+                                       for text, row in zip(chunk, rows))
+                else:
+                    output = "\n".join("\t".join(row) for row in rows)
+                out.write(output + "\n")
+            count += len(chunk)
+            
+            if stats.enabled:
+                stats.count("input_bytes", utf8_size("\n".join(chunk)) + 1)
+                stats.count("output_bytes", utf8_size(output) + 1)
+            
+        stats.count("tags_generated", count * len(names))
+        return count
+
+    def generate_templated(self, chunks, out, template):
+        """Write template rendered for each row of column chunks to out
+
+        chunks come from templates.read_columns. Every hashtag column of a
+        chunk is converted in one transform_many call and added to history
+        like batch output.
+        """
+        transformer = self.get_transformer()
+        stats = self.stats
+        chunks = iter(chunks)
+        count = 0
+
+        while True:
+            with stats.stage("read"):
+                columns = next(chunks, None)
+            if columns is None:
+                break
+
+            hashtags = {column: transformer.transform_many(columns[column])
+                        for column in template.hashtag_columns}
+            with stats.stage("template"):
+                rendered = template.render_many(columns, hashtags)
+            with stats.stage("write"):
+                output = "\n".join(rendered) + "\n" if rendered else ""
+                out.write(output)
+            count += len(rendered)
+
+            for column_hashtags in hashtags.values():
+                self._update_history(column_hashtags)
+                stats.count("tags_generated", len(column_hashtags))
+            if stats.enabled:
+                stats.count("input_bytes", sum(utf8_size("".join(values))
+                                               for values in columns.values()))
+                stats.count("output_bytes", utf8_size(output))
+
+        return count
+
+    def generate_file_parallel(self, filename, exporter, jobs, ordered=True):
+        """Write one record per line of filename to exporter using jobs processes"""
+        import parallel
         
-        # Add hashtag symbol
-        hashtag = f"#{hashtag}"
+        with self.stats.stage("parallel"):
+            count, recent = parallel.convert_file(filename, exporter, self.get_transformer(), jobs,
+                                                  self.settings["history_max_items"], ordered,
+                                                  self.analytics, self.suggestions)
+        self.stats.count("tags_generated", count)
         
-        # Add to history
-        if hashtag not in self.history:
-            self.history.insert(0, hashtag)
-            # Maintain max history size
-            self.history = self.history[:self.settings["history_max_items"]]
-            self.save_settings()
+        # Merge history once, in the order the chunks appear in the file;
+        # suggestions already counted every tag
+        self._update_history(recent, suggest=False)
             
-        return hashtag
+        return count
 
     def import_from_file(self, filename):
         """Import text from file"""
         try:
-            with open(filename, "r") as f:
-                return f.read().strip()
+            with self.stats.stage("read"), open(filename, "r") as f:
+                text = f.read()
+            self.stats.count("input_bytes", utf8_size(text))
+            return text.strip()
         except Exception as e:
             print(f"Error reading file: {e}", file=sys.stderr)
             return None
 
-    def export_to_file(self, hashtag, filename):
-        """Export hashtag to file"""
+    def export_settings(self):
+        """Return the settings that shape a hashtag, for exported records"""
+        settings = {key: self.settings[key]
+                    for key in ("remove_special_chars", "capitalize_first_letter", "normalize_unicode")}
+        if self.settings["plugins"]:
+            settings["plugins"] = " ".join(self.settings["plugins"])
+        return settings
+
+    def export_to_file(self, hashtag, filename, text=None, export_format=None, compress=None,
+                       include_settings=False):
+        """Export hashtag to file
+        
+        A plain text file holds just the hashtag. Other formats, chosen by
+        export_format or the file extension, write one record with the
+        source text if given and the settings if requested.
+        """
+        from exporters import format_for_filename, open_exporter
+        
+        if export_format is None:
+            export_format = format_for_filename(filename)
         try:
-            with open(filename, "w") as f:
-                f.write(hashtag)
+            with self.stats.stage("write"):
+                if export_format == "text" and not (compress or filename.lower().endswith(".gz")):
+                    with open(filename, "w") as f:
+                        f.write(hashtag)
+                    output = hashtag
+                else:
+                    settings = self.export_settings() if include_settings else None
+                    with open_exporter(filename, export_format, compress, text is not None,
+                                       settings) as exporter:
+                        output = exporter.format([text], [hashtag])
+                        exporter.write(output)
+            self.stats.count("output_bytes", utf8_size(output))
             return True
         except Exception as e:
             print(f"Error writing file: {e}", file=sys.stderr)
             return False
 
-    def show_history(self, limit=None):
-        """Show hashtag history"""
+    def show_history(self, limit=None, offset=0, contains=None, prefix=None):
+        """Show a page of hashtag history, optionally filtered"""
         if not self.history:
             print("History is empty.")
             return
 
+        tags = self.history.page(limit, offset, contains, prefix)
+        if not tags:
+            print("No matching hashtags.")
+            return
+
         print("\nHashtag History:")
-        for i, tag in enumerate(self.history[:limit]):
-            print(f"{i+1}. {tag}")
+        for i, tag in enumerate(tags, start=offset + 1):
+            print(f"{i}. {tag}")
+
+    def export_history(self, filename):
+        """Write history to filename as a JSON list, most recent first, like history.json"""
+        try:
+            with self.stats.stage("persist"):
+                atomic_write_json(Path(filename).absolute(), self.history.to_list())
+            return True
+        except Exception as e:
+            print(f"Error: Could not export history: {e}", file=sys.stderr)
+            return False
+
+    def import_history(self, filename):
+        """Add the tags of a JSON list such as history.json to history, as the most recent
+
+        Returns the number of tags read, or None on error.
+        """
+        try:
+            with self.stats.stage("read"), open(filename, "r") as f:
+                tags = json.load(f)
+            if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+                raise ValueError("expected a JSON list of hashtags")
+        except Exception as e:
+            print(f"Error: Could not import history: {e}", file=sys.stderr)
+            return None
+
+        tags = [tag for tag in tags if tag]
+        try:
+            with self.stats.stage("persist"):
+                if hasattr(self.journal, "import_tags"):
+                    self.journal.import_tags(tags)
+                else:
+                    for tag in reversed(tags):
+                        self.add_to_history(tag)
+                    self._history = self.journal.compact()
+        except Exception as e:
+            print(f"Error: Could not import history: {e}", file=sys.stderr)
+            return None
+        return len(tags)
 
     def clear_history(self):
         """Clear hashtag history"""
-        self.history = []
-        self.save_settings()
+        try:
+            self.journal.clear()
+            if not isinstance(self.journal, HistoryJournal):
+                # JSON history left over from before the switch to another store
+                HistoryJournal(self.config_dir).remove()
+        except Exception as e:
+            print(f"Error: Could not clear history: {e}", file=sys.stderr)
+            return
+        if self._history is not self.journal:
+            # Reload the now empty JSON history on next access
+            self._history = None
+        try:
+            SuggestionStore(self.config_dir).clear()
+        except Exception as e:
+            print(f"Error: Could not clear suggestions: {e}", file=sys.stderr)
+        self._suggestions = None
         print("History cleared.")
 
+    def suggest(self, prefix, limit=10):
+        """Return up to limit previous hashtags starting with prefix, best first
+
+        A prefix without the hashtag symbol is converted with the current
+        settings first, so "summer v" finds "#SummerVibes".
+        """
+        if not prefix.startswith("#"):
+            prefix = self.format_hashtag(prefix)
+        with self.stats.stage("suggest"):
+            return self.suggestions.load().suggest(prefix, limit)
+
+    def show_suggestions(self, prefix, limit=10):
+        """Show previous hashtags starting with prefix, most used first"""
+        try:
+            tags = self.suggest(prefix, limit)
+        except Exception as e:
+            print(f"Error: Could not load suggestions: {e}", file=sys.stderr)
+            return
+        if not tags:
+            print("No suggestions.")
+            return
+        for tag in tags:
+            print(tag)
+
     def update_settings(self, args):
         """Update settings based on command line arguments"""
         if args.no_special is not None:
@@ -139,9 +684,38 @@ class HashtagGeneratorCLI:
         if args.capitalize is not None:
             self.settings["capitalize_first_letter"] = args.capitalize
             
+        if args.normalize_unicode is not None:
+            self.settings["normalize_unicode"] = args.normalize_unicode
+            
         if args.history_size is not None:
             self.settings["history_max_items"] = args.history_size
             
+        if args.cache_size is not None:
+            self.settings["cache_size"] = args.cache_size
+            
+        if args.cache_persist is not None:
+            self.settings["cache_persist"] = args.cache_persist
+            
+        if args.plugins is not None:
+            try:
+                self.compose_pipeline(args.plugins)
+            except Exception as e:
+                print(f"Error: Could not load plugin: {e}", file=sys.stderr)
+                return
+            self.settings["plugins"] = args.plugins
+            
+        # Rebuild the transformer and cache under the new settings
+        self._transformer = None
+        if self.cache is not None and self.cache.fingerprint != self._settings_fingerprint():
+            self.cache = None
+            
+        if args.history_backend is not None and args.history_backend != self.settings["history_backend"]:
+            # Carry the current history over to the new store
+            tags = self.history.to_list()
+            self.settings["history_backend"] = args.history_backend
+            self.journal.close()
+            self.open_history(tags)
+            
         self.save_settings()
         print("Settings updated.")
 
@@ -150,7 +724,12 @@ class HashtagGeneratorCLI:
         print("\nCurrent Settings:")
         print(f"  Remove special characters: {self.settings['remove_special_chars']}")
         print(f"  Capitalize first letter: {self.settings['capitalize_first_letter']}")
+        print(f"  Normalize Unicode: {self.settings['normalize_unicode']}")
         print(f"  Max history items: {self.settings['history_max_items']}")
+        print(f"  History backend: {self.settings['history_backend']}")
+        print(f"  Result cache size: {self.settings['cache_size']}")
+        print(f"  Persist result cache: {self.settings['cache_persist']}")
+        print(f"  Plugins: {', '.join(self.settings['plugins']) or 'none'}")
 
 
 def main():
@@ -163,10 +742,49 @@ def main():
     input_group = parser.add_argument_group("Input Options")
     input_group.add_argument("-t", "--text", help="Text to convert to hashtag")
     input_group.add_argument("-i", "--input", help="Input file path")
+    input_group.add_argument("--batch", "--lines", dest="batch", action="store_true",
+                            help="Convert each input line to its own hashtag (streaming)")
+    input_group.add_argument("-j", "--jobs", type=int, default=1,
+                            help="Worker processes for batch conversion of an input file")
+    input_group.add_argument("--watch", action="append", metavar="FILE",
+                            help="Follow FILE and convert lines as they are appended, resuming "
+                                 "where the last run stopped (may be repeated)")
+    input_group.add_argument("--watch-interval", type=float, default=None, metavar="SECONDS",
+                            help="How often to check followed files without inotify "
+                                 "(default 0.5)")
+    input_group.add_argument("--watch-once", action="store_true",
+                            help="Convert what was appended since the last run, then exit")
+    input_group.add_argument("--checkpoint", metavar="FILE",
+                            help="Where --watch keeps its read offsets "
+                                 "(default: watch.json in the config directory)")
+    input_group.add_argument("--input-format", choices=["text", "csv", "ndjson"],
+                            dest="input_format",
+                            help="Input format for --template (default: from the -i extension, "
+                                 "else text)")
     
     # Output options
     output_group = parser.add_argument_group("Output Options")
     output_group.add_argument("-o", "--output", help="Output file path")
+    output_group.add_argument("--variant", action="append", metavar="OPTIONS",
+                             help="Add an output variant such as 'no-capitalize,keep-special'; "
+                                  "repeat to write several variants of each line in one pass")
+    output_group.add_argument("--variant-format", choices=["tsv", "ndjson"], default="tsv",
+                             help="Write variants as tab-separated columns or NDJSON objects")
+    output_group.add_argument("--template", metavar="TEMPLATE",
+                             help="Render each input row into TEMPLATE, such as "
+                                  "'{brand} {#phrase} #{year}': {name} inserts a column and "
+                                  "{#name} the hashtag generated from it")
+    output_group.add_argument("--unordered", action="store_true",
+                             help="With --jobs, write results as soon as each chunk is done")
+    output_group.add_argument("--format", choices=["text", "ndjson", "csv", "json"],
+                             dest="export_format",
+                             help="Output format (default: from the -o extension, else text)")
+    output_group.add_argument("--gzip", action="store_true", default=None,
+                             help="Compress output with gzip (default for -o names ending in .gz)")
+    output_group.add_argument("--with-text", action="store_true",
+                             help="Include the source text in ndjson, csv and json records")
+    output_group.add_argument("--with-settings", action="store_true",
+                             help="Include the conversion settings in ndjson, csv and json records")
     
     # Settings options
     settings_group = parser.add_argument_group("Settings")
@@ -178,8 +796,28 @@ def main():
                                help="Capitalize first letter of each word", default=None)
     settings_group.add_argument("--no-capitalize", dest="capitalize", action="store_false",
                                help="Don't capitalize first letter of each word", default=None)
+    settings_group.add_argument("--normalize", dest="normalize_unicode", action="store_true",
+                               help="NFKC-normalize non-ASCII text and segment words by "
+                                    "Unicode character class", default=None)
+    settings_group.add_argument("--no-normalize", dest="normalize_unicode", action="store_false",
+                               help="Filter non-ASCII text with str.isalnum() only", default=None)
     settings_group.add_argument("--history-size", type=int, dest="history_size",
                                help="Maximum number of history items to keep")
+    settings_group.add_argument("--cache-size", type=int, dest="cache_size",
+                               help="Cache up to this many results for repeated input (0 disables)")
+    settings_group.add_argument("--persist-cache", dest="cache_persist", action="store_true",
+                               help="Keep the result cache on disk between runs", default=None)
+    settings_group.add_argument("--no-persist-cache", dest="cache_persist", action="store_false",
+                               help="Don't keep the result cache on disk", default=None)
+    settings_group.add_argument("--history-backend", choices=["json", "sqlite", "packed"],
+                               dest="history_backend",
+                               help="Store history in history.json, an SQLite database or a "
+                                    "packed, memory-mapped history.bin")
+    settings_group.add_argument("--plugin", action="append", dest="plugins", metavar="SPEC",
+                               help="Run a plugin such as stopwords, max-length=30 or case=camel "
+                                    "(repeat for several; replaces the saved list)")
+    settings_group.add_argument("--no-plugins", action="store_const", const=[], dest="plugins",
+                               help="Stop running plugins")
     
     # History commands
     history_group = parser.add_argument_group("History Commands")
@@ -187,18 +825,68 @@ def main():
                               help="Show hashtag history")
     history_group.add_argument("--clear-history", action="store_true",
                               help="Clear hashtag history")
+    history_group.add_argument("--export-history", metavar="FILE",
+                              help="Save history to FILE as JSON, in the history.json format")
+    history_group.add_argument("--import-history", metavar="FILE",
+                              help="Add the hashtags of a JSON file such as history.json "
+                                   "to history")
     history_group.add_argument("--history-limit", type=int, default=None,
                               help="Number of history items to show")
+    history_group.add_argument("--history-offset", type=int, default=0,
+                              help="Number of history items to skip")
+    history_group.add_argument("--history-search", metavar="TEXT",
+                              help="Only show history items containing TEXT")
+    history_group.add_argument("--history-prefix", metavar="PREFIX",
+                              help="Only show history items starting with PREFIX")
+    history_group.add_argument("--suggest", metavar="PREFIX",
+                              help="Suggest previous hashtags starting with PREFIX, "
+                                   "most used first")
+    history_group.add_argument("--suggest-limit", type=int, default=10, metavar="N",
+                              help="Number of suggestions to show (default 10)")
+    
+    # Server options
+    server_group = parser.add_argument_group("Server Options")
+    server_group.add_argument("--serve", action="store_true",
+                             help="Run a local HTTP service for generating hashtags")
+    server_group.add_argument("--host", default="127.0.0.1",
+                             help="Address for --serve to listen on")
+    server_group.add_argument("--port", type=int, default=8080,
+                             help="Port for --serve to listen on")
+    server_group.add_argument("--daemon", action="store_true",
+                             help="Run a background daemon for client.py on a Unix socket")
+    server_group.add_argument("--socket", help="Unix socket path for --daemon")
+    
+    # Analytics options
+    analytics_group = parser.add_argument_group("Analytics Options")
+    analytics_group.add_argument("--top", type=int, metavar="K",
+                                help="Count the hashtags generated from the input in fixed memory "
+                                     "and report the K most frequent")
+    analytics_group.add_argument("--sketch-error", type=float, default=0.0001, metavar="EPSILON",
+                                help="Counts may be too high by this fraction of all tags "
+                                     "(default 0.0001)")
+    analytics_group.add_argument("--sketch-confidence", type=float, default=0.999, metavar="P",
+                                help="Probability that counts stay within --sketch-error "
+                                     "(default 0.999)")
+    analytics_group.add_argument("--save-sketch", metavar="FILE",
+                                help="Save the frequency sketches for merging later")
+    analytics_group.add_argument("--merge-sketch", action="append", metavar="FILE",
+                                help="Merge sketches saved by other runs (may be repeated)")
     
     # Other commands
     parser.add_argument("--settings", action="store_true", 
                        help="Show current settings")
+    parser.add_argument("--stats", nargs="?", const="text", choices=["text", "json"],
+                       help="Print per-stage timings and counters to stderr when done "
+                            "(also enables /metrics for --serve)")
     
     # Parse arguments
     args = parser.parse_args()
     
     # Initialize the Hashtag Generator
     generator = HashtagGeneratorCLI()
+    if args.stats:
+        generator.enable_stats()
+        atexit.register(report_stats, generator, args.stats)
     
     # Handle command-specific actions
     if args.settings:
@@ -209,14 +897,57 @@ def main():
         generator.clear_history()
         return
         
+    if args.export_history:
+        if generator.export_history(args.export_history):
+            print(f"History saved to {args.export_history}")
+        return
+        
+    if args.import_history:
+        count = generator.import_history(args.import_history)
+        if count is not None:
+            print(f"{count} hashtags imported from {args.import_history}")
+        return
+        
     if args.history:
-        generator.show_history(args.history_limit)
+        generator.show_history(args.history_limit, args.history_offset,
+                               args.history_search, args.history_prefix)
+        return
+    
+    if args.suggest is not None:
+        generator.show_suggestions(args.suggest, args.suggest_limit)
         return
     
     # Handle settings updates
-    if any(x is not None for x in [args.no_special, args.capitalize, args.history_size]):
+    if any(x is not None for x in [args.no_special, args.capitalize, args.normalize_unicode,
+                                   args.history_size, args.history_backend, args.cache_size,
+                                   args.cache_persist, args.plugins]):
         generator.update_settings(args)
     
+    if args.serve:
+        import server
+        server.run(generator, args.host, args.port)
+        return
+    
+    if args.daemon:
+        import server
+        server.run_daemon(generator, args.socket or generator.config_dir / server.DAEMON_SOCKET_NAME)
+        return
+    
+    # Frequency analytics over the generated hashtags
+    if args.top is not None or args.save_sketch or args.merge_sketch:
+        run_analytics(generator, args, parser)
+        return
+    
+    # Follow input files as they grow
+    if args.watch:
+        run_watch(generator, args, parser)
+        return
+    
+    # Stream line-by-line conversion
+    if args.batch or args.variant or args.template:
+        run_batch(generator, args, parser)
+        return
+    
     # Process text input
     input_text = None
     
@@ -238,11 +969,192 @@ def main():
         print(hashtag)
         
         if args.output:
-            if generator.export_to_file(hashtag, args.output):
+            if generator.export_to_file(hashtag, args.output, input_text if args.with_text else None,
+                                        args.export_format, args.gzip, args.with_settings):
                 print(f"Hashtag saved to {args.output}")
             else:
                 print(f"Failed to save hashtag to {args.output}")
 
 
+def report_stats(generator, output_format):
+    """Persist pending history, then print the collected stats to stderr"""
+    generator.close()
+    stats = generator.collect_stats()
+    if output_format == "json":
+        print(stats.to_json(), file=sys.stderr)
+    else:
+        print(stats.summary(), file=sys.stderr)
+
+
+def run_analytics(generator, args, parser):
+    """Count hashtags from the input and any saved sketches, then report the top ones"""
+    from analytics import TagAnalytics
+    
+    if not 0 < args.sketch_error < 1 or not 0 < args.sketch_confidence < 1:
+        parser.error("--sketch-error and --sketch-confidence must be between 0 and 1")
+    if args.top is not None and args.top < 1:
+        parser.error("--top must be at least 1")
+    if args.variant:
+        parser.error("--variant cannot be combined with analytics options")
+    
+    analytics = None
+    for filename in args.merge_sketch or []:
+        try:
+            loaded = TagAnalytics.load(filename)
+            if analytics is None:
+                # Saved sketches keep their own error bounds
+                analytics = loaded
+            else:
+                analytics.merge(loaded)
+        except Exception as e:
+            print(f"Error: Could not merge sketch {filename}: {e}", file=sys.stderr)
+            return
+    if analytics is None:
+        analytics = TagAnalytics.from_error(args.sketch_error, 1 - args.sketch_confidence)
+    generator.analytics = analytics
+    
+    # With only saved sketches to merge, don't wait for stdin
+    if args.text or args.input or not (args.merge_sketch or sys.stdin.isatty()):
+        run_batch(generator, args, parser)
+    elif not args.merge_sketch:
+        parser.print_help()
+        return
+    
+    if args.save_sketch:
+        try:
+            analytics.save(args.save_sketch)
+        except Exception as e:
+            print(f"Error: Could not save sketch: {e}", file=sys.stderr)
+    
+    if args.top is not None:
+        print(f"Top {args.top} of {analytics.total} hashtags:")
+        for tag, count, guaranteed in analytics.top(args.top):
+            if guaranteed < count:
+                print(f"  {count:>12}  {tag}  (at least {guaranteed})")
+            else:
+                print(f"  {count:>12}  {tag}")
+
+
+def run_watch(generator, args, parser):
+    """Convert lines appended to the --watch files until interrupted"""
+    import watch
+    from exporters import open_exporter
+
+    if args.variant or args.template or args.jobs > 1:
+        parser.error("--watch cannot be combined with --variant, --template or --jobs")
+    interval = watch.WATCH_POLL_INTERVAL
+    if args.watch_interval is not None:
+        if args.watch_interval <= 0:
+            parser.error("--watch-interval must be positive")
+        interval = args.watch_interval
+
+    checkpoint = Path(args.checkpoint) if args.checkpoint else None
+    if checkpoint is None:
+        generator.config_dir.mkdir(parents=True, exist_ok=True)
+        checkpoint = generator.config_dir / watch.WATCH_CHECKPOINT_FILE
+
+    settings = generator.export_settings() if args.with_settings else None
+    try:
+        # Earlier runs' output is kept, as the checkpoint skips their input
+        exporter = open_exporter(args.output, args.export_format, args.gzip, args.with_text,
+                                 settings, append=True)
+    except Exception as e:
+        print(f"Error: Could not open output: {e}", file=sys.stderr)
+        return
+
+    if not args.watch_once:
+        print(f"Watching {len(args.watch)} file(s) (Ctrl+C to stop)", file=sys.stderr)
+    try:
+        with exporter:
+            count = watch.follow(generator, args.watch, exporter, checkpoint, interval,
+                                 args.watch_once)
+        if args.output:
+            print(f"{count} hashtags saved to {args.output}", file=sys.stderr)
+    except Exception as e:
+        print(f"Error while watching: {e}", file=sys.stderr)
+
+
+def run_batch(generator, args, parser):
+    """Convert input to hashtags one line at a time with buffered output"""
+    variants = None
+    if args.variant:
+        try:
+            variants = [generator.parse_variant(spec) for spec in args.variant]
+        except ValueError as e:
+            parser.error(str(e))
+        if args.export_format not in (None, "text"):
+            parser.error("--format does not apply to --variant output, use --variant-format")
+
+    template = None
+    if args.template is not None:
+        from templates import Template, input_format_for_filename
+        if variants:
+            parser.error("--template cannot be combined with --variant")
+        if args.export_format not in (None, "text"):
+            parser.error("--format does not apply to --template output")
+        try:
+            template = Template(args.template)
+        except ValueError as e:
+            parser.error(str(e))
+        input_format = args.input_format or input_format_for_filename(args.input)
+
+    if args.jobs > 1 and (args.text or not args.input or variants or template):
+        print("Warning: --jobs only applies to plain batch conversion of an -i file, "
+              "converting in a single process", file=sys.stderr)
+
+    source = None
+    try:
+        if args.text:
+            source = args.text.splitlines()
+        elif args.input and args.jobs > 1 and not variants and not template:
+            # Workers read their own byte ranges of the file
+            pass
+        elif args.input:
+            # The csv module handles line endings itself
+            newline = "" if template is not None and input_format == "csv" else None
+            source = open(args.input, "r", buffering=BATCH_BUFFER_SIZE, newline=newline)
+        elif not sys.stdin.isatty():
+            source = sys.stdin
+        else:
+            parser.print_help()
+            return
+    except Exception as e:
+        print(f"Error reading file: {e}", file=sys.stderr)
+        return
+
+    def convert(exporter):
+        if template is not None:
+            from templates import read_columns
+            chunks = read_columns(source, input_format, template.columns, BATCH_CHUNK_LINES)
+            return generator.generate_templated(chunks, exporter.out, template)
+        if variants:
+            return generator.generate_variants(source, exporter.out, variants, args.variant_format)
+        if source is None:
+            return generator.generate_file_parallel(args.input, exporter, args.jobs,
+                                                    ordered=not args.unordered)
+        return generator.generate_batch(source, exporter)
+
+    from exporters import open_exporter
+
+    filename = args.output
+    if filename is None and generator.analytics is not None:
+        # Only the analytics report goes to stdout
+        filename = os.devnull
+    # Variants and templates have their own row format
+    export_format = "text" if variants or template is not None else args.export_format
+    settings = generator.export_settings() if args.with_settings else None
+    try:
+        with open_exporter(filename, export_format, args.gzip, args.with_text,
+                           settings) as exporter:
+            count = convert(exporter)
+        if args.output:
+            print(f"{count} hashtags saved to {args.output}")
+    except Exception as e:
+        print(f"Error during batch conversion: {e}", file=sys.stderr)
+    finally:
+        if source is not None and source is not sys.stdin and hasattr(source, "close"):
+            source.close()
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,139 @@
+"""Unicode normalization for the Hashtag Generator CLI
+
+Text is NFKC-normalized and then split into words using code point
+classes that are precomputed from the Unicode database. The classes are
+cached as code point ranges in the config dir, because building them
+takes a pass over every code point while loading them is a single read.
+"""
+
+import re
+import sys
+import json
+import unicodedata
+
+from history import atomic_write_json
+
+# Bump whenever the way the classes are derived changes
+TABLES_FORMAT = 1
+
+TABLES_FILE = "unicode-tables.json"
+
+# Zero-width space: separates words (e.g. in Thai) without being whitespace
+ZERO_WIDTH_SPACE = "\u200b"
+
+# Zero-width non-joiner and joiner: part of words in Persian and Indic
+# scripts, and of emoji sequences
+JOINERS = "\u200c\u200d"
+
+
+def _is_word_char(char, category):
+    """Letters, digits and combining marks, plus the zero-width non-joiner
+
+    isalnum() alone rejects combining marks such as the vowel signs of
+    Indic scripts, which splits those words apart.
+    """
+    return char.isalnum() or category[0] == "M" or char == JOINERS[0]
+
+
+def build_tables():
+    """Classify every code point, returning each class as a list of ranges
+
+    bmp:    code points up to U+FFFF that are kept in a hashtag: word
+            characters, whitespace and the zero-width space
+    astral: code points above U+FFFF that are word characters although
+            the regular expression class \\w rejects them
+
+    The split follows the re module, which tests ranges up to U+FFFF with a
+    bitmap but checks ranges above it one at a time.
+    """
+    word = re.compile(r"\w")
+    classes = {"bmp": [], "astral": []}
+    for code in range(sys.maxunicode + 1):
+        char = chr(code)
+        category = unicodedata.category(char)
+        if code <= 0xFFFF:
+            if not (_is_word_char(char, category) or char.isspace() or char == ZERO_WIDTH_SPACE):
+                continue
+            ranges = classes["bmp"]
+        else:
+            if not _is_word_char(char, category) or word.match(char):
+                continue
+            ranges = classes["astral"]
+
+        if ranges and ranges[-1][1] == code - 1:
+            ranges[-1][1] = code
+        else:
+            ranges.append([code, code])
+    return classes
+
+
+def _char_class(ranges, negate=False):
+    """Turn code point ranges into a regular expression character class"""
+    parts = [f"\\U{start:08x}" if start == end else f"\\U{start:08x}-\\U{end:08x}"
+             for start, end in ranges]
+    return "[" + ("^" if negate else "") + "".join(parts) + "]"
+
+
+class UnicodeTables:
+    """Code point classes loaded lazily from the cache in cache_dir"""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self._patterns = None
+
+    def __getstate__(self):
+        # Patterns are rebuilt from the disk cache in worker processes
+        return {"cache_dir": self.cache_dir, "_patterns": None}
+
+    def load_classes(self):
+        """Return the cached classes, building and caching them if needed"""
+        cache_file = self.cache_dir / TABLES_FILE
+        try:
+            with open(cache_file, "r") as f:
+                data = json.load(f)
+            if (data["format"] == TABLES_FORMAT
+                    and data["unidata_version"] == unicodedata.unidata_version):
+                return data["classes"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+        classes = build_tables()
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            atomic_write_json(cache_file, {
+                "format": TABLES_FORMAT,
+                "unidata_version": unicodedata.unidata_version,
+                "classes": classes,
+            }, indent=None)
+        except OSError as e:
+            print(f"Warning: Could not cache Unicode tables: {e}", file=sys.stderr)
+        return classes
+
+    def _compile(self):
+        """Compile the classes into patterns matching special characters"""
+        classes = self.load_classes()
+        self._patterns = (
+            # Spaces are kept so that words can still be capitalized and
+            # newlines can still split batches
+            re.compile(_char_class(classes["bmp"] + [[0x10000, sys.maxunicode]], negate=True)),
+            re.compile(r"[^\w\s\x00-\uffff" + _char_class(classes["astral"])[1:-1] + "]"),
+        )
+        return self._patterns
+
+    def normalize(self, text, remove_special_chars):
+        """Return text in NFKC form, without special characters if requested
+
+        Zero-width spaces become plain spaces so that they split words for
+        capitalization and are then stripped along with other whitespace.
+        """
+        text = unicodedata.normalize("NFKC", text)
+        if remove_special_chars:
+            bmp_special, astral_special = self._patterns or self._compile()
+            text = bmp_special.sub("", text)
+            # Only text with characters above U+FFFF (two UTF-16 code units
+            # each), such as emoji, needs the slower second pass
+            if len(text.encode("utf-16-le", "surrogatepass")) != 2 * len(text):
+                text = astral_special.sub("", text)
+        if ZERO_WIDTH_SPACE in text:
+            text = text.replace(ZERO_WIDTH_SPACE, " ")
+        return text
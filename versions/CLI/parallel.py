@@ -0,0 +1,151 @@
+"""Parallel conversion of large input files for the Hashtag Generator CLI"""
+
+import io
+import os
+import locale
+import threading
+import multiprocessing
+from collections import Counter
+from itertools import islice
+
+from history import recent_tags
+
+# Target size of the byte range converted by one worker task
+PARALLEL_CHUNK_BYTES = 16 * 1024 * 1024
+
+# Chunks submitted per worker ahead of the one being written, so finished
+# output waiting on a slow chunk or a slow writer stays bounded
+PARALLEL_CHUNKS_AHEAD = 2
+
+# Transformer and exporter shared by every task in a worker process
+_worker_transformer = None
+_worker_exporter = None
+
+
+def split_file(filename, jobs, chunk_bytes=PARALLEL_CHUNK_BYTES):
+    """Split a file into (start, end) byte ranges that end on line boundaries"""
+    size = os.path.getsize(filename)
+    if not size:
+        return []
+
+    count = max(jobs, -(-size // chunk_bytes))
+    ranges = []
+    start = 0
+    with open(filename, "rb") as f:
+        for i in range(1, count):
+            if start >= size:
+                break
+            f.seek(max(start, size * i // count))
+            f.readline()
+            end = f.tell()
+            if end > start:
+                ranges.append((start, end))
+                start = end
+    if start < size:
+        ranges.append((start, size))
+    return ranges
+
+
+def _init_worker(transformer, exporter):
+    """Store the transformer and exporter once per worker process"""
+    global _worker_transformer, _worker_exporter
+    _worker_transformer = transformer
+    _worker_exporter = exporter
+
+
+def _tag_counts(hashtags, max_items):
+    """Return tag -> use count in order of first use, as a single process queues them
+
+    Only the max_items tags used last are kept; the suggestion store would
+    drop the others before writing them anyway.
+    """
+    counts = Counter(hashtags)
+    counts.pop("", None)
+    excess = len(counts) - max_items
+    if excess > 0:
+        counts = dict(islice(counts.items(), excess, None))
+    return counts
+
+
+def _convert_range(task):
+    """Convert one byte range, returning its output, recent tags and tag counts"""
+    filename, start, end, max_items, suggest_items, analytics_dimensions = task
+    with open(filename, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    # Decode and split lines the same way a text-mode file would
+    text = data.decode(locale.getpreferredencoding(False))
+    lines = [line.strip() for line in io.StringIO(text, newline=None)]
+    hashtags = _worker_transformer.transform_many(lines)
+
+    # Only tags that could survive in a history of max_items once the
+    # chunks are merged
+    recent = recent_tags(hashtags, max_items)
+    # Every use of the tags the suggestion index keeps
+    counts = _tag_counts(hashtags, suggest_items) if suggest_items else None
+
+    # Each chunk gets its own sketches, which are merged by the parent
+    analytics = None
+    if analytics_dimensions is not None:
+        from analytics import TagAnalytics
+
+        analytics = TagAnalytics.from_dimensions(analytics_dimensions)
+        analytics.add_many(hashtags)
+
+    output = _worker_exporter.format(lines, hashtags)
+    return start, output, len(hashtags), recent, counts, analytics
+
+
+def convert_file(filename, exporter, transformer, jobs, max_items, ordered=True, analytics=None,
+                 suggestions=None):
+    """Convert every line of filename to a hashtag using a process pool
+
+    Workers format their records with a copy of exporter, and the results
+    are written to exporter in input order unless ordered is False, and
+    counted in analytics if given. Every use of a tag is recorded in the
+    suggestions store if given. Returns the number of lines converted and
+    the distinct tags to merge into history, oldest first.
+
+    At most PARALLEL_CHUNKS_AHEAD chunks per worker are in flight, so memory
+    stays flat however far the writer or one slow chunk falls behind.
+    """
+    dimensions = analytics.dimensions if analytics is not None else None
+    suggest_items = suggestions.max_items if suggestions is not None else 0
+    ranges = split_file(filename, jobs)
+    in_flight = threading.BoundedSemaphore(jobs * PARALLEL_CHUNKS_AHEAD)
+    stopped = threading.Event()
+
+    def tasks():
+        # Runs on the pool's task feeder thread, which waits here until
+        # the parent has written an earlier chunk, or gives up if the
+        # parent stopped on an error (the pool joins this thread on exit)
+        for start, end in ranges:
+            while not in_flight.acquire(timeout=0.1):
+                if stopped.is_set():
+                    return
+            yield filename, start, end, max(0, max_items), suggest_items, dimensions
+
+    count = 0
+    chunk_tags = []
+
+    with multiprocessing.Pool(jobs, initializer=_init_worker, initargs=(transformer, exporter)) as pool:
+        results = pool.imap if ordered else pool.imap_unordered
+        try:
+            for start, output, converted, tags, counts, chunk_analytics in results(
+                    _convert_range, tasks()):
+                in_flight.release()
+                exporter.write(output)
+                count += converted
+                chunk_tags.append((start, tags))
+                if counts:
+                    suggestions.record_counts(counts)
+                if chunk_analytics is not None:
+                    analytics.merge(chunk_analytics)
+        finally:
+            stopped.set()
+
+    # Merge history in file order even when output was unordered
+    chunk_tags.sort(key=lambda item: item[0])
+    recent = [tag for _, tags in chunk_tags for tag in tags]
+    return count, recent
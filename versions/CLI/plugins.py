@@ -0,0 +1,196 @@
+"""Plugin pipeline for the Hashtag Generator CLI
+
+Plugins add stages around the built-in steps. "before" stages get the input
+texts, with words still separated by spaces, and "after" stages get the
+hashtags without the leading "#". A stage receives a whole batch as a list
+of strings and returns a list of the same length, so its overhead is paid
+once per batch rather than once per tag.
+
+A plugin is named by a spec such as "max-length=30": the built-in plugins
+below, a name.py file in the plugins directory of the config dir, or an
+importable module. Modules provide register(pipeline, arg), which calls
+pipeline.add_stage() for each stage; arg is the text after "=", or None.
+"""
+
+import re
+import sys
+import importlib
+import importlib.util
+from functools import partial
+
+from stats import NullStats
+
+STAGE_POINTS = ("before", "after")
+
+# Directory in the config dir searched for plugin files
+PLUGINS_DIR = "plugins"
+
+
+def map_joined(func, items):
+    """Apply a str -> str function to every item, in one call when possible
+
+    The items are joined with newlines, which func must leave in place, as
+    the regular expression substitutions and case changes below do.
+    """
+    joined = "\n".join(items)
+    if joined.count("\n") == len(items) - 1:
+        result = func(joined).split("\n")
+        if len(result) == len(items):
+            return result
+    return [func(item) for item in items]
+
+
+class StopWords:
+    """Remove common words before the words are joined"""
+
+    DEFAULT_WORDS = ("a", "an", "and", "at", "by", "for", "in", "of", "on", "or", "the", "to",
+                     "with")
+
+    def __init__(self, words):
+        # The lookahead on first letters lets the scan skip most positions
+        # without trying every alternative
+        first = "".join(sorted({re.escape(word[0]) for word in words}))
+        pattern = re.compile(r"(?<!\w)(?=[" + first + r"])(?:" + "|".join(map(re.escape, words))
+                             + r")(?!\w)", re.IGNORECASE)
+        self._remove = partial(pattern.sub, "")
+
+    def __call__(self, texts):
+        return map_joined(self._remove, texts)
+
+
+class MaxLength:
+    """Truncate hashtags to at most length characters, "#" included"""
+
+    def __init__(self, length):
+        self.body_length = length - 1
+
+    def __call__(self, bodies):
+        length = self.body_length
+        return [body[:length] for body in bodies]
+
+
+class Case:
+    """Change the case of whole hashtags: lower, upper or camel
+
+    camel lowercases the first letter, turning #SummerVibes into #summerVibes.
+    """
+
+    STYLES = ("lower", "upper", "camel")
+
+    def __init__(self, style):
+        self.style = style
+
+    def __call__(self, bodies):
+        if self.style == "camel":
+            return [body[:1].lower() + body[1:] for body in bodies]
+        return map_joined(str.lower if self.style == "lower" else str.upper, bodies)
+
+
+def _register_stopwords(pipeline, arg):
+    words = [word.strip() for word in arg.split(",") if word.strip()] if arg else []
+    pipeline.add_stage("before", StopWords(words or StopWords.DEFAULT_WORDS))
+
+
+def _register_max_length(pipeline, arg):
+    try:
+        length = int(arg)
+    except (TypeError, ValueError):
+        raise ValueError("max-length needs a number, as in max-length=30") from None
+    if length < 2:
+        raise ValueError("max-length must be at least 2")
+    pipeline.add_stage("after", MaxLength(length))
+
+
+def _register_case(pipeline, arg):
+    if arg not in Case.STYLES:
+        raise ValueError(f"case must be one of {', '.join(Case.STYLES)}, as in case=camel")
+    pipeline.add_stage("after", Case(arg))
+
+
+BUILTIN_PLUGINS = {
+    "stopwords": _register_stopwords,
+    "max-length": _register_max_length,
+    "case": _register_case,
+}
+
+
+def _import_plugin(name, plugin_dir):
+    """Import a plugin from plugin_dir/name.py, or as a module on the path"""
+    path = plugin_dir / f"{name}.py" if plugin_dir is not None else None
+    if path is not None and path.exists():
+        module_name = f"hashtag_plugin_{name}"
+        module = sys.modules.get(module_name)
+        if module is None:
+            spec = importlib.util.spec_from_file_location(module_name, path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            sys.modules[module_name] = module
+        return module
+
+    try:
+        return importlib.import_module(name)
+    except ModuleNotFoundError as e:
+        if e.name != name:
+            raise
+        raise ValueError(f"Unknown plugin '{name}'") from None
+
+
+class Pipeline:
+    """Plugin stages composed once from a list of specs
+
+    The time and call count of each stage are recorded in stats as the
+    stage "plugin:<name>", next to the built-in steps.
+    """
+
+    def __init__(self, specs=(), plugin_dir=None, stats=None):
+        self.specs = list(specs)
+        self.plugin_dir = plugin_dir
+        self.stats = stats or NullStats()
+        self.stages = {point: [] for point in STAGE_POINTS}
+        self._registering = None
+        for spec in self.specs:
+            self._load(spec)
+
+    def __getstate__(self):
+        # Worker processes compose their own stages from the specs
+        return {"specs": self.specs, "plugin_dir": self.plugin_dir}
+
+    def __setstate__(self, state):
+        self.__init__(state["specs"], state["plugin_dir"])
+
+    def _load(self, spec):
+        name, _, arg = spec.partition("=")
+        register = BUILTIN_PLUGINS.get(name)
+        if register is None:
+            register = getattr(_import_plugin(name, self.plugin_dir), "register", None)
+            if register is None:
+                raise ValueError(f"Plugin '{name}' has no register(pipeline, arg) function")
+        self._registering = name
+        try:
+            register(self, arg or None)
+        finally:
+            self._registering = None
+
+    def add_stage(self, point, func, name=None):
+        """Run func on every batch at point ("before" or "after")
+
+        name defaults to the plugin being registered.
+        """
+        if point not in STAGE_POINTS:
+            raise ValueError(f"Unknown stage point '{point}', expected one of "
+                             f"{', '.join(STAGE_POINTS)}")
+        self.stages[point].append((name or self._registering, func))
+
+    def run(self, point, items):
+        """Pass a batch through every stage registered at point"""
+        stats = self.stats
+        for name, func in self.stages[point]:
+            with stats.stage("plugin:" + name):
+                result = func(items)
+            if not isinstance(result, list):
+                result = list(result)
+            if len(result) != len(items):
+                raise ValueError(f"Plugin '{name}' returned {len(result)} items for a batch "
+                                 f"of {len(items)}")
+            items = result
+        return items
@@ -0,0 +1,344 @@
+"""Local HTTP service for the Hashtag Generator CLI"""
+
+import os
+import sys
+import json
+import signal
+import socket
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+
+# History collected from requests is persisted this often, in seconds
+HISTORY_FLUSH_INTERVAL = 1.0
+
+# Largest request body accepted
+MAX_BODY_BYTES = 64 * 1024 * 1024
+
+# Name of the daemon socket in the config directory (client.py uses the same)
+DAEMON_SOCKET_NAME = "daemon.sock"
+
+STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    501: "Not Implemented",
+}
+
+
+class RequestError(Exception):
+    """A request that should be answered with an HTTP error status"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class HashtagServer:
+    """Asyncio HTTP/1.1 server around a single warm hashtag generator
+
+    Endpoints:
+      GET  /hashtag?text=...         -> {"hashtag": ...}
+      POST /hashtag {"text": ...}    -> {"hashtag": ...}
+      POST /batch ["...", ...]       -> {"hashtags": [...]}
+      POST /batch (NDJSON)           -> one {"text", "hashtag"} object per line
+      GET  /health                   -> {"status": "ok"}
+      GET  /metrics                  -> Prometheus text (only with --stats)
+
+    Requests never touch the history files. Generated tags are queued and
+    added to history on a single background thread every
+    HISTORY_FLUSH_INTERVAL seconds. config.json is checked before each
+    request, so settings changed with main.py apply without a restart.
+    """
+
+    def __init__(self, generator, host="127.0.0.1", port=8080, socket_path=None):
+        self.generator = generator
+        self.host = host
+        self.port = port
+        # When set, serve the daemon protocol on this Unix socket instead of HTTP
+        self.socket_path = socket_path
+        self._pending = []
+        self._history_executor = ThreadPoolExecutor(max_workers=1)
+        # Held by the history thread while it adds tags
+        self._history_lock = threading.Lock()
+
+    async def serve(self):
+        """Serve requests until cancelled, then persist remaining history"""
+        if self.socket_path:
+            server = await asyncio.start_unix_server(self._handle_daemon_client,
+                                                     path=str(self.socket_path))
+        else:
+            server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        try:
+            # Stop cleanly on SIGTERM as well as Ctrl+C
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM,
+                                                          asyncio.current_task().cancel)
+        except (NotImplementedError, AttributeError):
+            # Not available on Windows
+            pass
+        flusher = asyncio.create_task(self._flush_history_periodically())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            flusher.cancel()
+            await self._flush_history()
+            self._history_executor.shutdown()
+            if self.socket_path:
+                try:
+                    os.unlink(self.socket_path)
+                except OSError:
+                    pass
+
+    async def _flush_history_periodically(self):
+        """Persist queued history in the background"""
+        while True:
+            await asyncio.sleep(HISTORY_FLUSH_INTERVAL)
+            await self._flush_history()
+
+    async def _flush_history(self):
+        """Hand queued tags to the history thread"""
+        if not self._pending:
+            return
+        tags, self._pending = self._pending, []
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._history_executor, self._persist_history, tags)
+
+    def _persist_history(self, tags):
+        """Add tags to history and write them out; runs on the history thread"""
+        with self._history_lock:
+            self.generator._update_history(tags)
+            with self.generator.stats.stage("persist"):
+                self.generator.journal.flush()
+                self.generator.suggestions.flush()
+
+    def _reload_settings(self):
+        """Pick up settings changed by other CLI calls since the last request"""
+        self.generator.reload_settings(self._history_lock)
+
+    async def _handle_daemon_client(self, reader, writer):
+        """Answer one daemon request: raw UTF-8 text in, the hashtag out"""
+        try:
+            data = bytearray()
+            while len(data) <= MAX_BODY_BYTES:
+                block = await reader.read(MAX_BODY_BYTES + 1 - len(data))
+                if not block:
+                    break
+                data += block
+            if len(data) > MAX_BODY_BYTES:
+                # The client gets an empty reply and converts the text itself
+                print("Error: Daemon request too large", file=sys.stderr)
+                return
+            text = data.decode("utf-8").strip()
+            self._reload_settings()
+            try:
+                hashtag = self.generator.format_hashtag(text)
+            except Exception as e:
+                # The client gets an empty reply; the daemon keeps running
+                print(f"Error: Could not convert text: {e}", file=sys.stderr)
+                return
+            self._queue_history([hashtag])
+            writer.write(hashtag.encode("utf-8"))
+            await writer.drain()
+        except (ConnectionError, UnicodeDecodeError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _handle_connection(self, reader, writer):
+        """Answer requests on one connection until it is closed"""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+
+                keep_alive = False
+                try:
+                    request_line, *header_lines = head[:-4].decode("latin-1").split("\r\n")
+                    method, target, version = request_line.split(" ", 2)
+                    headers = {}
+                    for line in header_lines:
+                        name, _, value = line.partition(":")
+                        headers[name.strip().lower()] = value.strip()
+
+                    connection = headers.get("connection", "").lower()
+                    if version == "HTTP/1.1":
+                        keep_alive = connection != "close"
+                    else:
+                        keep_alive = connection == "keep-alive"
+
+                    if "chunked" in headers.get("transfer-encoding", "").lower():
+                        raise RequestError(501, "Chunked request bodies are not supported")
+                    length = int(headers.get("content-length") or 0)
+                    if length > MAX_BODY_BYTES:
+                        raise RequestError(413, "Request body too large")
+
+                    body = await reader.readexactly(length) if length else b""
+                    status, content_type, payload = self.dispatch(method, target, headers, body)
+                except RequestError as e:
+                    keep_alive = keep_alive and e.status < 500 and e.status != 413
+                    status, content_type, payload = e.status, "application/json", self._error(e)
+                except ValueError as e:
+                    keep_alive = False
+                    status, content_type, payload = 400, "application/json", self._error(e)
+
+                writer.write(self._response(status, content_type, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    def _error(self, error):
+        """Encode an error message as a JSON body"""
+        return json.dumps({"error": str(error)}).encode()
+
+    def _response(self, status, content_type, payload, keep_alive):
+        """Build the raw HTTP response"""
+        head = (
+            f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            "\r\n"
+        )
+        return head.encode("latin-1") + payload
+
+    def dispatch(self, method, target, headers, body):
+        """Route a request, returning (status, content type, body bytes)"""
+        url = urlsplit(target)
+        self._reload_settings()
+
+        if url.path == "/health":
+            return 200, "application/json", b'{"status": "ok"}'
+
+        if url.path == "/metrics" and self.generator.stats.enabled:
+            return (200, "text/plain; version=0.0.4",
+                    self.generator.collect_stats().to_prometheus().encode())
+
+        if url.path == "/hashtag":
+            if method == "GET":
+                text = parse_qs(url.query).get("text", [""])[0]
+            elif method == "POST":
+                text = self._text_of(self._parse_json(body))
+            else:
+                raise RequestError(405, "Use GET or POST")
+            hashtag = self._convert(self.generator.format_hashtag, text)
+            self.generator.stats.count("tags_generated")
+            self._queue_history([hashtag])
+            return 200, "application/json", json.dumps({"hashtag": hashtag}).encode()
+
+        if url.path == "/batch":
+            if method != "POST":
+                raise RequestError(405, "Use POST")
+            ndjson = "ndjson" in headers.get("content-type", "")
+            if ndjson:
+                texts = [self._text_of(json.loads(line))
+                         for line in body.decode("utf-8").splitlines() if line.strip()]
+            else:
+                items = self._parse_json(body)
+                if not isinstance(items, list):
+                    raise RequestError(400, "Expected a JSON array")
+                texts = [self._text_of(item) for item in items]
+
+            hashtags = self._convert(self.generator.get_transformer().transform_many, texts)
+            self.generator.stats.count("tags_generated", len(hashtags))
+            self._queue_history(hashtags)
+
+            if ndjson:
+                payload = "".join(json.dumps({"text": text, "hashtag": hashtag}) + "\n"
+                                  for text, hashtag in zip(texts, hashtags))
+                return 200, "application/x-ndjson", payload.encode()
+            return 200, "application/json", json.dumps({"hashtags": hashtags}).encode()
+
+        raise RequestError(404, f"Unknown path {url.path}")
+
+    def _convert(self, convert, text):
+        """Return convert(text), turning an error in a plugin stage into a 500 response"""
+        try:
+            return convert(text)
+        except Exception as e:
+            raise RequestError(500, f"Could not convert text: {e}")
+
+    def _parse_json(self, body):
+        """Decode a JSON request body"""
+        try:
+            return json.loads(body or b"null")
+        except ValueError as e:
+            raise RequestError(400, f"Invalid JSON: {e}")
+
+    def _text_of(self, item):
+        """Accept either a plain string or an object with a "text" field"""
+        if isinstance(item, dict):
+            item = item.get("text")
+        if not isinstance(item, str):
+            raise RequestError(400, "Expected a string or an object with a \"text\" string")
+        return item
+
+    def _queue_history(self, hashtags):
+        """Queue generated tags for the history thread"""
+        self._pending.extend(hashtag for hashtag in hashtags if hashtag)
+
+
+def _daemon_running(socket_path):
+    """Return True if a daemon answers on socket_path, removing a stale socket"""
+    if not os.path.exists(socket_path):
+        return False
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(str(socket_path))
+            return True
+        except OSError:
+            os.unlink(socket_path)
+            return False
+
+
+def run(generator, host="127.0.0.1", port=8080):
+    """Run the HTTP service until interrupted"""
+    server = HashtagServer(generator, host, port)
+    print(f"Serving hashtags on http://{host}:{port} (Ctrl+C to stop)")
+    _serve(server)
+
+
+def run_daemon(generator, socket_path):
+    """Run the Unix socket daemon used by client.py until interrupted"""
+    if not hasattr(socket, "AF_UNIX"):
+        print("Error: The daemon needs Unix domain sockets", file=sys.stderr)
+        return
+    try:
+        # On a fresh install nothing has created the config directory yet
+        os.makedirs(os.path.dirname(os.path.abspath(socket_path)), exist_ok=True)
+    except OSError as e:
+        print(f"Error: Could not create the socket directory: {e}", file=sys.stderr)
+        return
+    if _daemon_running(socket_path):
+        print(f"Error: A daemon is already running on {socket_path}", file=sys.stderr)
+        return
+
+    server = HashtagServer(generator, socket_path=socket_path)
+    print(f"Hashtag daemon listening on {socket_path} (Ctrl+C to stop)")
+    _serve(server)
+
+
+def _serve(server):
+    """Run a server on a new event loop until it is interrupted"""
+    try:
+        asyncio.run(server.serve())
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
@@ -0,0 +1,137 @@
+"""Optional timing and counters for the Hashtag Generator CLI"""
+
+import json
+import time
+import threading
+from contextlib import contextmanager, nullcontext
+
+# Shared no-op context returned by NullStats.stage
+_NO_STAGE = nullcontext()
+
+
+def utf8_size(text):
+    """Return the size of text in bytes once encoded as UTF-8"""
+    return len(text) if text.isascii() else len(text.encode("utf-8", "surrogatepass"))
+
+
+class NullStats:
+    """Stand-in used when instrumentation is disabled; every call is a no-op"""
+
+    enabled = False
+
+    def stage(self, name):
+        return _NO_STAGE
+
+    def count(self, name, amount=1):
+        pass
+
+    def set(self, name, value):
+        pass
+
+
+class Stats:
+    """Per-stage wall and CPU time plus named counters
+
+    Updates are guarded by a lock, as the HTTP service records stages on
+    its history thread as well as on the event loop.
+    """
+
+    enabled = True
+
+    def __init__(self):
+        # Stage name -> [calls, wall seconds, CPU seconds]
+        self.stages = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Worker processes get their own lock
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block as one call of the named stage"""
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            with self._lock:
+                entry = self.stages.setdefault(name, [0, 0.0, 0.0])
+                entry[0] += 1
+                entry[1] += wall
+                entry[2] += cpu
+
+    def count(self, name, amount=1):
+        """Add amount to the named counter"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def set(self, name, value):
+        """Overwrite the named counter with a total tracked elsewhere"""
+        with self._lock:
+            self.counters[name] = value
+
+    def _snapshot(self):
+        """Return copies of the stages and counters taken under the lock"""
+        with self._lock:
+            return ({name: tuple(entry) for name, entry in self.stages.items()},
+                    dict(self.counters))
+
+    def to_dict(self):
+        """Return stages and counters as plain data"""
+        stages, counters = self._snapshot()
+        return {
+            "stages": {
+                name: {"calls": calls, "wall_seconds": wall, "cpu_seconds": cpu}
+                for name, (calls, wall, cpu) in stages.items()
+            },
+            "counters": counters,
+        }
+
+    def to_json(self):
+        """Return the stats as a JSON document"""
+        return json.dumps(self.to_dict(), indent=2)
+
+    def summary(self):
+        """Return a human-readable table of stages and counters"""
+        stages, counters = self._snapshot()
+        # Plugin stages can have longer names than the built-in ones
+        width = max([16] + [len(name) for name in stages] + [len(name) for name in counters])
+        lines = ["", "Stage timings:",
+                 f"  {'stage':<{width}} {'calls':>10} {'wall (s)':>12} {'cpu (s)':>12}"]
+        for name, (calls, wall, cpu) in sorted(stages.items(), key=lambda item: -item[1][1]):
+            lines.append(f"  {name:<{width}} {calls:>10} {wall:>12.6f} {cpu:>12.6f}")
+
+        lines.append("Counters:")
+        for name, value in sorted(counters.items()):
+            lines.append(f"  {name:<{width}} {value:>10}")
+        return "\n".join(lines)
+
+    def to_prometheus(self):
+        """Return the stats in the Prometheus text exposition format"""
+        stages, counters = self._snapshot()
+        lines = []
+        for metric, index, help_text in (
+            ("hashtag_stage_calls_total", 0, "Calls of each processing stage"),
+            ("hashtag_stage_seconds_total", 1, "Wall time spent in each stage"),
+            ("hashtag_stage_cpu_seconds_total", 2, "CPU time spent in each stage"),
+        ):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for name, entry in sorted(stages.items()):
+                lines.append(f'{metric}{{stage="{name}"}} {entry[index]}')
+
+        for name, value in sorted(counters.items()):
+            metric = f"hashtag_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
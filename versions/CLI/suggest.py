@@ -0,0 +1,400 @@
+"""Prefix index over generated hashtags for fast suggestions
+
+Tags are kept case-folded in a sorted list that is searched with binary
+search. Ranking every tag under a short prefix such as "#s" would still
+mean scanning a large part of that list, so each prefix shared by more
+than HEAVY_PREFIX_TAGS tags keeps its best RANKED_TAGS tags precomputed
+and updated as tags are added. Every other prefix matches few enough tags
+to rank on the fly.
+
+The index only keeps the most recently used tags, at least
+SUGGEST_MIN_ITEMS and at least as many as history, so converting a large
+file costs a bounded amount of memory and disk.
+"""
+
+import os
+import sys
+import json
+import heapq
+from bisect import bisect_left, insort
+from collections import Counter
+from itertools import islice
+
+from history import JOURNAL_FLUSH_ITEMS, atomic_write_json, file_lock
+
+# Bump whenever the saved index layout changes
+SUGGEST_FORMAT = 1
+
+# Prefixes shared by more tags than this keep a precomputed ranking
+HEAVY_PREFIX_TAGS = 256
+
+# Length of each precomputed ranking; longer requests rank the whole range
+RANKED_TAGS = 20
+
+# A score packs the use count above a sequence number, so ties in use count
+# go to the most recently used tag
+SEQ_BITS = 40
+
+# Fewest tags kept in the index, so suggestions outlast a short history
+SUGGEST_MIN_ITEMS = 10000
+
+# On exit, the journal is folded into the saved index once it is larger
+# than both this and the index, so the cost of rewriting the index is
+# spread over at least as many bytes of journal
+SUGGEST_COMPACT_BYTES = 1024 * 1024
+
+
+def _prefix_end(prefix):
+    """Return the smallest string sorting after every string starting with prefix
+
+    Returns None when there is no such string, as for the empty prefix.
+    """
+    while prefix and prefix[-1] == chr(sys.maxunicode):
+        prefix = prefix[:-1]
+    if not prefix:
+        return None
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class PrefixIndex:
+    """Case-insensitive prefix search over tags, ranked by use count then recency"""
+
+    def __init__(self):
+        # Case-folded tags in sorted order
+        self.keys = []
+        # Key -> tag as most recently added
+        self.tags = {}
+        # Key -> (use count << SEQ_BITS) | sequence number of the last use
+        self.scores = {}
+        # Heavy prefix -> up to RANKED_TAGS keys, best first
+        self._ranked = {}
+        self._seq = 0
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _range(self, prefix):
+        """Return the slice bounds of the keys starting with prefix"""
+        keys = self.keys
+        lo = bisect_left(keys, prefix)
+        end = _prefix_end(prefix)
+        return lo, len(keys) if end is None else bisect_left(keys, end, lo)
+
+    def _rank(self, keys, limit):
+        return heapq.nlargest(limit, keys, key=self.scores.__getitem__)
+
+    def _count(self, key, tag, count):
+        """Record count more uses of key, returning True if it is new"""
+        scores = self.scores
+        old = scores.get(key, 0)
+        self._seq += 1
+        scores[key] = ((old >> SEQ_BITS) + count) << SEQ_BITS | self._seq
+        self.tags[key] = tag
+        return not old
+
+    def add(self, tag, count=1):
+        """Count count more uses of tag"""
+        key = tag.casefold()
+        is_new = self._count(key, tag, count)
+        if is_new:
+            insort(self.keys, key)
+
+        # Heavy prefixes are nested, so the first light one ends the walk.
+        # A new tag can push light prefixes over the threshold, which then
+        # get ranked from their (still short) range.
+        scores = self.scores
+        score = scores[key]
+        ranked = self._ranked
+        for length in range(len(key) + 1):
+            prefix = key[:length]
+            top = ranked.get(prefix)
+            if top is None:
+                if not is_new:
+                    break
+                lo, hi = self._range(prefix)
+                if hi - lo <= HEAVY_PREFIX_TAGS:
+                    break
+                ranked[prefix] = self._rank(self.keys[lo:hi], RANKED_TAGS)
+            elif key in top:
+                top.sort(key=scores.__getitem__, reverse=True)
+            elif len(top) < RANKED_TAGS or score > scores[top[-1]]:
+                top.append(key)
+                top.sort(key=scores.__getitem__, reverse=True)
+                del top[RANKED_TAGS:]
+
+    def add_counts(self, counts):
+        """Add a mapping of tag -> use count, least recently used first
+
+        Large updates re-sort the keys and rebuild every ranking in one pass
+        instead of updating them tag by tag.
+        """
+        if len(counts) <= len(self.keys) // 16 + HEAVY_PREFIX_TAGS:
+            for tag, count in counts.items():
+                self.add(tag, count)
+            return
+
+        new_keys = []
+        for tag, count in counts.items():
+            key = tag.casefold()
+            if self._count(key, tag, count):
+                new_keys.append(key)
+        if new_keys:
+            # Sorting two sorted runs is a linear merge
+            new_keys.sort()
+            self.keys += new_keys
+            self.keys.sort()
+        self._rebuild_rankings()
+
+    def _children(self, prefix, lo, hi):
+        """Split the range of prefix by the character that follows it
+
+        Returns (child prefix, lo, hi) tuples; a key equal to prefix itself
+        sorts first and belongs to no child.
+        """
+        keys = self.keys
+        depth = len(prefix)
+        if lo < hi and len(keys[lo]) == depth:
+            lo += 1
+        children = []
+        while lo < hi:
+            child = keys[lo][:depth + 1]
+            end = bisect_left(keys, _prefix_end(child), lo, hi)
+            children.append((child, lo, end))
+            lo = end
+        return children
+
+    def _rebuild_rankings(self):
+        """Rank every heavy prefix, deepest first
+
+        Each ranking is merged from the rankings of its heavy children and
+        the keys of its light ones, so every key is ranked about once.
+        """
+        keys = self.keys
+        ranked = {}
+        stack = [("", 0, len(keys), None)] if len(keys) > HEAVY_PREFIX_TAGS else []
+        while stack:
+            prefix, lo, hi, children = stack.pop()
+            if children is None:
+                children = self._children(prefix, lo, hi)
+                stack.append((prefix, lo, hi, children))
+                stack.extend((child, child_lo, child_hi, None)
+                             for child, child_lo, child_hi in children
+                             if child_hi - child_lo > HEAVY_PREFIX_TAGS)
+                continue
+
+            candidates = [prefix] if keys[lo] == prefix else []
+            for child, child_lo, child_hi in children:
+                if child_hi - child_lo > HEAVY_PREFIX_TAGS:
+                    candidates += ranked[child]
+                else:
+                    candidates += keys[child_lo:child_hi]
+            ranked[prefix] = self._rank(candidates, RANKED_TAGS)
+        self._ranked = ranked
+
+    def suggest(self, prefix, limit=10):
+        """Return up to limit tags starting with prefix, best first"""
+        if limit <= 0:
+            return []
+        key = prefix.casefold()
+        top = self._ranked.get(key)
+        if top is not None and limit <= RANKED_TAGS:
+            found = top[:limit]
+        else:
+            lo, hi = self._range(key)
+            found = self._rank(self.keys[lo:hi], limit)
+        return [self.tags[key] for key in found]
+
+    def prune(self, max_items):
+        """Keep only the max_items most recently used tags"""
+        if len(self.keys) <= max_items:
+            return
+        scores = self.scores
+        seq_mask = (1 << SEQ_BITS) - 1
+        keys = heapq.nlargest(max_items, self.keys, key=lambda key: scores[key] & seq_mask)
+        keys.sort()
+        self.keys = keys
+        self.tags = {key: self.tags[key] for key in keys}
+        self.scores = {key: scores[key] for key in keys}
+        self._rebuild_rankings()
+
+    def clear(self):
+        """Remove every tag"""
+        self.__init__()
+
+    def to_dict(self):
+        """Return the index as JSON-serializable data
+
+        Rankings are saved as positions in the key list so that loading
+        skips both the sort and the ranking pass.
+        """
+        keys = self.keys
+        return {
+            "format": SUGGEST_FORMAT,
+            "seq": self._seq,
+            "tags": [self.tags[key] for key in keys],
+            "scores": [self.scores[key] for key in keys],
+            "ranked": {prefix: [bisect_left(keys, key) for key in top]
+                       for prefix, top in self._ranked.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild an index saved with to_dict"""
+        if data.get("format") != SUGGEST_FORMAT:
+            raise ValueError("unsupported suggestion index format")
+        index = cls()
+        tags = data["tags"]
+        keys = index.keys = [tag.casefold() for tag in tags]
+        index.tags = dict(zip(keys, tags))
+        index.scores = dict(zip(keys, data["scores"]))
+        index._ranked = {prefix: [keys[i] for i in top] for prefix, top in data["ranked"].items()}
+        index._seq = data["seq"]
+        return index
+
+
+class SuggestionStore:
+    """Persistence for the prefix index, shared safely between processes
+
+    Works like HistoryJournal: new tags are appended to
+    suggestions.journal, one list of [tag, count] pairs per flush, under an
+    exclusive lock, and folded into the suggestions.json index the next
+    time it is loaded or on exit once the journal is large, so generating
+    a tag never has to read the index. At most max_items tags are kept,
+    with max_items no lower than SUGGEST_MIN_ITEMS.
+    """
+
+    def __init__(self, config_dir, max_items=SUGGEST_MIN_ITEMS):
+        self.index_file = config_dir / "suggestions.json"
+        self.journal_file = config_dir / "suggestions.journal"
+        self.lock_file = config_dir / "suggestions.lock"
+        self.max_items = max(max_items, SUGGEST_MIN_ITEMS)
+        # Tag -> count not yet written to the journal
+        self._pending = Counter()
+        # The loaded index, kept up to date once it has been read
+        self._index = None
+
+    def exists(self):
+        """Return True if an index or journal has been written"""
+        return self.index_file.exists() or self.journal_file.exists()
+
+    def record(self, hashtag):
+        """Queue one use of a tag"""
+        self.record_many((hashtag,))
+
+    def record_many(self, hashtags):
+        """Queue one use of every non-empty tag, flushing once enough are pending"""
+        # Counted in C; tags between two flushes stay in order of first use
+        self._pending.update(hashtags)
+        index = self._index
+        if index is not None:
+            for hashtag in hashtags:
+                if hashtag:
+                    index.add(hashtag)
+        self._recorded()
+
+    def record_counts(self, counts):
+        """Queue a mapping of tag -> use count, in order of first use
+
+        Used to merge the tags of a chunk converted by another process.
+        """
+        self._pending.update(counts)
+        if self._index is not None:
+            self._index.add_counts({tag: count for tag, count in counts.items() if tag})
+        self._recorded()
+
+    def _recorded(self):
+        """Keep pending tags and the loaded index bounded, flushing once enough are pending"""
+        pending = self._pending
+        pending.pop("", None)
+        excess = len(pending) - self.max_items
+        if excess > 0:
+            # Tags first used longest ago would be pruned from the index anyway
+            for hashtag in list(islice(pending, excess)):
+                del pending[hashtag]
+
+        index = self._index
+        if index is not None and len(index) > 2 * self.max_items:
+            index.prune(self.max_items)
+        if len(pending) >= JOURNAL_FLUSH_ITEMS:
+            self.flush()
+
+    def flush(self):
+        """Append pending tags to the journal with a single synced write
+
+        Returns the journal size afterwards, or 0 if nothing was written.
+        """
+        if not self._pending:
+            return 0
+
+        # One line per flush: a list of [tag, count] pairs
+        data = json.dumps(list(self._pending.items())) + "\n"
+        with file_lock(self.lock_file):
+            with open(self.journal_file, "a") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+                journal_size = f.tell()
+        self._pending.clear()
+        return journal_size
+
+    def load(self):
+        """Return the index, which then also receives every recorded tag"""
+        if self._index is None:
+            self._index = self.compact()
+        return self._index
+
+    def compact(self):
+        """Fold the journal into the saved index and return the index"""
+        self.flush()
+        with file_lock(self.lock_file):
+            index = PrefixIndex()
+            if self.index_file.exists():
+                try:
+                    with open(self.index_file, "r") as f:
+                        index = PrefixIndex.from_dict(json.load(f))
+                except Exception as e:
+                    print(f"Warning: Could not load suggestions: {e}", file=sys.stderr)
+
+            changed = self.journal_file.exists()
+            if changed:
+                counts = {}
+                with open(self.journal_file, "r") as f:
+                    for line in f:
+                        try:
+                            pairs = json.loads(line)
+                        except ValueError:
+                            # Skip a line torn by a crash mid-write
+                            continue
+                        for tag, count in pairs:
+                            counts[tag] = counts.pop(tag, 0) + count
+                index.add_counts(counts)
+            if len(index) > self.max_items:
+                index.prune(self.max_items)
+                changed = True
+            
+            if changed:
+                atomic_write_json(self.index_file, index.to_dict(), indent=None)
+                if self.journal_file.exists():
+                    os.unlink(self.journal_file)
+        return index
+
+    def clear(self):
+        """Drop all stored and pending suggestions"""
+        self._pending.clear()
+        self._index = None
+        with file_lock(self.lock_file):
+            for path in (self.index_file, self.journal_file):
+                if path.exists():
+                    os.unlink(path)
+
+    def close(self):
+        """Flush pending tags before exit, compacting if the journal has grown large"""
+        journal_size = self.flush()
+        if journal_size < SUGGEST_COMPACT_BYTES:
+            return
+        try:
+            index_size = self.index_file.stat().st_size
+        except FileNotFoundError:
+            index_size = 0
+        if journal_size >= index_size:
+            self.compact()
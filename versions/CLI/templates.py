@@ -0,0 +1,167 @@
+"""Templates rendered around generated hashtags in bulk
+
+A template such as "{brand} {#phrase} #{year}" is parsed once into a
+printf-style format string. "{name}" inserts the value of the input column
+name as is and "{#name}" inserts the hashtag generated from it. Rows are
+read a chunk at a time as columns, so each hashtag column goes through the
+transformer in one batch and rendering is a single % per row.
+"""
+
+import csv
+import json
+import string
+from itertools import islice
+
+INPUT_FORMATS = ("text", "csv", "ndjson")
+
+# File extensions that select an input format when none is given
+INPUT_EXTENSIONS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+
+# Column holding each line of plain text input
+TEXT_COLUMN = "text"
+
+
+def input_format_for_filename(filename):
+    """Return the input format implied by a file name, text if none"""
+    name = (filename or "").lower()
+    for extension, input_format in INPUT_EXTENSIONS.items():
+        if name.endswith(extension):
+            return input_format
+    return "text"
+
+
+class Template:
+    """A template compiled into a format string and the columns it reads"""
+
+    def __init__(self, source):
+        self.source = source
+        parts = []
+        # (column, is_hashtag) for each %s in the format string
+        self.slots = []
+        try:
+            parsed = list(string.Formatter().parse(source))
+        except ValueError as e:
+            raise ValueError(f"Invalid template: {e}") from None
+
+        for literal, field, spec, conversion in parsed:
+            parts.append(literal.replace("%", "%%"))
+            if field is None:
+                continue
+            if spec or conversion:
+                raise ValueError(f"Template field '{{{field}}}' cannot have a format spec "
+                                 "or conversion")
+            is_hashtag = field.startswith("#")
+            column = field[1:] if is_hashtag else field
+            if not column:
+                raise ValueError("Template fields need a column name, as in {phrase} "
+                                 "or {#phrase}")
+            parts.append("%s")
+            self.slots.append((column, is_hashtag))
+        if not self.slots:
+            raise ValueError("Template has no fields, such as {#text}")
+        self._format = "".join(parts)
+
+    @property
+    def columns(self):
+        """Return every column the template reads, in order of first use"""
+        return list(dict.fromkeys(column for column, _ in self.slots))
+
+    @property
+    def hashtag_columns(self):
+        """Return the columns that are turned into hashtags"""
+        return list(dict.fromkeys(column for column, is_hashtag in self.slots if is_hashtag))
+
+    def render_many(self, columns, hashtags):
+        """Render one string per row
+
+        columns maps each column name to a list of values, and hashtags
+        maps each column in hashtag_columns to its list of hashtags.
+        """
+        values = [hashtags[column] if is_hashtag else columns[column]
+                  for column, is_hashtag in self.slots]
+        fmt = self._format
+        if len(values) == 1:
+            return [fmt % (value,) for value in values[0]]
+        return [fmt % row for row in zip(*values)]
+
+
+def _text_chunks(source, chunk_rows):
+    """Yield {"text": lines} for chunks of plain text lines"""
+    source = iter(source)
+    while True:
+        chunk = [line.strip() for line in islice(source, chunk_rows)]
+        if not chunk:
+            return
+        yield {TEXT_COLUMN: chunk}
+
+
+def _csv_chunks(source, columns, chunk_rows):
+    """Yield the named columns of a CSV file with a header row, chunk by chunk"""
+    reader = csv.reader(source)
+    header = next(reader, None)
+    if header is None:
+        return
+    positions = {}
+    for column in columns:
+        if column not in header:
+            raise ValueError(f"Column '{column}' is not in the CSV header")
+        positions[column] = header.index(column)
+    width = len(header)
+
+    while True:
+        rows = list(islice(reader, chunk_rows))
+        if not rows:
+            return
+        try:
+            yield {column: [row[i] for row in rows] for column, i in positions.items()}
+        except IndexError:
+            # Short rows leave their missing columns empty
+            rows = [row + [""] * (width - len(row)) for row in rows]
+            yield {column: [row[i] for row in rows] for column, i in positions.items()}
+
+
+def _to_text(value):
+    if value is None:
+        return ""
+    return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+
+
+def _ndjson_chunks(source, columns, chunk_rows):
+    """Yield the named fields of NDJSON objects, chunk by chunk
+
+    Blank lines are skipped, missing fields are empty and other values
+    than strings are written as JSON.
+    """
+    source = iter(source)
+    loads = json.loads
+    while True:
+        lines = list(islice(source, chunk_rows))
+        if not lines:
+            return
+        records = [loads(line) for line in lines if not line.isspace()]
+        if not all(isinstance(record, dict) for record in records):
+            raise ValueError("Every NDJSON line must be a JSON object")
+        chunk = {}
+        for column in columns:
+            values = [record.get(column, "") for record in records]
+            if not all(type(value) is str for value in values):
+                values = [_to_text(value) for value in values]
+            chunk[column] = values
+        if records:
+            yield chunk
+
+
+def read_columns(source, input_format, columns, chunk_rows):
+    """Yield dicts mapping each column name to a chunk of its values
+
+    Plain text input has the single column "text".
+    """
+    if input_format == "csv":
+        return _csv_chunks(source, columns, chunk_rows)
+    if input_format == "ndjson":
+        return _ndjson_chunks(source, columns, chunk_rows)
+    unknown = [column for column in columns if column != TEXT_COLUMN]
+    if unknown:
+        raise ValueError(f"Plain text input only has the column '{TEXT_COLUMN}', "
+                         f"not '{unknown[0]}'; use CSV or NDJSON input")
+    return _text_chunks(source, chunk_rows)
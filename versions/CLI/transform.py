@@ -0,0 +1,254 @@
+"""Hashtag transformation engine shared by the CLI and the GUI
+
+Settings are compiled once into a HashtagTransformer, which converts a
+single text or a whole batch joined into one string. An optional LRU
+ResultCache serves repeated input.
+"""
+
+import re
+from collections import OrderedDict
+
+# Matches every character that is neither alphanumeric nor whitespace,
+# the same set the c.isalnum() or c.isspace() filter drops ("_" is in \w)
+SPECIAL_CHARS_PATTERN = re.compile(r"[^\w\s]|_")
+
+# Whitespace removal. str.translate deletes every ASCII whitespace
+# character from a whole batch in one pass, but has too much per-call
+# overhead for single texts. The batch variants keep the newlines that
+# transform_many splits its results on.
+ASCII_BATCH_SPACES_TABLE = str.maketrans(
+    "", "", "".join(c for c in map(chr, range(128)) if c.isspace() and c != "\n"))
+SPACES_PATTERN = re.compile(r"\s")
+BATCH_SPACES_PATTERN = re.compile(r"[^\S\n]")
+
+
+def remove_spaces(text, batch=False):
+    """Remove all whitespace, not just plain spaces"""
+    if batch and text.isascii():
+        return text.translate(ASCII_BATCH_SPACES_TABLE)
+    text = text.replace(" ", "")
+    # Every whitespace character other than " " is unprintable
+    if not text.isprintable():
+        text = (BATCH_SPACES_PATTERN if batch else SPACES_PATTERN).sub("", text)
+    return text
+
+
+class ResultCache:
+    """Bounded LRU cache of text -> hashtag for one settings fingerprint"""
+
+    def __init__(self, max_items, fingerprint):
+        self.max_items = max_items
+        # (remove_special_chars, capitalize_first_letter, normalize_unicode,
+        # plugin specs joined by newlines) the results belong to
+        self.fingerprint = tuple(fingerprint)
+        self.hits = 0
+        self.misses = 0
+        self.changed = False
+        self._items = OrderedDict()
+
+    def get(self, text):
+        """Return the cached hashtag for text, or None"""
+        hashtag = self._items.get(text)
+        if hashtag is None:
+            self.misses += 1
+            return None
+        self._items.move_to_end(text)
+        self.hits += 1
+        return hashtag
+
+    def put(self, text, hashtag):
+        """Cache a result, evicting the least recently used one if full"""
+        self._items[text] = hashtag
+        self.changed = True
+        if len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+
+    def to_dict(self):
+        """Return the cache as JSON-serializable data"""
+        return {"fingerprint": list(self.fingerprint), "entries": list(self._items.items())}
+
+    @classmethod
+    def from_dict(cls, data, max_items):
+        """Rebuild a cache saved with to_dict"""
+        cache = cls(max_items, data["fingerprint"])
+        for text, hashtag in data["entries"][-max_items:]:
+            cache._items[text] = hashtag
+        return cache
+
+    def __len__(self):
+        return len(self._items)
+
+
+class HashtagTransformer:
+    """Hashtag settings compiled once into a reusable text transformer"""
+
+    def __init__(self, remove_special_chars, capitalize_first_letter, cache=None, tables=None,
+                 pipeline=None):
+        """Resolve the enabled steps up front so each call only does the work
+
+        With Unicode tables, non-ASCII text is NFKC-normalized and filtered
+        by the tables' code point classes instead of str.isalnum(). A plugin
+        pipeline adds its stages before and after the built-in steps.
+        """
+        self.remove_special_chars = remove_special_chars
+        self.capitalize_first_letter = capitalize_first_letter
+        self.cache = cache
+        self.tables = tables
+        self.pipeline = pipeline
+        self.normalize_unicode = tables is not None
+        self._strip_special = SPECIAL_CHARS_PATTERN.sub if remove_special_chars else None
+
+    def _filter(self, text):
+        """Normalize text and drop the characters the settings exclude"""
+        if self.tables is not None and not text.isascii():
+            return self.tables.normalize(text, self.remove_special_chars)
+        if self._strip_special:
+            return self._strip_special("", text)
+        return text
+
+    def _transform_body(self, text, batch=False):
+        """Apply the enabled steps to text, without the hashtag symbol"""
+        text = self._filter(text)
+        if self.capitalize_first_letter:
+            text = text.title()
+        return remove_spaces(text, batch)
+
+    def _transform_one(self, text):
+        """Transform a non-empty text without the cache"""
+        if self.pipeline is None:
+            return "#" + self._transform_body(text)
+        return self._transform_many_uncached([text])[0]
+
+    def transform(self, text):
+        """Transform a single text into a hashtag"""
+        if not text:
+            return ""
+        cache = self.cache
+        if cache is None:
+            return self._transform_one(text)
+
+        hashtag = cache.get(text)
+        if hashtag is None:
+            hashtag = self._transform_one(text)
+            cache.put(text, hashtag)
+        return hashtag
+
+    def transform_many(self, texts):
+        """Transform a sequence of texts into a list of hashtags
+
+        The texts are joined with newlines and run through each step as one
+        string, which is only safe when no text contains a newline itself.
+        """
+        if not isinstance(texts, (list, tuple)):
+            texts = list(texts)
+        if not texts:
+            return []
+        if self.cache is not None:
+            return self._transform_many_cached(texts)
+        return self._transform_many_uncached(texts)
+
+    def _transform_many_uncached(self, texts):
+        """Run a list of texts through the plugin stages and built-in steps"""
+        pipeline = self.pipeline
+        sources = texts
+        if pipeline is not None:
+            texts = pipeline.run("before", texts)
+
+        joined = "\n".join(texts)
+        if joined.count("\n") != len(texts) - 1:
+            bodies = [self._transform_body(text) for text in texts]
+        else:
+            bodies = self._transform_body(joined, batch=True).split("\n")
+
+        if pipeline is not None:
+            bodies = pipeline.run("after", bodies)
+        return ["#" + body if text else "" for text, body in zip(sources, bodies)]
+
+    def _transform_many_cached(self, texts):
+        """Look every distinct text up in the cache and transform only the misses
+
+        A text repeated within texts is looked up once and counts as a hit
+        for every later occurrence.
+        """
+        cache = self.cache
+        found = dict.fromkeys(texts)
+        for text in found:
+            found[text] = cache.get(text)
+        cache.hits += len(texts) - len(found)
+        missing = [text for text, hashtag in found.items() if hashtag is None]
+        if missing:
+            self.cache = None
+            try:
+                computed = self.transform_many(missing)
+            finally:
+                self.cache = cache
+            for text, hashtag in zip(missing, computed):
+                cache.put(text, hashtag)
+                found[text] = hashtag
+        return [found[text] for text in texts]
+
+
+class InstrumentedTransformer(HashtagTransformer):
+    """HashtagTransformer that records the time spent in each step"""
+
+    def __init__(self, remove_special_chars, capitalize_first_letter, stats, cache=None,
+                 tables=None, pipeline=None):
+        super().__init__(remove_special_chars, capitalize_first_letter, cache, tables, pipeline)
+        self.stats = stats
+
+    def _transform_body(self, text, batch=False):
+        """Apply the enabled steps to text, timing each one"""
+        with self.stats.stage("filter"):
+            text = self._filter(text)
+        if self.capitalize_first_letter:
+            with self.stats.stage("title"):
+                text = text.title()
+        with self.stats.stage("strip_spaces"):
+            return remove_spaces(text, batch)
+
+
+class VariantTransformer:
+    """Several setting profiles applied to the same texts in one pass"""
+
+    def __init__(self, variants):
+        """Build from a list of (name, HashtagTransformer) pairs"""
+        self.names = [name for name, _ in variants]
+        self.transformers = [transformer for _, transformer in variants]
+
+    def transform_many(self, texts):
+        """Return one column of hashtags per variant for a sequence of texts
+
+        The special-character filter and title() run at most once for each
+        distinct setting, and their results are shared between variants.
+        Plugin stages, which every variant shares, run once per column.
+        """
+        if not isinstance(texts, (list, tuple)):
+            texts = list(texts)
+        pipeline = self.transformers[0].pipeline if self.transformers else None
+        sources = texts
+        if pipeline is not None:
+            texts = pipeline.run("before", texts)
+
+        joined = "\n".join(texts)
+        if joined.count("\n") != len(texts) - 1:
+            return [[t.transform(text) for text in sources] for t in self.transformers]
+
+        filtered = {}
+        bodies = {}
+        columns = []
+        for transformer in self.transformers:
+            key = (transformer.remove_special_chars, transformer.capitalize_first_letter,
+                   transformer.normalize_unicode)
+            if key not in bodies:
+                remove_special, capitalize, normalize = key
+                if (remove_special, normalize) not in filtered:
+                    filtered[remove_special, normalize] = transformer._filter(joined)
+                body = filtered[remove_special, normalize]
+                if capitalize:
+                    body = body.title()
+                bodies[key] = remove_spaces(body, batch=True).split("\n")
+                if pipeline is not None:
+                    bodies[key] = pipeline.run("after", bodies[key])
+            columns.append(["#" + body if text else ""
+                            for text, body in zip(sources, bodies[key])])
+        return columns
@@ -0,0 +1,308 @@
+"""Follow mode for the Hashtag Generator CLI
+
+Input files are tailed and only the lines appended since the last read
+are converted. The byte offset reached in each file is saved in a
+checkpoint, together with the file's device and inode numbers, so a
+restart resumes where the previous run stopped and a rotated file is
+finished before its replacement is read from the top. Changes are
+picked up with inotify on Linux and by polling elsewhere.
+"""
+
+import os
+import sys
+import json
+import time
+import select
+
+from history import atomic_write_json
+
+# Bump whenever the checkpoint layout changes
+WATCH_FORMAT = 1
+
+# Checkpoint file in the config dir
+WATCH_CHECKPOINT_FILE = "watch.json"
+
+# Bytes read from a file at a time; a file that grew by more is
+# converted in several chunks
+WATCH_READ_SIZE = 1024 * 1024
+
+# Leading bytes saved with the offset, to tell a file that was truncated
+# and rewritten while nothing was watching it from one that only grew
+WATCH_HEAD_BYTES = 64
+
+# Seconds between checks for new data when there is no inotify event
+WATCH_POLL_INTERVAL = 0.5
+
+# The checkpoint is saved at most this often, in seconds, while a large
+# backlog is being converted, and whenever the input goes idle
+WATCH_CHECKPOINT_INTERVAL = 1.0
+
+
+class FollowedFile:
+    """One input file read incrementally across appends, rotation and truncation"""
+
+    def __init__(self, path, state=None):
+        self.path = os.path.abspath(path)
+        self._file = None
+        self.identity = None
+        self._head = b""
+        # Bytes read past the last complete line
+        self._partial = b""
+        self._resume(state or {})
+
+    @property
+    def offset(self):
+        """Return the offset just past the last line handed out"""
+        if self._file is None:
+            return 0
+        return self._file.tell() - len(self._partial)
+
+    def state(self):
+        """Return the checkpoint entry for this file"""
+        if self.identity is None:
+            return None
+        dev, ino = self.identity
+        offset = self.offset
+        if len(self._head) < min(offset, WATCH_HEAD_BYTES):
+            # The file was shorter than WATCH_HEAD_BYTES when it was opened
+            f = self._file
+            position = f.tell()
+            f.seek(0)
+            self._head = f.read(WATCH_HEAD_BYTES)
+            f.seek(position)
+        return {"dev": dev, "ino": ino, "offset": offset,
+                "head": self._head[:min(offset, WATCH_HEAD_BYTES)].hex()}
+
+    def _open(self, path, offset=0, head=b""):
+        """Open path at offset, returning False if it does not exist
+
+        The file is read from the top instead if it no longer starts with
+        head or is shorter than offset, as it was truncated since.
+        """
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return False
+        st = os.fstat(f.fileno())
+        self._head = f.read(WATCH_HEAD_BYTES)
+        if offset > st.st_size or not self._head.startswith(head):
+            offset = 0
+        f.seek(offset)
+        self._file = f
+        self.identity = (st.st_dev, st.st_ino)
+        self._partial = b""
+        return True
+
+    def _resume(self, state):
+        """Open the file at its checkpointed offset
+
+        If the file was rotated while nothing was watching it, the old
+        file is looked for next to it (as app.log.1 is next to app.log)
+        and finished first.
+        """
+        saved = (state.get("dev"), state.get("ino"))
+        offset = state.get("offset", 0)
+        head = bytes.fromhex(state.get("head", ""))
+        try:
+            st = os.stat(self.path)
+            current = (st.st_dev, st.st_ino)
+        except FileNotFoundError:
+            current = None
+
+        if current == saved:
+            self._open(self.path, offset, head)
+            return
+        if state:
+            rotated = self._find_rotated(saved)
+            if rotated is not None and self._open(rotated, offset, head):
+                return
+        self._open(self.path)
+
+    def _find_rotated(self, identity):
+        """Return the sibling of the file with the given identity, if any"""
+        directory, name = os.path.split(self.path)
+        try:
+            entries = os.scandir(directory)
+        except OSError:
+            return None
+        with entries:
+            for entry in entries:
+                if entry.name.startswith(name) and entry.name != name:
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    if (st.st_dev, st.st_ino) == identity:
+                        return entry.path
+        return None
+
+    def _drain(self):
+        """Yield the complete lines up to the end of the open file, a block at a time"""
+        f = self._file
+        while True:
+            data = f.read(WATCH_READ_SIZE)
+            if not data:
+                return
+            data = self._partial + data
+            end = data.rfind(b"\n") + 1
+            self._partial = data[end:]
+            if end:
+                yield data[:end - 1].decode("utf-8", "replace").split("\n")
+
+    def read_lines(self):
+        """Yield lists of the lines appended since the last call
+
+        A line is only handed out once its newline has been written.
+        """
+        while True:
+            if self._file is None and not self._open(self.path):
+                return
+            yield from self._drain()
+
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                # Rotated away and not yet replaced; keep the old file open
+                return
+            if (st.st_dev, st.st_ino) != self.identity:
+                # Rotated: finish the old file, then start the new one from the top
+                yield from self._drain()
+                # The last line of a rotated file may lack its newline
+                partial, self._partial = self._partial, b""
+                if partial:
+                    yield [partial.decode("utf-8", "replace")]
+                self.close()
+            elif st.st_size < self._file.tell():
+                # Truncated in place, as by copytruncate
+                self._file.seek(0)
+                self._partial = b""
+                self._head = b""
+            else:
+                return
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._partial = b""
+
+
+class _Inotify:
+    """Wakes the follow loop when a watched directory changes (Linux only)"""
+
+    IN_MODIFY = 0x002
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+
+    def __init__(self, libc, directories):
+        self.fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError("inotify_init1 failed")
+        mask = self.IN_MODIFY | self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE
+        for directory in directories:
+            if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+                self.close()
+                raise OSError(f"Could not watch {directory}")
+
+    def wait(self, timeout):
+        """Wait until a directory changes or timeout seconds pass"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if ready:
+            # The events only say that something changed; drain them all
+            try:
+                while os.read(self.fd, 65536):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def close(self):
+        os.close(self.fd)
+
+
+def _open_notifier(directories):
+    """Return an inotify watcher for directories, or None to poll instead"""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        return _Inotify(libc, directories)
+    except (OSError, AttributeError):
+        return None
+
+
+def load_checkpoint(filename):
+    """Return the saved path -> state entries, or an empty dict"""
+    try:
+        with open(filename, "r") as f:
+            data = json.load(f)
+        if data.get("format") == WATCH_FORMAT:
+            return data["files"]
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Warning: Could not load watch checkpoint: {e}", file=sys.stderr)
+    return {}
+
+
+def follow(generator, paths, exporter, checkpoint_file, interval=WATCH_POLL_INTERVAL,
+           once=False):
+    """Convert lines appended to paths until interrupted, returning how many
+
+    Output, history and the checkpoint are flushed together, so after a
+    crash a line may be converted again but is never skipped. With once,
+    the lines appended since the last checkpoint are converted and the
+    function returns.
+    """
+    entries = load_checkpoint(checkpoint_file)
+    files = [FollowedFile(path, entries.get(os.path.abspath(path))) for path in paths]
+    notifier = None
+    if not once:
+        notifier = _open_notifier({os.path.dirname(f.path) for f in files})
+    count = 0
+    pending = False
+    saved_at = time.monotonic()
+
+    def save():
+        exporter.out.flush()
+        with generator.stats.stage("persist"):
+            generator.journal.flush()
+            generator.suggestions.flush()
+            atomic_write_json(checkpoint_file, {"format": WATCH_FORMAT, "files": entries})
+
+    try:
+        while True:
+            for f in files:
+                for lines in f.read_lines():
+                    count += generator.generate_batch(lines, exporter)
+                    # Only offsets whose lines have been written are saved
+                    entries[f.path] = f.state()
+                    pending = True
+                    if time.monotonic() - saved_at >= WATCH_CHECKPOINT_INTERVAL:
+                        save()
+                        pending = False
+                        saved_at = time.monotonic()
+            if pending:
+                save()
+                pending = False
+                saved_at = time.monotonic()
+            if once:
+                break
+            if notifier is not None:
+                notifier.wait(interval)
+            else:
+                time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if pending:
+            save()
+        for f in files:
+            f.close()
+        if notifier is not None:
+            notifier.close()
+    return count
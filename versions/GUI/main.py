@@ -1,8 +1,39 @@
 import os
+import sys
 import json
+import queue
+import threading
 import tkinter as tk
+import tkinter.font as tkfont
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import ttk, filedialog, messagebox
 
+# The hashtag engine, history, suggestion index and exporters are shared
+# with the CLI version
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "CLI"))
+
+from history import HashtagHistory, recent_tags
+from suggest import SUGGEST_MIN_ITEMS, PrefixIndex
+from exporters import format_for_filename, open_exporter
+from transform import HashtagTransformer, ResultCache
+
+# Delay after the last keystroke before the hashtag preview is refreshed
+PREVIEW_DELAY_MS = 150
+
+# How often the mainloop checks on a background import/export task
+WORKER_POLL_MS = 50
+
+# Characters (or bytes, for line-based conversion) handled per worker step
+FILE_CHUNK_SIZE = 1 << 20
+
+# Number of autocomplete suggestions shown under the text input
+SUGGESTION_ROWS = 4
+
+# File dialog choices for exported hashtags
+EXPORT_FILETYPES = [("Text files", "*.txt"), ("NDJSON files", "*.ndjson"), ("CSV files", "*.csv"),
+                    ("JSON files", "*.json"), ("Gzip-compressed files", "*.gz"), ("All files", "*.*")]
+
+
 class HashtagGenerator:
     def __init__(self):
         # Initialize settings with defaults
@@ -10,39 +41,77 @@ class HashtagGenerator:
             "remove_special_chars": True,
             "capitalize_first_letter": True,
             "history_max_items": 10,
+            "cache_size": 1000,
             "theme": "light"
         }
-        self.history = []
+        self.history = HashtagHistory(max_items=self.settings["history_max_items"])
+        # Recently added tags for autocomplete, pruned like the CLI's index
+        self.suggestions = PrefixIndex()
+        self._transformer = None
         self.load_settings()
     
+    def get_transformer(self):
+        """Return the transformer compiled from the current settings"""
+        key = (self.settings["remove_special_chars"], self.settings["capitalize_first_letter"])
+        transformer = self._transformer
+        if transformer is None or key != (transformer.remove_special_chars,
+                                          transformer.capitalize_first_letter):
+            # A fresh cache per settings fingerprint, so stale results never leak
+            cache = None
+            if self.settings["cache_size"] > 0:
+                cache = ResultCache(self.settings["cache_size"], key)
+            transformer = self._transformer = HashtagTransformer(*key, cache)
+        return transformer
+    
+    def new_transformer(self):
+        """Return an uncached transformer safe to use off the main thread"""
+        transformer = self.get_transformer()
+        return HashtagTransformer(transformer.remove_special_chars,
+                                  transformer.capitalize_first_letter)
+    
+    def invalidate_cache(self):
+        """Drop the compiled transformer and its cached results"""
+        self._transformer = None
+    
+    def format_hashtag(self, text):
+        """Transform input text into a hashtag without touching history"""
+        return self.get_transformer().transform(text)
+    
     def generate_hashtag(self, text):
         """Transform input text into a hashtag format"""
-        if not text:
+        hashtag = self.format_hashtag(text)
+        if not hashtag:
             return ""
-            
-        # Remove special characters if enabled
-        if self.settings["remove_special_chars"]:
-            # Keep alphanumeric and spaces only
-            text = ''.join(c for c in text if c.isalnum() or c.isspace())
-        
-        # Capitalize first letter of each word if enabled
-        if self.settings["capitalize_first_letter"]:
-            text = text.title()
-        
-        # Remove spaces
-        hashtag = text.replace(" ", "")
-        
-        # Add hashtag symbol
-        hashtag = f"#{hashtag}"
         
         # Add to history
-        if hashtag not in self.history:
-            self.history.insert(0, hashtag)
-            # Maintain max history size
-            self.history = self.history[:self.settings["history_max_items"]]
+        self.add_to_history(hashtag)
             
         return hashtag
     
+    def generate_many(self, texts):
+        """Transform many texts into hashtags in one pass"""
+        hashtags = self.get_transformer().transform_many(texts)
+        for hashtag in hashtags:
+            if hashtag:
+                self.add_to_history(hashtag)
+        return hashtags
+    
+    def add_to_history(self, hashtag):
+        """Add a hashtag to history and suggestions, returning True if history changed"""
+        self.suggestions.add(hashtag)
+        limit = self.suggestion_limit()
+        if len(self.suggestions) > 2 * limit:
+            self.suggestions.prune(limit)
+        return self.history.add(hashtag)
+    
+    def suggestion_limit(self):
+        """Return how many tags the suggestion index keeps"""
+        return max(self.settings["history_max_items"], SUGGEST_MIN_ITEMS)
+    
+    def suggest(self, text, limit=SUGGESTION_ROWS):
+        """Return previous hashtags starting with the hashtag for text, best first"""
+        return self.suggestions.suggest(self.format_hashtag(text), limit)
+    
     def load_settings(self):
         """Load settings from config file if exists"""
         if os.path.exists("config.json"):
@@ -57,10 +126,22 @@ class HashtagGenerator:
         if os.path.exists("history.json"):
             try:
                 with open("history.json", "r") as f:
-                    self.history = json.load(f)
+                    self.history = HashtagHistory(json.load(f), self.settings["history_max_items"])
             except:
                 # If error reading, use empty history
-                self.history = []
+                self.history = HashtagHistory(max_items=self.settings["history_max_items"])
+        
+        # Load the suggestion index, or start it from history
+        if os.path.exists("suggestions.json"):
+            try:
+                with open("suggestions.json", "r") as f:
+                    self.suggestions = PrefixIndex.from_dict(json.load(f))
+                self.suggestions.prune(self.suggestion_limit())
+            except:
+                self.suggestions = PrefixIndex()
+        else:
+            for hashtag in reversed(self.history.to_list()):
+                self.suggestions.add(hashtag)
     
     def save_settings(self):
         """Save settings to config file"""
@@ -69,7 +150,14 @@ class HashtagGenerator:
             
         # Save history
         with open("history.json", "w") as f:
-            json.dump(self.history, f)
+            json.dump(self.history.to_list(), f)
+        
+        self.save_suggestions()
+    
+    def save_suggestions(self):
+        """Save the suggestion index"""
+        with open("suggestions.json", "w") as f:
+            json.dump(self.suggestions.to_dict(), f)
     
     def import_from_file(self, filename="input.txt"):
         """Import text from file"""
@@ -85,11 +173,68 @@ class HashtagGenerator:
         except Exception as e:
             return f"Error reading file: {str(e)}"
     
-    def export_to_file(self, hashtag, filename="output.txt"):
-        """Export hashtag to file"""
-        try:
+    def read_file(self, filename, progress, cancelled):
+        """Read a text file in chunks, reporting the fraction read
+        
+        Runs on a worker thread. Returns None if cancelled.
+        """
+        size = os.path.getsize(filename) or 1
+        parts = []
+        read = 0
+        with open(filename, "r") as f:
+            while not cancelled.is_set():
+                chunk = f.read(FILE_CHUNK_SIZE)
+                if not chunk:
+                    return "".join(parts).strip()
+                parts.append(chunk)
+                read += len(chunk)
+                progress(min(1.0, read / size))
+        return None
+    
+    def export_settings(self):
+        """Return the settings that shape a hashtag, for exported records"""
+        return {key: self.settings[key] for key in ("remove_special_chars", "capitalize_first_letter")}
+    
+    def convert_file(self, transformer, input_file, output_file, progress, cancelled,
+                     settings=None, max_items=10):
+        """Write one record per line of input_file to output_file
+        
+        The format follows the output file extension; structured formats
+        include the source text and settings. Runs on a worker thread, so
+        it takes its own transformer and hands progress() the tags of each
+        chunk that would stay in a history of max_items, rather than
+        touching history. Returns the number of hashtags written, or None
+        if cancelled, in which case the partial output file is removed.
+        """
+        size = os.path.getsize(input_file) or 1
+        count = 0
+        with open(input_file, "r") as src, open_exporter(output_file, include_text=True,
+                                                          settings=settings) as exporter:
+            while not cancelled.is_set():
+                lines = src.readlines(FILE_CHUNK_SIZE)
+                if not lines:
+                    return count
+                texts = [line.strip() for line in lines]
+                hashtags = transformer.transform_many(texts)
+                exporter.write_records(texts, hashtags)
+                count += len(hashtags)
+                progress(min(1.0, src.buffer.tell() / size), recent_tags(hashtags, max_items))
+        os.remove(output_file)
+        return None
+    
+    def write_export(self, hashtag, filename, text=None, settings=None):
+        """Write hashtag to file, as a record with text and settings unless it is plain text"""
+        if format_for_filename(filename) == "text" and not filename.lower().endswith(".gz"):
             with open(filename, "w") as f:
                 f.write(hashtag)
+            return
+        with open_exporter(filename, include_text=text is not None, settings=settings) as exporter:
+            exporter.write_records([text], [hashtag])
+    
+    def export_to_file(self, hashtag, filename="output.txt", text=None):
+        """Export hashtag to file"""
+        try:
+            self.write_export(hashtag, filename, text, self.export_settings())
             return True
         except Exception as e:
             return False
@@ -99,13 +244,24 @@ class HashtagGeneratorApp:
     def __init__(self, root):
         self.root = root
         self.root.title("Hashtag Generator")
-        self.root.geometry("500x600")
+        self.root.geometry("600x720")
         self.root.resizable(True, True)
         
         self.generator = HashtagGenerator()
+        # Pending preview scheduled by on_text_change
+        self._preview_job = None
+        # Rows currently shown in the history listbox and the first one's index
+        self._history_rows = []
+        self._history_offset = 0
+        # File work runs on this pool and reports back through the queue
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self._task = None
+        self._task_queue = queue.Queue()
+        self._cancel_event = threading.Event()
         
         self.setup_ui()
         self.apply_theme()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
     
     def setup_ui(self):
         """Set up the user interface"""
@@ -126,6 +282,11 @@ class HashtagGeneratorApp:
         self.text_input.pack(fill=tk.X, pady=5)
         self.text_input.bind("<KeyRelease>", self.on_text_change)
         
+        # Autocomplete from previous hashtags, refreshed with the preview
+        self.suggestion_listbox = tk.Listbox(input_frame, height=SUGGESTION_ROWS)
+        self.suggestion_listbox.pack(fill=tk.X)
+        self.suggestion_listbox.bind('<<ListboxSelect>>', self.on_suggestion_select)
+        
         # Buttons frame
         button_frame = ttk.Frame(self.main_frame)
         button_frame.pack(fill=tk.X, pady=10)
@@ -149,6 +310,9 @@ class HashtagGeneratorApp:
         export_btn = ttk.Button(button_frame, text="Export", command=self.export_hashtag)
         export_btn.pack(side=tk.RIGHT, padx=5)
         
+        convert_btn = ttk.Button(button_frame, text="Convert File", command=self.convert_file)
+        convert_btn.pack(side=tk.RIGHT, padx=5)
+        
         # Output frame
         output_frame = ttk.LabelFrame(self.main_frame, text="Generated Hashtag", padding="10")
         output_frame.pack(fill=tk.X, pady=10)
@@ -188,31 +352,70 @@ class HashtagGeneratorApp:
         history_frame = ttk.LabelFrame(self.main_frame, text="History", padding="10")
         history_frame.pack(fill=tk.BOTH, expand=True, pady=10)
         
-        # History listbox
+        # History listbox, which only ever holds the rows in view
         self.history_listbox = tk.Listbox(history_frame, height=5)
         self.history_listbox.pack(fill=tk.BOTH, expand=True, side=tk.LEFT)
+        self.history_line_height = tkfont.Font(font=self.history_listbox.cget("font")).metrics("linespace")
         
-        # Scrollbar for history
-        scrollbar = ttk.Scrollbar(history_frame, orient="vertical", command=self.history_listbox.yview)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.history_listbox.config(yscrollcommand=scrollbar.set)
+        # Scrollbar for history, driven by our own offset into the history
+        self.history_scrollbar = ttk.Scrollbar(history_frame, orient="vertical", command=self.scroll_history)
+        self.history_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
         # Configure history listbox
         self.history_listbox.bind('<<ListboxSelect>>', self.on_history_select)
+        self.history_listbox.bind('<Configure>', lambda event: self.update_history_display())
+        self.history_listbox.bind('<MouseWheel>', self.on_history_wheel)
+        self.history_listbox.bind('<Button-4>', self.on_history_wheel)
+        self.history_listbox.bind('<Button-5>', self.on_history_wheel)
         self.update_history_display()
         
         # Status bar
         self.status_var = tk.StringVar(value="Ready")
         status_bar = ttk.Label(self.root, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W)
         status_bar.pack(side=tk.BOTTOM, fill=tk.X)
+        
+        # Progress of background file tasks, shown only while one runs
+        self.progress_frame = ttk.Frame(self.root, padding=(20, 0, 20, 5))
+        self.progress_var = tk.DoubleVar(value=0)
+        progress_bar = ttk.Progressbar(self.progress_frame, variable=self.progress_var, maximum=100)
+        progress_bar.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 5))
+        cancel_btn = ttk.Button(self.progress_frame, text="Cancel", command=self.cancel_task)
+        cancel_btn.pack(side=tk.RIGHT)
     
     def on_text_change(self, event=None):
-        """Real-time hashtag generation"""
-        if self.text_input.get("1.0", "end-1c").strip():
-            self.generate_hashtag()
+        """Refresh the hashtag preview once typing pauses"""
+        if self._preview_job is not None:
+            self.root.after_cancel(self._preview_job)
+        self._preview_job = self.root.after(PREVIEW_DELAY_MS, self.preview_hashtag)
+    
+    def preview_hashtag(self):
+        """Show the hashtag for the current text without adding it to history"""
+        self._preview_job = None
+        text = self.text_input.get("1.0", "end-1c").strip()
+        if text:
+            self.hashtag_output.config(text=self.generator.format_hashtag(text))
+        self.update_suggestions(text)
+    
+    def update_suggestions(self, text):
+        """List previous hashtags that start with the hashtag for text"""
+        self.suggestion_listbox.delete(0, tk.END)
+        if text:
+            for hashtag in self.generator.suggest(text):
+                self.suggestion_listbox.insert(tk.END, hashtag)
+    
+    def on_suggestion_select(self, event=None):
+        """Use the selected suggestion as the hashtag"""
+        if self.suggestion_listbox.curselection():
+            index = self.suggestion_listbox.curselection()[0]
+            self.hashtag_output.config(text=self.suggestion_listbox.get(index))
+            self.status_var.set("Selected from suggestions")
     
     def generate_hashtag(self):
         """Generate hashtag from input text"""
+        if self._preview_job is not None:
+            self.root.after_cancel(self._preview_job)
+            self._preview_job = None
+            
         text = self.text_input.get("1.0", "end-1c").strip()
         if text:
             hashtag = self.generator.generate_hashtag(text)
@@ -228,6 +431,9 @@ class HashtagGeneratorApp:
         if hashtag != "#YourHashtagHere":
             self.root.clipboard_clear()
             self.root.clipboard_append(hashtag)
+            # Copying a previewed hashtag commits it to history
+            if self.generator.add_to_history(hashtag):
+                self.update_history_display()
             self.status_var.set("Hashtag copied to clipboard")
         else:
             self.status_var.set("Nothing to copy")
@@ -235,9 +441,80 @@ class HashtagGeneratorApp:
     def clear_input(self):
         """Clear the input field"""
         self.text_input.delete("1.0", tk.END)
+        self.suggestion_listbox.delete(0, tk.END)
         self.hashtag_output.config(text="#YourHashtagHere")
         self.status_var.set("Input cleared")
     
+    def run_task(self, description, task, on_done, error_title):
+        """Run task(progress, cancelled) on the worker pool
+        
+        The worker only talks to the mainloop through the task queue, which
+        poll_task drains; on_done(result) then runs on the main thread.
+        """
+        if self._task is not None:
+            self.status_var.set("Please wait for the current task to finish")
+            return
+        self._cancel_event = threading.Event()
+        self._task_callbacks = (on_done, error_title)
+        self._task = self.executor.submit(task, self.report_progress, self._cancel_event)
+        
+        self.progress_var.set(0)
+        self.progress_frame.pack(side=tk.BOTTOM, fill=tk.X)
+        self.status_var.set(description)
+        self.root.after(WORKER_POLL_MS, self.poll_task)
+    
+    def report_progress(self, fraction, hashtags=None):
+        """Queue progress from the worker thread for the mainloop"""
+        self._task_queue.put((fraction, hashtags))
+    
+    def poll_task(self):
+        """Apply queued progress and finish the task once the worker is done"""
+        # Check before draining so no update queued by the worker is missed
+        finished = self._task.done()
+        history_changed = False
+        while True:
+            try:
+                fraction, hashtags = self._task_queue.get_nowait()
+            except queue.Empty:
+                break
+            self.progress_var.set(fraction * 100)
+            for hashtag in hashtags or ():
+                if hashtag and self.generator.add_to_history(hashtag):
+                    history_changed = True
+        if history_changed:
+            self.update_history_display()
+        
+        if not finished:
+            self.root.after(WORKER_POLL_MS, self.poll_task)
+            return
+        
+        task, self._task = self._task, None
+        self.progress_frame.pack_forget()
+        on_done, error_title = self._task_callbacks
+        if task.exception() is not None:
+            self.status_var.set("Task failed")
+            messagebox.showerror(error_title, str(task.exception()))
+        elif task.result() is None and self._cancel_event.is_set():
+            self.status_var.set("Cancelled")
+        else:
+            on_done(task.result())
+    
+    def cancel_task(self):
+        """Ask the running worker task to stop"""
+        if self._task is not None:
+            self._cancel_event.set()
+            self.status_var.set("Cancelling...")
+    
+    def on_close(self):
+        """Stop any running task, save suggestions and close the window"""
+        self._cancel_event.set()
+        self.executor.shutdown(wait=False)
+        try:
+            self.generator.save_suggestions()
+        except OSError:
+            pass
+        self.root.destroy()
+    
     def import_text(self):
         """Import text from file"""
         filename = filedialog.askopenfilename(
@@ -246,22 +523,69 @@ class HashtagGeneratorApp:
         )
         
         if filename:
-            try:
-                with open(filename, "r") as f:
-                    text = f.read().strip()
-                    self.text_input.delete("1.0", tk.END)
-                    self.text_input.insert("1.0", text)
-                    self.generate_hashtag()
-                    self.status_var.set(f"Imported from {os.path.basename(filename)}")
-            except Exception as e:
-                messagebox.showerror("Import Error", f"Error reading file: {str(e)}")
-        else:
-            # Try default input.txt if no file selected
-            text = self.generator.import_from_file()
-            if text and text != "Error reading file":
+            transformer = self.generator.new_transformer()
+            
+            def task(progress, cancelled):
+                text = self.generator.read_file(filename, progress, cancelled)
+                if text is None:
+                    return None
+                return text, transformer.transform(text)
+            
+            def done(result):
+                text, hashtag = result
                 self.text_input.delete("1.0", tk.END)
                 self.text_input.insert("1.0", text)
-                self.status_var.set("Imported from input.txt")
+                self.hashtag_output.config(text=hashtag or "#YourHashtagHere")
+                if hashtag and self.generator.add_to_history(hashtag):
+                    self.update_history_display()
+                self.status_var.set(f"Imported from {os.path.basename(filename)}")
+            
+            self.run_task(f"Importing {os.path.basename(filename)}...", task, done, "Import Error")
+        else:
+            # Try default input.txt if no file selected
+            def done(text):
+                if text and not text.startswith("Error reading file"):
+                    self.text_input.delete("1.0", tk.END)
+                    self.text_input.insert("1.0", text)
+                    self.status_var.set("Imported from input.txt")
+            
+            self.run_task("Importing input.txt...",
+                          lambda progress, cancelled: self.generator.import_from_file(),
+                          done, "Import Error")
+    
+    def convert_file(self):
+        """Convert every line of a file to a hashtag, saved to another file"""
+        input_file = filedialog.askopenfilename(
+            title="Select File to Convert",
+            filetypes=[("Text files", "*.txt"), ("All files", "*.*")]
+        )
+        if not input_file:
+            return
+        
+        name, _ = os.path.splitext(os.path.basename(input_file))
+        output_file = filedialog.asksaveasfilename(
+            title="Save Hashtags",
+            defaultextension=".txt",
+            filetypes=EXPORT_FILETYPES,
+            initialfile=f"{name}_hashtags.txt"
+        )
+        if not output_file:
+            return
+        
+        transformer = self.generator.new_transformer()
+        settings = self.generator.export_settings()
+        max_items = self.generator.settings["history_max_items"]
+        
+        def task(progress, cancelled):
+            # Only the few tags per chunk that stay in history are handed
+            # back, so the mainloop never indexes a whole file
+            return self.generator.convert_file(transformer, input_file, output_file,
+                                               progress, cancelled, settings, max_items)
+        
+        def done(count):
+            self.status_var.set(f"{count} hashtags saved to {os.path.basename(output_file)}")
+        
+        self.run_task(f"Converting {os.path.basename(input_file)}...", task, done, "Convert Error")
     
     def export_hashtag(self):
         """Export hashtag to file"""
@@ -274,36 +598,83 @@ class HashtagGeneratorApp:
         filename = filedialog.asksaveasfilename(
             title="Save Hashtag",
             defaultextension=".txt",
-            filetypes=[("Text files", "*.txt"), ("All files", "*.*")],
+            filetypes=EXPORT_FILETYPES,
             initialfile="output.txt"
         )
         
         if filename:
-            try:
-                with open(filename, "w") as f:
-                    f.write(hashtag)
-                self.status_var.set(f"Exported to {os.path.basename(filename)}")
-            except Exception as e:
-                messagebox.showerror("Export Error", f"Error writing file: {str(e)}")
+            text = self.text_input.get("1.0", "end-1c").strip() or None
+            settings = self.generator.export_settings()
+            
+            def task(progress, cancelled):
+                self.generator.write_export(hashtag, filename, text, settings)
+                return True
+            
+            self.run_task(f"Exporting to {os.path.basename(filename)}...", task,
+                          lambda result: self.status_var.set(f"Exported to {os.path.basename(filename)}"),
+                          "Export Error")
     
     def update_settings(self, event=None):
         """Update settings based on UI controls"""
         self.generator.settings["remove_special_chars"] = self.remove_special_var.get()
         self.generator.settings["capitalize_first_letter"] = self.capitalize_var.get()
         self.generator.settings["theme"] = self.theme_var.get()
+        self.generator.invalidate_cache()
         
         self.generator.save_settings()
         self.apply_theme()
         
-        # Regenerate hashtag with new settings
-        self.generate_hashtag()
+        # Refresh the preview with new settings
+        self.preview_hashtag()
         self.status_var.set("Settings updated")
     
     def update_history_display(self):
-        """Update the history listbox"""
-        self.history_listbox.delete(0, tk.END)
-        for item in self.generator.history:
-            self.history_listbox.insert(tk.END, item)
+        """Show the visible page of history, changing only rows that differ"""
+        history = self.generator.history
+        total = len(history)
+        visible = max(1, self.history_listbox.winfo_height() // self.history_line_height + 1)
+        offset = self._history_offset = max(0, min(self._history_offset, total - visible))
+        rows = history.page(visible, offset)
+        
+        old_rows = self._history_rows
+        if rows[1:] == old_rows[:len(rows) - 1] and rows[:1] != old_rows[:1]:
+            # A new tag at the front: shift everything down by one row
+            self.history_listbox.insert(0, rows[0])
+            self.history_listbox.delete(len(rows), tk.END)
+        else:
+            for index, row in enumerate(rows):
+                if index >= len(old_rows):
+                    self.history_listbox.insert(tk.END, row)
+                elif old_rows[index] != row:
+                    self.history_listbox.delete(index)
+                    self.history_listbox.insert(index, row)
+            if len(old_rows) > len(rows):
+                self.history_listbox.delete(len(rows), tk.END)
+        self._history_rows = rows
+        
+        if total:
+            self.history_scrollbar.set(offset / total, min(1.0, (offset + visible) / total))
+        else:
+            self.history_scrollbar.set(0.0, 1.0)
+    
+    def scroll_history(self, action, amount, unit=None):
+        """Handle scrollbar drags and clicks by moving the visible window"""
+        total = len(self.generator.history)
+        visible = len(self._history_rows) or 1
+        if action == "moveto":
+            self._history_offset = int(float(amount) * total)
+        elif action == "scroll":
+            step = visible if unit == "pages" else 1
+            self._history_offset += int(amount) * step
+        self.update_history_display()
+    
+    def on_history_wheel(self, event):
+        """Scroll history with the mouse wheel"""
+        if event.num == 4 or event.delta > 0:
+            self.scroll_history("scroll", -3)
+        else:
+            self.scroll_history("scroll", 3)
+        return "break"
     
     def on_history_select(self, event=None):
         """Handle history item selection"""
@@ -325,6 +696,7 @@ class HashtagGeneratorApp:
             ttk.Style().configure("TLabelframe", background="#f0f0f0")
             ttk.Style().configure("TLabelframe.Label", background="#f0f0f0", foreground="#000")
             self.text_input.configure(bg="white", fg="black")
+            self.suggestion_listbox.configure(bg="white", fg="black")
             self.history_listbox.configure(bg="white", fg="black")
         else:  # dark theme
             self.root.configure(bg="#2e2e2e")
@@ -334,6 +706,7 @@ class HashtagGeneratorApp:
             ttk.Style().configure("TLabelframe", background="#2e2e2e")
             ttk.Style().configure("TLabelframe.Label", background="#2e2e2e", foreground="#fff")
             self.text_input.configure(bg="#3e3e3e", fg="white")
+            self.suggestion_listbox.configure(bg="#3e3e3e", fg="white")
             self.history_listbox.configure(bg="#3e3e3e", fg="white")
 
 if __name__ == "__main__":